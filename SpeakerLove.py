@@ -5,178 +5,32 @@ AI-Powered Noise Suppression for Clean Voice Transmission
 For gamers who LOVE using speakers instead of headsets.
 Uses noise reduction to remove game audio and background noise.
 
+This is the Tk app; the engine itself (engine.py) has no GUI dependency
+and can be scripted directly.
+
 GitHub: https://github.com/kymo42/SpeakerLove
 """
 
-import numpy as np
 import threading
-import queue
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sounddevice as sd
-import sys
-import os
 
-# Try to import noise reduction library
-try:
-    import noisereduce as nr
-    AI_AVAILABLE = True
-    IMPORT_ERROR = None
-    print("✓ Noise Reduction Library Loaded")
-except ImportError as e:
-    AI_AVAILABLE = False
-    IMPORT_ERROR = str(e)
-    print(f"Noise reduction import failed: {e}")
-
-class SpeakerLove:
-    """Core audio processing engine using noise reduction"""
-    
-    def __init__(self, mic_device, output_device, sample_rate=48000, chunk_size=2048):
-        self.mic_device = mic_device
-        self.output_device = output_device
-        self.sample_rate = sample_rate
-        self.chunk_size = chunk_size
-        
-        self.running = False
-        self.enabled = False
-        
-        self.audio_queue = queue.Queue(maxsize=20)
-        self.output_queue = queue.Queue(maxsize=20)
-        
-        self.mic_stream = None
-        self.output_stream = None
-        
-        # For noise profile learning
-        self.noise_profile = None
-        self.learning_frames = []
-        self.learning_mode = True
-        self.frames_to_learn = 10  # Learn from first 10 frames
-
-    def _mic_callback(self, indata, frames, time, status):
-        """Microphone input callback"""
-        if status:
-            print(f"Mic status: {status}")
-        try:
-            self.audio_queue.put_nowait(indata.copy().astype(np.float32))
-        except queue.Full:
-            pass
-    
-    def _output_callback(self, outdata, frames, time, status):
-        """Output callback"""
-        if status:
-            print(f"Output status: {status}")
-        try:
-            data = self.output_queue.get_nowait()
-            # Ensure we fill the buffer
-            if len(data) < len(outdata):
-                outdata[:len(data)] = data
-                outdata[len(data):] = 0
-            else:
-                outdata[:] = data[:len(outdata)]
-        except queue.Empty:
-            outdata[:] = 0
-    
-    def process_audio(self):
-        """Main processing loop"""
-        while self.running:
-            try:
-                # Get audio chunk
-                mic_audio = self.audio_queue.get(timeout=1.0)
-                
-                if self.enabled and AI_AVAILABLE:
-                    try:
-                        # Learn noise profile from first few frames
-                        if self.learning_mode and len(self.learning_frames) < self.frames_to_learn:
-                            self.learning_frames.append(mic_audio.copy())
-                            if len(self.learning_frames) >= self.frames_to_learn:
-                                # Build noise profile from collected frames
-                                noise_sample = np.concatenate(self.learning_frames)
-                                self.noise_profile = noise_sample
-                                self.learning_mode = False
-                                print("✓ Noise profile learned - AI active")
-                            cleaned = mic_audio  # Pass through while learning
-                        elif self.noise_profile is not None:
-                            # Apply noise reduction
-                            cleaned = nr.reduce_noise(
-                                y=mic_audio.flatten(),
-                                sr=self.sample_rate,
-                                y_noise=self.noise_profile.flatten(),
-                                stationary=False,
-                                prop_decrease=1.0
-                            )
-                            # Reshape to match input
-                            cleaned = cleaned.reshape(-1, 1)
-                        else:
-                            cleaned = mic_audio
-                        
-                    except Exception as e:
-                        print(f"Noise reduction error: {e}")
-                        cleaned = mic_audio
-                else:
-                    cleaned = mic_audio
-
-                self.output_queue.put_nowait(cleaned)
-                
-            except queue.Empty:
-                continue
-            except Exception as e:
-                print(f"Process Error: {e}")
-    
-    def start(self):
-        """Start audio streams"""
-        try:
-            print(f"Starting with: Mic={self.mic_device}, Output={self.output_device}")
-            
-            self.mic_stream = sd.InputStream(
-                device=self.mic_device,
-                samplerate=self.sample_rate,
-                channels=1,
-                blocksize=self.chunk_size,
-                callback=self._mic_callback
-            )
-            self.mic_stream.start()
-            
-            self.output_stream = sd.OutputStream(
-                device=self.output_device,
-                samplerate=self.sample_rate,
-                channels=1,
-                blocksize=self.chunk_size,
-                callback=self._output_callback
-            )
-            self.output_stream.start()
-            
-            self.running = True
-            threading.Thread(target=self.process_audio, daemon=True).start()
-            
-            print("✓ Started successfully")
-            return True
-            
-        except Exception as e:
-            print(f"Start error: {e}")
-            messagebox.showerror("Error", f"Failed to start:\n{e}")
-            self.stop()
-            return False
-    
-    def stop(self):
-        """Stop audio"""
-        self.running = False
-        for stream in [self.mic_stream, self.output_stream]:
-            if stream:
-                try:
-                    stream.stop()
-                    stream.close()
-                except:
-                    pass
-        print("✓ Stopped")
+import audio_pipeline
+from audio_pipeline import preload_noisereduce
+from device_catalog import DeviceCatalog
+from engine import EngineConfig, SpeakerLove  # SpeakerLove re-exported for existing scripts
 
 
 class GUI:
     """Main GUI with clean, minimal design"""
     
+    POLL_MS = 50  # Background startup work is checked this often
+    HOTPLUG_POLL_MS = 500
+    
     def __init__(self, root):
         self.root = root
         self.root.title("SpeakerLove AI - Noise Suppression")
-        self.root.geometry("500x450")
+        self.root.geometry("500x500")
         self.root.configure(bg="#FFFFFF")
         
         # Configure custom styles
@@ -184,6 +38,21 @@ class GUI:
         
         self.isolator = None
         
+        # Slow startup work runs on background threads, polled from Tk
+        self._dsp_thread = None
+        self._device_thread = None
+        self._device_error = None
+        
+        # Shared device list; PortAudio is only restarted to look for new
+        # devices while no streams are open
+        self.catalog = DeviceCatalog(can_rescan=lambda: not (self.isolator and self.isolator.running))
+        self._devices_changed = threading.Event()
+        self._hotplug_after = None  # The pending _poll_hotplug; one loop however often we refresh
+        self._mics = []
+        self._outputs = []
+        self._wanted_mic = None
+        self._wanted_output = None
+        
         # Main container
         main_frame = tk.Frame(root, bg="#FFFFFF")
         main_frame.pack(fill=tk.BOTH, expand=True, padx=30, pady=20)
@@ -226,6 +95,7 @@ class GUI:
         self.mic_combo = ttk.Combobox(device_frame, textvariable=self.mic_var,
                                      state="readonly", font=("Segoe UI", 9))
         self.mic_combo.pack(fill=tk.X, pady=(5, 12))
+        self.mic_combo.bind("<<ComboboxSelected>>", self._device_selected)
         
         # Output
         tk.Label(device_frame, text="Output (Virtual Mic)",
@@ -235,7 +105,17 @@ class GUI:
         self.output_var = tk.StringVar()
         self.output_combo = ttk.Combobox(device_frame, textvariable=self.output_var,
                                         state="readonly", font=("Segoe UI", 9))
-        self.output_combo.pack(fill=tk.X, pady=(5, 0))
+        self.output_combo.pack(fill=tk.X, pady=(5, 12))
+        self.output_combo.bind("<<ComboboxSelected>>", self._device_selected)
+        
+        # Suppression strength, applied live while running
+        tk.Label(device_frame, text="Suppression",
+                font=("Segoe UI", 10, "bold"),
+                fg="#2C2C2C", bg="#FFFFFF").pack(anchor=tk.W)
+        
+        self.strength_var = tk.DoubleVar(value=100.0)
+        ttk.Scale(device_frame, from_=0, to=100, variable=self.strength_var,
+                 command=self._strength_changed).pack(fill=tk.X, pady=(5, 0))
         
         # Controls
         control_frame = tk.Frame(main_frame, bg="#FFFFFF")
@@ -262,10 +142,43 @@ class GUI:
                   command=self.show_help,
                   style="Clean.TButton").pack(side=tk.RIGHT)
         
-        self.refresh_devices()
+        self.low_latency_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(button_frame, text="Low latency",
+                      variable=self.low_latency_var,
+                      font=("Segoe UI", 9),
+                      fg="#2C2C2C", bg="#FFFFFF",
+                      activebackground="#FFFFFF").pack(side=tk.RIGHT, padx=(0, 10))
+        
+        self.worker_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(button_frame, text="DSP process",
+                      variable=self.worker_var,
+                      font=("Segoe UI", 9),
+                      fg="#2C2C2C", bg="#FFFFFF",
+                      activebackground="#FFFFFF").pack(side=tk.RIGHT, padx=(0, 10))
         
-        if not AI_AVAILABLE:
-            error_msg = f"Noise reduction failed to load.\n\nError: {IMPORT_ERROR}\n\nPlease run: pip install -r requirements.txt"
+        # Show the window at once; the DSP stack and device list load behind it
+        self.set_loading(True)
+        self._dsp_thread = preload_noisereduce()
+        self.root.after(self.POLL_MS, self._poll_dsp)
+        self.refresh_devices(refresh=False)
+    
+    def set_loading(self, loading):
+        """Disable starting while the noise reduction library is still importing"""
+        if loading:
+            self.status_indicator.config(bg="#FFB347")  # Orange
+            self.status_text.config(text="LOADING", fg="#FF6B35")
+            self.start_btn.config(text="LOADING AI ENGINE...", state=tk.DISABLED, cursor="watch")
+        else:
+            self.start_btn.config(state=tk.NORMAL, cursor="hand2")
+            self.update_status(running=False)
+    
+    def _poll_dsp(self):
+        if self._dsp_thread.is_alive():
+            self.root.after(self.POLL_MS, self._poll_dsp)
+            return
+        self.set_loading(False)
+        if not audio_pipeline.AI_AVAILABLE:
+            error_msg = f"Noise reduction failed to load.\n\nError: {audio_pipeline.IMPORT_ERROR}\n\nPlease run: pip install -r requirements.txt"
             messagebox.showwarning("Missing Requirements", error_msg)
     
     def configure_styles(self):
@@ -291,47 +204,93 @@ class GUI:
                        focuscolor="#4A90E2",
                        focusthickness=2)
     
-    def refresh_devices(self):
-        """Load and display devices correctly"""
+    def refresh_devices(self, refresh=True):
+        """Enumerate devices on a background thread; the lists fill in when done"""
+        if self._device_thread is not None and self._device_thread.is_alive():
+            return
+        if not self.mic_combo['values']:
+            self.mic_combo.set("Loading devices...")
+            self.output_combo.set("Loading devices...")
+        self._device_thread = threading.Thread(target=self._query_devices, args=(refresh,), daemon=True)
+        self._device_thread.start()
+        self.root.after(self.POLL_MS, self._poll_devices)
+    
+    def _query_devices(self, refresh):
         try:
-            devices = sd.query_devices()
-            
-            mics = []
-            outputs = []
-            
-            for i, dev in enumerate(devices):
-                name_lower = dev['name'].lower()
-                dev_str = f"[{i}] {dev['name']}"
-                
-                # MICROPHONES
-                if dev['max_input_channels'] > 0:
-                    if any(k in name_lower for k in ['microphone', 'mic', 'capture', 'input']):
-                        if not any(k in name_lower for k in ['voicemeeter', 'what u hear', 'stereo mix']):
-                            mics.append(dev_str)
-                
-                # OUTPUT: Voicemeeter virtual microphones
-                if dev['max_output_channels'] > 0:
-                    if any(k in name_lower for k in ['voicemeeter']):
-                        outputs.append(dev_str)
-                    else:
-                        # Also include physical speakers as fallback
-                        if any(k in name_lower for k in ['speaker', 'sound mapper']):
-                            outputs.append(dev_str)
-            
-            self.mic_combo['values'] = mics
-            self.output_combo['values'] = outputs
-            
-            if mics:
-                self.mic_combo.current(0)
-            if outputs:
-                # Try to find Voicemeeter Input as default
-                voicemeeter_idx = next((i for i, s in enumerate(outputs) if 'voicemeeter input' in s.lower()), 0)
-                self.output_combo.current(voicemeeter_idx)
-            
-            print(f"Found {len(mics)} mics, {len(outputs)} outputs")
-            
+            if refresh:
+                self.catalog.refresh()
+            else:
+                self.catalog.devices()
+            self._device_error = None
         except Exception as e:
-            messagebox.showerror("Error", f"Device refresh failed: {e}")
+            self._device_error = e
+    
+    def _poll_devices(self):
+        if self._device_thread.is_alive():
+            self.root.after(self.POLL_MS, self._poll_devices)
+            return
+        if self._device_error is not None:
+            self.mic_combo.set("")
+            self.output_combo.set("")
+            messagebox.showerror("Error", f"Device refresh failed: {self._device_error}")
+            return
+        self.show_devices()
+        # From now on, pick up devices that are plugged in or removed
+        self.catalog.watch(lambda added, removed: self._devices_changed.set())
+        if self._hotplug_after is None:
+            self._hotplug_after = self.root.after(self.HOTPLUG_POLL_MS, self._poll_hotplug)
+    
+    def _poll_hotplug(self):
+        if self._devices_changed.is_set():
+            self._devices_changed.clear()
+            self.show_devices()
+        self._hotplug_after = self.root.after(self.HOTPLUG_POLL_MS, self._poll_hotplug)
+    
+    def _select(self, combo, devices, wanted, fallback):
+        """Select the wanted device if present (it may have a new index), else the fallback"""
+        keys = [d.key for d in devices]
+        if wanted in keys:
+            combo.current(keys.index(wanted))
+        elif fallback is not None:
+            combo.current(devices.index(fallback))
+        else:
+            combo.set("")
+        # Keep wanting a device that went away, so it is reselected when it returns
+        return wanted if wanted is not None else (fallback.key if fallback is not None else None)
+    
+    def _device_selected(self, event=None):
+        """Remember the user's choice by identity rather than by index"""
+        mic, output = self.mic_combo.current(), self.output_combo.current()
+        if mic >= 0:
+            self._wanted_mic = self._mics[mic].key
+        if output >= 0:
+            self._wanted_output = self._outputs[output].key
+            if self.isolator and self.isolator.running:
+                # Switch playback without restarting the DSP
+                with self.catalog.lock:
+                    switched = self.isolator.reconfigure(output_device=self._outputs[output].index)
+                if not switched:
+                    messagebox.showerror("Error", f"Could not switch output:\n{self.isolator.last_error}")
+                    self.update_status(running=self.isolator.running, success=self.isolator.running)
+    
+    def _strength_changed(self, value=None):
+        if self.isolator and self.isolator.running:
+            self.isolator.reconfigure(prop_decrease=self.strength_var.get() / 100.0)
+    
+    def show_devices(self):
+        """Fill the device lists from the catalog, keeping the current choices"""
+        self._mics = self.catalog.mics
+        self._outputs = self.catalog.outputs
+        self.mic_combo['values'] = [d.label for d in self._mics]
+        self.output_combo['values'] = [d.label for d in self._outputs]
+        
+        self._wanted_mic = self._select(self.mic_combo, self._mics, self._wanted_mic,
+                                        self._mics[0] if self._mics else None)
+        # Voicemeeter Input is the default output
+        self._wanted_output = self._select(self.output_combo, self._outputs, self._wanted_output,
+                                           self.catalog.default_output(self._outputs))
+        
+        print(f"Found {len(self._mics)} mics, {len(self._outputs)} outputs")
     
     def show_help(self):
         """Show help dialog"""
@@ -348,6 +307,7 @@ SPEAKERLOVE AI - SETUP GUIDE
 
 4. Click START AI ISOLATION
    - First few seconds: Learning background noise
+     (skipped when a saved profile for this mic exists)
    - After that: Active noise filtering
 
 The AI will automatically filter out game audio and background noise.
@@ -374,26 +334,26 @@ The AI will automatically filter out game audio and background noise.
         """Start/stop"""
         if not self.isolator or not self.isolator.running:
             try:
-                mic_str = self.mic_combo.get()
-                output_str = self.output_combo.get()
+                mic, output = self.mic_combo.current(), self.output_combo.current()
                 
-                if not all([mic_str, output_str]):
+                if mic < 0 or output < 0:
                     messagebox.showerror("Error", "Please select both devices")
                     return
                 
-                try:
-                    mic_id = int(mic_str.split('[')[1].split(']')[0])
-                    output_id = int(output_str.split('[')[1].split(']')[0])
-                except ValueError:
-                    messagebox.showerror("Error", "Invalid device selection")
-                    return
-                
-                self.isolator = SpeakerLove(mic_id, output_id)
-                self.isolator.enabled = True
-                
-                if self.isolator.start():
+                config = EngineConfig(self._mics[mic].index, self._outputs[output].index,
+                                      low_latency=self.low_latency_var.get(),
+                                      worker_process=self.worker_var.get(),
+                                      prop_decrease=self.strength_var.get() / 100.0)
+                # No device rescan may restart PortAudio while the engine
+                # queries the devices and opens its streams
+                with self.catalog.lock:
+                    self.isolator = SpeakerLove(config=config)
+                    self.isolator.enabled = True
+                    started = self.isolator.start()
+                if started:
                     self.update_status(running=True, success=True)
                 else:
+                    messagebox.showerror("Error", f"Failed to start:\n{self.isolator.last_error}")
                     self.isolator = None
                     self.update_status(running=False, success=False)
                     
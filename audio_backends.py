@@ -0,0 +1,374 @@
+"""
+SpeakerLove - Audio Backends
+Where a pipeline's input and output streams come from
+
+A backend opens callback-driven streams with the same call signature as
+sounddevice (device, samplerate, channels, blocksize, callback), so
+SpeakerLove drives a sound card, a WAV file, memory or nothing at all the
+same way. Non-device streams run on their own thread, paced either at the
+stream's real-time block rate (representative timing, dropouts and all)
+or as fast as the pipeline accepts and produces blocks (deterministic:
+every block is processed, nothing is zero-filled).
+
+    "sounddevice"  PortAudio devices (device = index or name)
+    "file"         input reads a WAV file, output writes one (device = path)
+    "memory"       in-memory loopback: feed() inputs, capture() outputs
+    "null"         input is silence, output is discarded (device ignored)
+
+Streams of the non-device backends are paced by one clock (time.monotonic),
+so only sounddevice has independent_clocks and needs drift compensation.
+
+device_name(device) gives a stable identity for per-device state such as
+cached noise profiles, or None where there is none (files, memory, null).
+default_samplerate(device, kind) is the rate an "input" or "output" device
+runs at natively (None if it has no preference).
+
+Streams also take an optional ready() callable: "the pipeline can accept
+(input) or deliver (output) one block now". Fast-paced streams wait for it;
+real-time ones, like sound cards, do not.
+"""
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class SoundDeviceBackend:
+    """PortAudio streams via the sounddevice package"""
+
+    name = "sounddevice"
+    independent_clocks = True  # Each device runs on its own crystal
+
+    def __init__(self):
+        import sounddevice
+        self._sd = sounddevice
+
+    def device_name(self, device):
+        try:
+            return self._sd.query_devices(device, "input")["name"]
+        except Exception:
+            return None
+
+    def default_samplerate(self, device, kind="input"):
+        try:
+            return int(self._sd.query_devices(device, kind)["default_samplerate"])
+        except Exception:
+            return None
+
+    def input_stream(self, device, samplerate, channels, blocksize, callback, ready=None):
+        return self._sd.InputStream(device=device, samplerate=samplerate, channels=channels,
+                                    blocksize=blocksize, callback=callback)
+
+    def output_stream(self, device, samplerate, channels, blocksize, callback, ready=None):
+        return self._sd.OutputStream(device=device, samplerate=samplerate, channels=channels,
+                                     blocksize=blocksize, callback=callback)
+
+
+class PacedStream:
+    """Calls a sounddevice-style callback once per block from its own thread
+
+    `source(buffer)` fills each input block and returns False when it had
+    no audio to give; `sink(buffer)` consumes each output block. Either
+    may be None.
+    """
+
+    # How often a fast-paced stream re-checks a pipeline that is not ready
+    POLL_S = 0.0005
+
+    def __init__(self, samplerate, channels, blocksize, callback, source=None, sink=None,
+                 realtime=True, ready=None):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.callback = callback
+        self.source = source
+        self.sink = sink
+        self.realtime = realtime
+        self.ready = ready
+        self.blocks = 0
+        self._buffer = np.zeros((blocksize, channels), dtype=np.float32)
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def active(self):
+        return self._thread is not None
+
+    def _run(self):
+        period = self.blocksize / self.samplerate
+        deadline = time.monotonic()
+        while not self._stop.is_set():
+            if not self.realtime and self.ready is not None and not self.ready():
+                self._stop.wait(self.POLL_S)
+                continue
+            if self.source is not None and not self.source(self._buffer) and not self.realtime:
+                self._stop.wait(self.POLL_S)  # Nothing to feed yet
+                continue
+            self.callback(self._buffer, self.blocksize, None, None)
+            if self.sink is not None:
+                self.sink(self._buffer)
+            self.blocks += 1
+
+            if self.realtime:
+                deadline += period
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    self._stop.wait(delay)
+                else:
+                    deadline = time.monotonic()  # Fell behind: do not try to catch up in a burst
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def close(self):
+        self.stop()
+
+
+def _silence(buffer):
+    buffer.fill(0)
+    return True
+
+
+class NullBackend:
+    """Silent input, discarded output"""
+
+    name = "null"
+    independent_clocks = False
+
+    def __init__(self, realtime=True):
+        self.realtime = realtime
+
+    def device_name(self, device):
+        return None
+
+    def default_samplerate(self, device, kind="input"):
+        return None
+
+    def input_stream(self, device, samplerate, channels, blocksize, callback, ready=None):
+        return PacedStream(samplerate, channels, blocksize, callback, source=_silence,
+                           realtime=self.realtime, ready=ready)
+
+    def output_stream(self, device, samplerate, channels, blocksize, callback, ready=None):
+        return PacedStream(samplerate, channels, blocksize, callback,
+                           realtime=self.realtime, ready=ready)
+
+
+class _FileSource:
+    """Feeds blocks from a WAV file, then silence once it runs out"""
+
+    def __init__(self, path, samplerate, channels):
+        from batch_process import AudioReader
+
+        self._reader = AudioReader(path)
+        if self._reader.sample_rate != samplerate:
+            raise ValueError(f"{path} is {self._reader.sample_rate} Hz, stream is {samplerate} Hz")
+        if self._reader.channels != channels:
+            raise ValueError(f"{path} has {self._reader.channels} channel(s), stream has {channels}")
+        self.finished = False
+
+    def __call__(self, buffer):
+        # Converted straight from the (memory-mapped) file into the stream's block
+        n = 0 if self.finished else self._reader.read_into(buffer)
+        if not n:
+            self.finished = True
+            buffer.fill(0)
+            return False
+        buffer[n:] = 0
+        return True
+
+    def close(self):
+        self._reader.close()
+
+
+class _FileSink:
+    """Writes every output block to a WAV file"""
+
+    def __init__(self, path, samplerate, channels):
+        from batch_process import AudioWriter
+
+        self._writer = AudioWriter(path, samplerate, channels=channels)
+
+    def __call__(self, buffer):
+        self._writer.write(buffer)
+
+    def close(self):
+        self._writer.close()
+
+
+class _FileStream(PacedStream):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._file = self.source or self.sink
+
+    @property
+    def finished(self):
+        """Input only: the whole file has been fed"""
+        return getattr(self._file, "finished", False)
+
+    def close(self):
+        super().close()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class FileBackend:
+    """WAV file in, WAV file out (the device is the file path)"""
+
+    name = "file"
+    independent_clocks = False
+
+    def __init__(self, realtime=True):
+        self.realtime = realtime
+
+    def device_name(self, device):
+        return None
+
+    def default_samplerate(self, device, kind="input"):
+        """An input file's own rate (output paths are not opened)"""
+        from batch_process import AudioReader
+
+        if kind != "input":
+            return None
+        try:
+            reader = AudioReader(device)
+        except Exception:
+            return None
+        reader.close()
+        return reader.sample_rate
+
+    def input_stream(self, device, samplerate, channels, blocksize, callback, ready=None):
+        return _FileStream(samplerate, channels, blocksize, callback,
+                           source=_FileSource(device, samplerate, channels),
+                           realtime=self.realtime, ready=ready)
+
+    def output_stream(self, device, samplerate, channels, blocksize, callback, ready=None):
+        return _FileStream(samplerate, channels, blocksize, callback,
+                           sink=_FileSink(device, samplerate, channels),
+                           realtime=self.realtime, ready=ready)
+
+
+class _MemoryDevice:
+    """Frames queued for one in-memory device, read back in order"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chunks = deque()
+        self._offset = 0      # Frames already read from _chunks[0]
+        self.pending = 0
+        self.captured = []    # Every block written by an output stream
+        self.listeners = 0    # Open input streams (loopback is only kept for them)
+
+    def push(self, data):
+        with self._lock:
+            self._chunks.append(data)
+            self.pending += len(data)
+
+    def __call__(self, buffer):
+        """Source: next frames into buffer, zero padded; False if none were queued"""
+        with self._lock:
+            if not self.pending:
+                buffer.fill(0)
+                return False
+            filled = 0
+            while filled < len(buffer) and self._chunks:
+                chunk = self._chunks[0]
+                take = min(len(buffer) - filled, len(chunk) - self._offset)
+                buffer[filled:filled + take] = chunk[self._offset:self._offset + take]
+                filled += take
+                self._offset += take
+                if self._offset == len(chunk):
+                    self._chunks.popleft()
+                    self._offset = 0
+            buffer[filled:] = 0
+            self.pending -= filled
+            return True
+
+
+class MemoryBackend:
+    """In-memory loopback for tests and benchmarks
+
+    feed(device, data) queues (frames, channels) audio for input streams on
+    that device; everything output streams write is kept for capture(device)
+    and also looped back to inputs opened on the same device (e.g. a
+    reference stream reading the "speakers").
+    """
+
+    name = "memory"
+    independent_clocks = False
+
+    def __init__(self, realtime=True):
+        self.realtime = realtime
+        self._devices = {}
+        self._lock = threading.Lock()
+
+    def device_name(self, device):
+        return None
+
+    def default_samplerate(self, device, kind="input"):
+        return None
+
+    def _device(self, name):
+        with self._lock:
+            return self._devices.setdefault(name, _MemoryDevice())
+
+    def feed(self, device, data):
+        data = np.asarray(data, dtype=np.float32)
+        self._device(device).push(data.reshape(len(data), -1).copy())
+
+    def pending(self, device):
+        """Frames fed to device that no input stream has read yet"""
+        return self._device(device).pending
+
+    def capture(self, device):
+        """Everything written to device so far, as one (frames, channels) array"""
+        blocks = self._device(device).captured
+        return np.concatenate(blocks) if blocks else np.zeros((0, 1), dtype=np.float32)
+
+    def input_stream(self, device, samplerate, channels, blocksize, callback, ready=None):
+        memory = self._device(device)
+        memory.listeners += 1
+        return PacedStream(samplerate, channels, blocksize, callback, source=memory,
+                           realtime=self.realtime, ready=ready)
+
+    def output_stream(self, device, samplerate, channels, blocksize, callback, ready=None):
+        memory = self._device(device)
+
+        def sink(buffer):
+            block = buffer.copy()
+            memory.captured.append(block)
+            if memory.listeners:
+                memory.push(block)
+
+        return PacedStream(samplerate, channels, blocksize, callback, sink=sink,
+                           realtime=self.realtime, ready=ready)
+
+
+BACKENDS = {
+    "sounddevice": SoundDeviceBackend,
+    "file": FileBackend,
+    "memory": MemoryBackend,
+    "null": NullBackend,
+}
+
+
+def make_backend(spec):
+    """Instantiate a backend from a name or a {"name": ..., **options} dict"""
+    options = dict(spec) if isinstance(spec, dict) else {"name": spec}
+    name = options.pop("name")
+    try:
+        backend = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown audio backend: {name}") from None
+    return backend(**options)
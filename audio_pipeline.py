@@ -0,0 +1,376 @@
+"""
+SpeakerLove - Block Processing Pipeline
+The per-block learning + noise reduction step, shared by the live engine
+and the offline tools so they always run the exact same DSP path.
+
+SignalChain wraps the whole live chain (echo cancellation, denoising,
+downmix) so it can run on a thread or inside a worker process alike,
+optionally at a reduced internal processing rate. Its live parameters
+(suppression strength, threshold, smoothing, gate level) can be changed
+between blocks with set_params() and ramp to their new values.
+"""
+
+import threading
+import time
+from math import gcd
+
+import numpy as np
+
+from delay_estimator import DelayEstimator
+from echo_canceller import EchoCanceller
+from live_params import DENOISER_PARAMETERS, LIVE_PARAMETERS, Ramp, ramp_steps
+from multichannel import Downmix
+from noise_profiles import NoiseProfileStore
+from noise_tracker import NoiseTracker
+from resampling import Decimator, Interpolator, rate_factor
+from streaming_denoiser import StreamingDenoiser
+from vad import VoiceActivityDetector
+
+# noisereduce pulls in scipy.signal and scipy.stats (and torch if installed):
+# seconds of import time, so it is only imported on first use, or ahead of
+# time on a background thread with preload_noisereduce()
+nr = None
+AI_AVAILABLE = None  # Unknown until the import has been tried
+IMPORT_ERROR = None
+_nr_lock = threading.Lock()
+
+
+def load_noisereduce():
+    """Import noisereduce if not done yet (blocks until loaded); returns whether it is available"""
+    global nr, AI_AVAILABLE, IMPORT_ERROR
+    with _nr_lock:
+        if AI_AVAILABLE is None:
+            try:
+                import noisereduce
+                nr = noisereduce
+                AI_AVAILABLE = True
+                print("✓ Noise Reduction Library Loaded")
+            except ImportError as e:
+                AI_AVAILABLE = False
+                IMPORT_ERROR = str(e)
+                print(f"Noise reduction import failed: {e}")
+    return AI_AVAILABLE
+
+
+def preload_noisereduce():
+    """Start importing noisereduce on a daemon thread; returns the thread"""
+    thread = threading.Thread(target=load_noisereduce, name="noisereduce-import", daemon=True)
+    thread.start()
+    return thread
+
+
+# The live denoiser settings on noisereduce's non-stationary gate: the
+# threshold is scaled so the default n_std_thresh (1.5) gives noisereduce's
+# own default (2), and its mask smoothing works on 1024-point frames with a
+# 256-sample hop, below which a smoothing width means "none"
+NR_THRESH_PER_STD = 2.0 / 1.5
+NR_N_FFT = 1024
+NR_HOP = NR_N_FFT // 4
+
+ENGINES = ("noisereduce", "streaming")
+NOISE_MODES = ("fixed", "adaptive")
+
+
+class BlockProcessor:
+    """Learns a noise profile from the first blocks, then denoises each block"""
+
+    def __init__(self, sample_rate=48000, chunk_size=2048, engine="noisereduce", frames_to_learn=10,
+                 noise_mode="fixed", n_fft=1024, hop_length=None, channels=1,
+                 profile_store=None, profile_key=None, denoiser_params=None):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine}")
+        if noise_mode not in NOISE_MODES:
+            raise ValueError(f"Unknown noise mode: {noise_mode}")
+        if noise_mode == "adaptive" and engine != "streaming":
+            raise ValueError("Adaptive noise tracking needs the streaming engine")
+        self.sample_rate = sample_rate
+        self.chunk_size = chunk_size
+        self.engine = engine
+        self.channels = channels
+        # "fixed": profile learned once; "adaptive": learned profile is only
+        # the starting point for a continuously updated estimate
+        self.noise_mode = noise_mode
+        # Streaming analysis window, independent of the block size
+        self.n_fft = n_fft
+        self.hop_length = hop_length or n_fft // 4
+        # Live denoiser settings (live_params.DENOISER_PARAMETERS), for
+        # StreamingDenoiser or, mapped by _noisereduce_params, noisereduce
+        self.denoiser_params = dict(denoiser_params or {})
+        # noisereduce takes the strength per call; ramp it block by block
+        self._strength = Ramp(self.denoiser_params.get("prop_decrease", 1.0),
+                              ramp_steps(chunk_size / sample_rate))
+
+        # For noise profile learning
+        self.noise_profile = None
+        self.learning_frames = []
+        self.learning_mode = True
+        self.frames_to_learn = frames_to_learn  # Learn from first N frames
+
+        # Import now rather than on the audio thread at the first block
+        if engine == "noisereduce":
+            load_noisereduce()
+
+        # Stateful denoiser used by the "streaming" engine
+        self.denoiser = None
+
+        # Cached statistics for this mic (noise_profiles.NoiseProfileStore)
+        self.profile_store = profile_store
+        self.profile_key = profile_key
+        self.profile_cached = False
+        if profile_store is not None:
+            stats = profile_store.get(profile_key, sample_rate, n_fft, channels)
+            if stats is not None:
+                self.set_noise_stats(*stats)
+                self.profile_cached = True
+                print("✓ Noise profile loaded from cache - AI active")
+
+    @property
+    def available(self):
+        """Whether this engine's DSP dependencies are importable"""
+        return AI_AVAILABLE or self.engine == "streaming"
+
+    @property
+    def latency_samples(self):
+        """Algorithmic delay currently added by the denoiser"""
+        return self.denoiser.latency_samples if self.denoiser is not None else 0
+
+    @property
+    def expected_latency_samples(self):
+        """Denoiser delay once learning has finished"""
+        if self.engine != "streaming":
+            return 0
+        hop = self.hop_length
+        return self.n_fft - hop + (hop - gcd(self.chunk_size, hop)) % hop
+
+    def _make_denoiser(self):
+        denoiser = StreamingDenoiser(self.sample_rate, self.chunk_size, self.n_fft, self.hop_length,
+                                     channels=self.channels, **self.denoiser_params)
+        if self.noise_mode == "adaptive":
+            denoiser.noise_tracker = NoiseTracker(denoiser.n_bins, self.sample_rate, denoiser.hop_length)
+        return denoiser
+
+    def set_params(self, **params):
+        """Change denoiser parameters between blocks; they ramp to the new values"""
+        unknown = set(params) - set(DENOISER_PARAMETERS)
+        if unknown:
+            raise ValueError(f"Unknown denoiser parameter(s): {', '.join(sorted(unknown))}")
+        self.denoiser_params.update(params)
+        if "prop_decrease" in params:
+            self._strength.set(params["prop_decrease"])
+        if self.denoiser is not None:
+            self.denoiser.set_params(**params)
+
+    def _noisereduce_params(self):
+        """The live settings as nr.reduce_noise arguments (StreamingDenoiser defaults if unset)"""
+        params = self.denoiser_params
+        # noisereduce smooths the mask symmetrically in time: over the slower of attack and release
+        smooth_ms = max(params.get("attack_ms", 5.0), params.get("release_ms", 50.0))
+        smooth_hz = params.get("freq_smooth_hz", 500.0)
+        return {
+            "thresh_n_mult_nonstationary": NR_THRESH_PER_STD * params.get("n_std_thresh", 1.5),
+            "time_mask_smooth_ms": smooth_ms if smooth_ms >= 1000.0 * NR_HOP / self.sample_rate else None,
+            "freq_mask_smooth_hz": smooth_hz if smooth_hz >= self.sample_rate / (NR_N_FFT / 2) else None,
+        }
+
+    def set_noise_stats(self, mean_db, std_db):
+        """Skip learning: start denoising from precomputed (channels, bins) dB statistics"""
+        if self.engine == "streaming":
+            self.denoiser = self._make_denoiser()
+            self.denoiser.set_noise_stats(mean_db, std_db)
+        # noisereduce's non-stationary mode estimates the noise itself,
+        # so it only needs to know that learning is over
+        self.learning_frames = []
+        self.learning_mode = False
+
+    def _save_profile(self, noise_sample):
+        denoiser = self.denoiser
+        if denoiser is None:
+            denoiser = StreamingDenoiser(self.sample_rate, self.chunk_size, self.n_fft, self.hop_length,
+                                         channels=self.channels)
+            denoiser.learn_noise(noise_sample)
+        self.profile_store.put(self.profile_key, self.sample_rate,
+                               denoiser.noise_mean_db, denoiser.noise_std_db)
+
+    def process(self, mic_audio, gate_gain=None):
+        """Process one (frames, channels) block and return the cleaned block
+
+        gate_gain: skip spectral processing and just attenuate (non-speech)
+        """
+        try:
+            # Learn noise profile from first few frames
+            if self.learning_mode and len(self.learning_frames) < self.frames_to_learn:
+                self.learning_frames.append(mic_audio.copy())
+                if len(self.learning_frames) >= self.frames_to_learn:
+                    # Build noise profile from collected frames
+                    noise_sample = np.concatenate(self.learning_frames)
+                    self.noise_profile = noise_sample
+                    if self.engine == "streaming":
+                        self.denoiser = self._make_denoiser()
+                        self.denoiser.learn_noise(noise_sample)
+                    if self.profile_store is not None:
+                        self._save_profile(noise_sample)
+                    self.learning_mode = False
+                    print("✓ Noise profile learned - AI active")
+                return mic_audio  # Pass through while learning
+
+            if self.denoiser is not None:
+                # Statistics were computed once; state carries over
+                return self.denoiser.process(mic_audio, gate_gain)
+
+            if not self.learning_mode and gate_gain is not None:
+                return mic_audio * np.float32(gate_gain)
+
+            if not self.learning_mode:
+                # Apply noise reduction (noisereduce takes channels first)
+                noise = self.noise_profile
+                if noise is not None:
+                    noise = noise.T if self.channels > 1 else noise.flatten()
+                cleaned = nr.reduce_noise(
+                    y=mic_audio.T if self.channels > 1 else mic_audio.flatten(),
+                    sr=self.sample_rate,
+                    y_noise=noise,
+                    stationary=False,
+                    prop_decrease=self._strength.step(),
+                    n_fft=NR_N_FFT,
+                    **self._noisereduce_params()
+                )
+                # Reshape to match input
+                return cleaned.reshape(self.channels, -1).T
+
+            return mic_audio
+
+        except Exception as e:
+            print(f"Noise reduction error: {e}")
+            return mic_audio
+
+
+def internal_config(sample_rate, blocksize, analysis_size, processing_rate=None):
+    """(factor, rate, blocksize, analysis_size) the DSP runs at for a processing rate
+
+    The rate is the device rate divided by a whole factor; the analysis
+    window keeps roughly the same duration, as a power of two.
+    """
+    factor = rate_factor(sample_rate, processing_rate)
+    if factor == 1:
+        return 1, sample_rate, blocksize, analysis_size
+    if blocksize % factor:
+        raise ValueError(f"Block size {blocksize} is not a multiple of the decimation factor {factor}")
+    analysis = 1 << int(round(np.log2(analysis_size / factor)))
+    return factor, sample_rate // factor, blocksize // factor, analysis
+
+
+class SignalChain:
+    """Echo cancellation -> noise reduction -> downmix for one device block size
+
+    With a processing_rate below the device rate, blocks are decimated on
+    the way in and interpolated on the way out; everything in between runs
+    at the lower rate.
+    """
+
+    def __init__(self, sample_rate=48000, blocksize=2048, engine="noisereduce", frames_to_learn=10,
+                 noise_mode="fixed", analysis_size=1024, channels=1, downmix=True,
+                 steering_delays=None, reference=False, aec_tail_ms=300, auto_delay=True,
+                 profile_path=None, profile_key=None, vad=False, gate_db=-40.0,
+                 processing_rate=None, denoiser_params=None):
+        factor, sample_rate, blocksize, analysis_size = internal_config(
+            sample_rate, blocksize, analysis_size, processing_rate)
+        self.processing_rate = sample_rate
+        self.decimator = self.reference_decimator = self.interpolator = None
+
+        # Profiles are cached per mic; the store is re-opened by path in worker processes
+        store = NoiseProfileStore(profile_path) if profile_key is not None else None
+        self.processor = BlockProcessor(sample_rate, blocksize, engine, frames_to_learn,
+                                        noise_mode, analysis_size, channels=channels,
+                                        profile_store=store, profile_key=profile_key,
+                                        denoiser_params=denoiser_params)
+
+        # Multi-channel mics are mixed (or beamformed) to mono unless downmix is off
+        if steering_delays is not None and factor > 1:
+            steering_delays = np.round(np.asarray(steering_delays) / factor).astype(int)
+        self.downmix = Downmix(channels, delays=steering_delays) if downmix and channels > 1 else None
+        self.output_channels = 1 if self.downmix else channels
+
+        if factor > 1:
+            self.decimator = Decimator(factor, channels)
+            self.interpolator = Interpolator(factor, self.output_channels)
+            if reference:
+                self.reference_decimator = Decimator(factor)
+
+        # Echo cancellation against the speaker loopback, ahead of the denoiser
+        # (one adaptive filter per mic channel: each sees its own echo path)
+        self.echo_cancellers = []
+        self.delay_estimator = None
+        if reference:
+            self.echo_cancellers = [EchoCanceller(blocksize, sample_rate, aec_tail_ms)
+                                    for _ in range(channels)]
+            if auto_delay:
+                # Background GCC-PHAT keeps the reference aligned as devices drift
+                self.delay_estimator = DelayEstimator(sample_rate, blocksize)
+
+        # Non-speech blocks skip spectral processing and are only attenuated
+        self.vad = VoiceActivityDetector(sample_rate, blocksize) if vad else None
+        self._gate = Ramp(10.0 ** (gate_db / 20.0), ramp_steps(blocksize / sample_rate))
+
+        self.denoise_s = 0.0  # Time spent in the denoiser on the last block
+        self.speech = None    # Last VAD decision (None without a VAD)
+
+    @property
+    def resampler_latency_samples(self):
+        """Delay added by the decimation + interpolation filters, at the device rate"""
+        if self.decimator is None:
+            return 0
+        return self.decimator.latency_samples + self.interpolator.latency_samples
+
+    @property
+    def gate_gain(self):
+        return self._gate.value
+
+    def set_params(self, **params):
+        """Change live parameters (live_params.LIVE_PARAMETERS) between blocks"""
+        unknown = set(params) - set(LIVE_PARAMETERS)
+        if unknown:
+            raise ValueError(f"Unknown parameter(s): {', '.join(sorted(unknown))}")
+        if "gate_db" in params:
+            self._gate.set(10.0 ** (params.pop("gate_db") / 20.0))
+        if params:
+            self.processor.set_params(**params)
+
+    def start(self):
+        if self.delay_estimator is not None:
+            self.delay_estimator.start()
+
+    def stop(self):
+        if self.delay_estimator is not None:
+            self.delay_estimator.stop()
+
+    def process(self, mic_audio, reference=None, enabled=True):
+        """Run one (frames, channels) block (modified in place) through the chain"""
+        if self.decimator is not None:
+            mic_audio = self.decimator.process(mic_audio)
+            if reference is not None and self.reference_decimator is not None:
+                reference = self.reference_decimator.process(reference)
+        if self.echo_cancellers:
+            if self.delay_estimator is not None:
+                # The first mic channel stands in for the array's bulk delay
+                self.delay_estimator.push(mic_audio[:, 0], reference[:, 0])
+                for aec in self.echo_cancellers:
+                    aec.align(self.delay_estimator.delay_samples)
+            if enabled:
+                for c, aec in enumerate(self.echo_cancellers):
+                    mic_audio[:, c] = aec.process(mic_audio[:, c], reference[:, 0])
+        started = time.perf_counter()
+
+        if self.vad is not None:
+            self.speech = self.vad.update(mic_audio)
+        if enabled and self.processor.available:
+            gate_gain = self._gate.step()
+            gate = gate_gain if self.speech is False else None
+            cleaned = self.processor.process(mic_audio, gate)
+        else:
+            cleaned = mic_audio
+        if self.downmix is not None:
+            cleaned = self.downmix.process(cleaned)
+        self.denoise_s = time.perf_counter() - started
+        if self.interpolator is not None:
+            cleaned = self.interpolator.process(cleaned)
+        return cleaned
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+SpeakerLove - Offline Batch Processor
+Clean recorded WAV/FLAC files without audio devices or a GUI.
+
+Runs the same learning phase and noise reduction step as the live app
+(audio_pipeline.BlockProcessor), streaming each file through in blocks so
+long recordings never have to fit in memory. Files are processed in
+parallel across a process pool.
+
+--batch is for corpora of many short clips instead: files are read whole
+and denoised together, a few MB of them at a time, by
+batch_denoiser.BatchDenoiser (the streaming engine's spectral gate,
+vectorised across clips), which avoids the per-block overhead. Inputs must share one sample rate; each
+clip learns its noise from its own first ~0.4 s and is denoised from the
+very start.
+
+Usage:
+    python batch_process.py recording.wav more/*.flac -o cleaned/
+    python batch_process.py session.wav --engine streaming --block-size 1024
+    python batch_process.py stereo.wav --downmix
+    python batch_process.py corpus/*.wav -o cleaned/ --batch
+
+PCM and float WAV files are memory-mapped and converted block by block
+(wav_io.py), so the block-wise path never loads a file whole; FLAC needs the optional
+`soundfile` package.
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+try:
+    import soundfile as sf
+    SOUNDFILE_AVAILABLE = True
+except (ImportError, OSError):
+    SOUNDFILE_AVAILABLE = False
+
+from audio_pipeline import ENGINES, NOISE_MODES, BlockProcessor
+from batch_denoiser import BatchDenoiser
+from multichannel import Downmix
+from wav_io import WavReader, WavWriter, is_supported
+
+
+class AudioReader:
+    """Sequential reader of (frames, channels) float32 audio
+
+    WAV files are memory-mapped (wav_io.WavReader): blocks() yields views
+    of one reused buffer, valid until the next block, and read_into()
+    converts straight into the caller's buffer. Other formats need soundfile.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._sf = self._wav = None
+        if path.lower().endswith(".wav"):
+            try:
+                self._wav = WavReader(path)
+            except ValueError:
+                if not SOUNDFILE_AVAILABLE:  # e.g. compressed WAV
+                    raise
+        if self._wav is not None:
+            source = self._wav
+            self.sample_rate = self._wav.sample_rate
+        elif SOUNDFILE_AVAILABLE:
+            source = self._sf = sf.SoundFile(path)
+            self.sample_rate = self._sf.samplerate
+        else:
+            raise RuntimeError("soundfile is required for non-WAV input (pip install soundfile)")
+        self.frames = source.frames
+        self.channels = source.channels
+        self.subtype = source.subtype
+        self.format = source.format
+
+    def read_into(self, out):
+        """Fill out (frames, channels) from the file; returns frames read"""
+        if self._wav is not None:
+            return self._wav.read_into(out)
+        return self._sf.read(len(out), dtype="float32", always_2d=True, out=out).shape[0]
+
+    def blocks(self, block_size):
+        if self._wav is not None:
+            yield from self._wav.blocks(block_size)
+            return
+        while True:
+            data = self._sf.read(block_size, dtype="float32", always_2d=True)
+            if not len(data):
+                return
+            yield data
+
+    def read(self):
+        """The rest of the file as one array"""
+        if self._wav is not None:
+            return self._wav.read()
+        return self._sf.read(dtype="float32", always_2d=True)
+
+    def close(self):
+        (self._sf or self._wav).close()
+
+
+class AudioWriter:
+    """Block-wise writer matching the input file's format where possible (16-bit WAV otherwise)
+
+    PCM and float WAV go through wav_io.WavWriter; anything else needs soundfile.
+    """
+
+    def __init__(self, path, sample_rate, reader=None, channels=1):
+        subtype = reader.subtype if reader else "PCM_16"
+        audio_format = reader.format if reader else "WAV"
+        if (audio_format == "WAV" and is_supported(subtype)) or not SOUNDFILE_AVAILABLE:
+            self._sf = None
+            self._wav = WavWriter(path, sample_rate, channels, subtype if is_supported(subtype) else "PCM_16")
+        else:
+            self._sf = sf.SoundFile(path, "w", samplerate=sample_rate, channels=channels,
+                                    subtype=subtype, format=audio_format)
+            self._wav = None
+
+    def write(self, data):
+        (self._sf or self._wav).write(data)
+
+    def close(self):
+        (self._sf or self._wav).close()
+
+
+def process_file(in_path, out_path, block_size=2048, sample_rate=None, engine="noisereduce",
+                 noise_mode="fixed", downmix=False, denoiser_params=None):
+    """Run one file through the pipeline; returns a summary dict
+
+    denoiser_params: live_params.DENOISER_PARAMETERS values (defaults otherwise)
+    """
+    started = time.perf_counter()
+    reader = AudioReader(in_path)
+    try:
+        if sample_rate and reader.sample_rate != sample_rate:
+            raise RuntimeError(f"{in_path} is {reader.sample_rate} Hz, expected {sample_rate} Hz")
+        sr = reader.sample_rate
+
+        channels = reader.channels
+        processor = BlockProcessor(sr, block_size, engine, noise_mode=noise_mode, channels=channels,
+                                   denoiser_params=denoiser_params)
+        if not processor.available:
+            raise RuntimeError(f"Engine '{engine}' is not available (noisereduce missing)")
+
+        # Every channel is denoised; optionally mix the result down to mono
+        mixer = Downmix(channels) if downmix and channels > 1 else None
+        writer = AudioWriter(out_path, sr, reader, 1 if mixer else channels)
+        block = np.zeros((block_size, channels), dtype=np.float32)
+        # A delaying denoiser only kicks in after learning; trim its delay
+        # from the output then and flush it at the end so files line up.
+        # Output is everything the denoiser returns, minus that delay, cut
+        # at the input's length: a padded last block still returns real
+        # (delayed) samples past its own length
+        delay = skip = 0
+        total = written = 0
+
+        def emit(cleaned):
+            nonlocal skip, written
+            if mixer:
+                cleaned = mixer.process(cleaned)
+            if skip:
+                trimmed = min(skip, len(cleaned))
+                cleaned = cleaned[trimmed:]
+                skip -= trimmed
+            cleaned = cleaned[:total - written]
+            writer.write(cleaned)
+            written += len(cleaned)
+
+        try:
+            while True:
+                n = reader.read_into(block)
+                if not n:
+                    break
+                total += n
+                if not delay and processor.latency_samples:
+                    delay = skip = processor.latency_samples
+                block[n:] = 0
+                emit(processor.process(block))
+
+            # Flush the samples still held back by the denoiser
+            while written < total:
+                block[:] = 0
+                emit(processor.process(block))
+        finally:
+            writer.close()
+    finally:
+        reader.close()
+
+    elapsed = time.perf_counter() - started
+    duration = total / sr
+    return {
+        "input": in_path,
+        "output": out_path,
+        "channels": channels,
+        "seconds": duration,
+        "elapsed": elapsed,
+        "rtf": elapsed / duration if duration else 0.0,
+    }
+
+
+def process_batch(in_paths, out_paths, sample_rate=None, downmix=False, chunk_mb=16):
+    """Denoise whole files together in vectorised passes; returns (summaries, batch report)
+
+    Files are read, denoised and written in groups of about chunk_mb of
+    audio (input and result; a longer file is a group of its own), so
+    memory does not grow with the corpus. Sample rates are checked for
+    every file before any is processed.
+    """
+    if not in_paths:
+        raise ValueError("No input files")
+    infos = []
+    for path in in_paths:
+        reader = AudioReader(path)
+        reader.close()
+        if sample_rate is None:
+            sample_rate = reader.sample_rate
+        elif reader.sample_rate != sample_rate:
+            raise RuntimeError(f"{path} is {reader.sample_rate} Hz, expected {sample_rate} Hz")
+        infos.append(reader)
+
+    # Longest first, so clips of similar length share groups (and buckets)
+    order = sorted(range(len(in_paths)), key=lambda i: infos[i].frames, reverse=True)
+    budget = chunk_mb * 1024 * 1024
+    groups, size = [], budget
+    for i in order:
+        nbytes = 8 * infos[i].frames * infos[i].channels  # float32 in and out
+        if size + nbytes > budget:
+            groups.append([])
+            size = 0
+        groups[-1].append(i)
+        size += nbytes
+
+    denoiser = BatchDenoiser(sample_rate, chunk_mb=chunk_mb)
+    summaries = [None] * len(in_paths)
+    totals = dict.fromkeys(("clips", "rows", "buckets", "chunks", "samples", "padded_samples",
+                            "audio_seconds", "elapsed"), 0)
+    for group in groups:
+        clips = []
+        for i in group:
+            reader = AudioReader(in_paths[i])
+            try:
+                clips.append(reader.read())
+            finally:
+                reader.close()
+        for i, cleaned in zip(group, denoiser.process(clips)):
+            reader = infos[i]
+            if downmix and reader.channels > 1:
+                cleaned = Downmix(reader.channels).process(cleaned)
+            writer = AudioWriter(out_paths[i], sample_rate, reader, cleaned.shape[1])
+            try:
+                writer.write(cleaned)
+            finally:
+                writer.close()
+            summaries[i] = {
+                "input": in_paths[i],
+                "output": out_paths[i],
+                "channels": reader.channels,
+                "seconds": len(cleaned) / sample_rate,
+            }
+        for key in totals:
+            totals[key] += denoiser.report[key]
+
+    report = dict(totals, groups=len(groups))
+    report["padding"] = 1.0 - totals["samples"] / totals["padded_samples"] if totals["padded_samples"] else 0.0
+    report["rtf"] = totals["elapsed"] / totals["audio_seconds"] if totals["audio_seconds"] else 0.0
+    return summaries, report
+
+
+def output_path_for(in_path, output_dir, suffix):
+    base, ext = os.path.splitext(os.path.basename(in_path))
+    directory = output_dir or os.path.dirname(in_path)
+    return os.path.join(directory, f"{base}{suffix}{ext}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Denoise recorded voice files offline")
+    parser.add_argument("inputs", nargs="+", help="WAV/FLAC files to process")
+    parser.add_argument("-o", "--output-dir", help="Where to write results (default: next to input)")
+    parser.add_argument("--suffix", default="_clean", help="Appended to output file names")
+    parser.add_argument("--block-size", type=int, default=2048, help="Samples per block (default: 2048)")
+    parser.add_argument("--sample-rate", type=int, help="Require inputs to have this sample rate")
+    parser.add_argument("--engine", choices=ENGINES, default="noisereduce")
+    parser.add_argument("--noise-mode", choices=NOISE_MODES, default="fixed",
+                        help="adaptive keeps tracking the noise floor (streaming engine only)")
+    parser.add_argument("--downmix", action="store_true",
+                        help="Mix multi-channel input down to mono after denoising")
+    parser.add_argument("--batch", action="store_true",
+                        help="Denoise all inputs together in one vectorised pass (many short clips)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Parallel worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    if args.batch:
+        if args.noise_mode != "fixed":
+            parser.error("--batch learns a fixed noise profile per clip")
+        outputs = [output_path_for(path, args.output_dir, args.suffix) for path in args.inputs]
+        try:
+            summaries, report = process_batch(args.inputs, outputs, args.sample_rate, args.downmix)
+        except Exception as e:
+            print(f"✗ Batch failed: {e}")
+            return 1
+        for result in summaries:
+            print(f"✓ {result['input']} -> {result['output']} ({result['seconds']:.1f}s audio)")
+        print(f"✓ {report['clips']} clips, {report['audio_seconds']:.1f}s audio in {report['elapsed']:.2f}s "
+              f"(RTF {report['rtf']:.4f}, {report['buckets']} length buckets, "
+              f"{100 * report['padding']:.0f}% padding)")
+        return 0
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = {
+            pool.submit(process_file, path, output_path_for(path, args.output_dir, args.suffix),
+                        args.block_size, args.sample_rate, args.engine, args.noise_mode, args.downmix): path
+            for path in args.inputs
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                result = future.result()
+                print(f"✓ {path} -> {result['output']} "
+                      f"({result['seconds']:.1f}s audio, RTF {result['rtf']:.3f})")
+            except Exception as e:
+                failed += 1
+                print(f"✗ {path}: {e}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
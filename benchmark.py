@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+SpeakerLove - Processing Benchmark
+Real-time factor and per-block latency of the processing engines.
+
+Feeds a synthetic voice + game audio + noise signal through the processing
+step of the live pipeline (audio_pipeline.BlockProcessor, the same call
+process_audio makes) and through the old speaker-subtraction engine, over a
+matrix of block sizes and sample rates. Every configuration runs in a fresh
+process so peak RSS is per configuration.
+
+With --pipeline the whole live engine (SpeakerLove: streams, rings,
+processing thread) runs instead, on the in-memory audio backend: "fast"
+pacing measures throughput, "realtime" pacing measures dropouts and the
+end-to-end latency seen at the output. --processing-rate runs the DSP
+decimated (e.g. 48kHz devices, 16kHz denoiser).
+
+--batch compares offline throughput, in audio-hours per CPU-hour, on a
+corpus of synthetic clips of varied length: batch_denoiser.BatchDenoiser
+over all clips at once against the per-block path (BlockProcessor, clip
+by clip, as batch_process.py runs it) for each selected engine.
+
+--startup measures cold start instead: how long a fresh interpreter takes
+to import the app (until the window can open) and then the DSP stack the
+GUI loads in the background, with a python -X importtime breakdown of the
+slowest modules and top-level packages.
+
+Usage:
+    python benchmark.py -o bench.json
+    python benchmark.py --engines streaming --chunk-sizes 256 512 --seconds 5
+    python benchmark.py -o new.json --compare old.json
+    python benchmark.py --pipeline realtime --engines streaming --seconds 5
+    python benchmark.py --sample-rates 48000 --processing-rate 16000
+    python benchmark.py --batch --clips 64 --seconds 8
+    python benchmark.py --startup
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from resampling import rate_factor
+
+ENGINES = ("noisereduce", "streaming", "subtraction")
+CHUNK_SIZES = (256, 512, 1024, 2048, 4096)
+SAMPLE_RATES = (16000, 44100, 48000)
+
+
+def synth_signals(sample_rate, seconds, seed=0):
+    """Return (mic, speaker) test signals: voice + delayed game audio + noise"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+
+    # Voice: vibrato harmonic stack gated by a ~4 Hz syllable envelope,
+    # silent for the first second so the noise profile can be learned
+    f0 = 140 + 20 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 12))
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) ** 2
+    envelope[t < 1.0] = 0
+    voice *= 0.2 * envelope
+
+    # Game audio: a chord plus bursts of broadband noise
+    chord = sum(np.sin(2 * np.pi * f * t) for f in (220, 277, 330, 440)) * 0.05
+    segment = sample_rate // 10
+    gate = (rng.random(len(t) // segment + 1) > 0.8).repeat(segment)[:len(t)]
+    bursts = 0.1 * rng.standard_normal(len(t)) * gate
+    speaker = chord + bursts
+
+    delay = int(0.012 * sample_rate)  # Speaker-to-mic acoustic path
+    mic = voice + 0.6 * np.roll(speaker, delay) + 0.01 * rng.standard_normal(len(t))
+    return mic.astype(np.float32), speaker.astype(np.float32)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, if measurable"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def _make_step(engine, sample_rate, chunk_size, processing_rate=None):
+    """Return (step(mic_block, speaker_block), algorithmic latency callable)"""
+    if engine == "subtraction":
+        from collections import deque
+        from voice_isolator_old import SpeakerLove as OldEngine
+
+        old = OldEngine(None, None, None, sample_rate, chunk_size)
+        speaker_buffer = deque(maxlen=10)
+
+        def step(mic_block, speaker_block):
+            speaker_buffer.append(speaker_block)
+            return old.subtract(mic_block, speaker_buffer)
+
+        return step, lambda: 0
+
+    from audio_pipeline import BlockProcessor, SignalChain
+
+    if processing_rate:
+        # Decimate -> denoise -> interpolate, as the live chain does it
+        chain = SignalChain(sample_rate, chunk_size, engine, processing_rate=processing_rate)
+        if not chain.processor.available:
+            raise RuntimeError("noisereduce is not installed")
+        factor = sample_rate // chain.processing_rate
+
+        def step(mic_block, speaker_block):
+            return chain.process(mic_block[:, None].copy())
+
+        return step, lambda: chain.processor.latency_samples * factor + chain.resampler_latency_samples
+
+    processor = BlockProcessor(sample_rate, chunk_size, engine)
+    if not processor.available:
+        raise RuntimeError("noisereduce is not installed")
+
+    def step(mic_block, speaker_block):
+        return processor.process(mic_block[:, None])
+
+    return step, lambda: processor.latency_samples
+
+
+def measured_latency(mic, out, max_lag):
+    """Lag (samples) at which the output best matches the input"""
+    n = len(mic) + max_lag
+    nfft = 1 << int(np.ceil(np.log2(2 * n)))
+    cc = np.fft.irfft(np.fft.rfft(out[:n], nfft) * np.conj(np.fft.rfft(mic[:n], nfft)), nfft)
+    return int(np.argmax(cc[:max_lag + 1]))
+
+
+def run_pipeline_case(engine, sample_rate, chunk_size, seconds, pacing, processing_rate=None):
+    """Run the full live engine over the in-memory backend"""
+    from audio_backends import MemoryBackend
+    from engine import SpeakerLove
+
+    result = {}
+    mic, _ = synth_signals(sample_rate, seconds)
+    backend = MemoryBackend(realtime=pacing == "realtime")
+    backend.feed("mic", mic)
+    engine_ = SpeakerLove("mic", "out", sample_rate=sample_rate, chunk_size=chunk_size, engine=engine,
+                          backend=backend, processing_rate=processing_rate)
+    if not engine_.processor.available:
+        raise RuntimeError("noisereduce is not installed")
+    engine_.enabled = True
+
+    started = time.perf_counter()
+    engine_.start()
+    while backend.pending("mic") or engine_.input_ring.fill or len(backend.capture("out")) < len(mic):
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - started
+    engine_.stop()
+
+    out = backend.capture("out")[:, 0]
+    snap = engine_.metrics.snapshot()
+    block_ms = np.array([snap["process"]["p50_ms"], snap["process"]["p99_ms"], snap["process"]["max_ms"]])
+    result.update({
+        "pipeline": pacing,
+        "blocks": snap["blocks"],
+        "audio_seconds": len(mic) / sample_rate,
+        "rtf": elapsed / (len(mic) / sample_rate),
+        "block_ms": dict(zip(("p50", "p99", "max"), map(float, block_ms))),
+        "block_budget_ms": snap["block_budget_ms"],
+        "algorithmic_latency_ms": engine_.latency_report()["total_ms"],
+        "measured_latency_ms": 1000.0 * measured_latency(mic, out, sample_rate // 2) / sample_rate,
+        "dropped_input_blocks": snap["dropped_input_blocks"],
+        "dropped_output_blocks": snap["dropped_output_blocks"],
+        "underrun_output_blocks": snap["underrun_output_blocks"],
+        "peak_rss_mb": peak_rss_mb(),
+    })
+    return result
+
+
+def run_case(case):
+    """Benchmark one (engine, sample_rate, chunk_size) configuration"""
+    engine, sample_rate, chunk_size, seconds, pipeline, processing_rate = case
+    result = {"engine": engine, "sample_rate": sample_rate, "chunk_size": chunk_size}
+    if processing_rate:
+        if engine == "subtraction":
+            result["skipped"] = "the subtraction engine has no processing rate"
+            return result
+        # Blocks must split evenly at the lower rate
+        chunk_size -= chunk_size % rate_factor(sample_rate, processing_rate)
+        result.update(processing_rate=processing_rate, chunk_size=chunk_size)
+    if pipeline:
+        try:
+            if engine == "subtraction":
+                raise RuntimeError("the live pipeline has no subtraction engine")
+            result.update(run_pipeline_case(engine, sample_rate, chunk_size, seconds, pipeline,
+                                            processing_rate))
+        except (ImportError, OSError, RuntimeError) as e:
+            result["skipped"] = str(e)
+        return result
+
+    try:
+        step, latency_samples = _make_step(engine, sample_rate, chunk_size, processing_rate)
+    except (ImportError, OSError, RuntimeError) as e:
+        result["skipped"] = str(e)
+        return result
+
+    mic, speaker = synth_signals(sample_rate, seconds)
+    n_blocks = len(mic) // chunk_size
+    times = np.zeros(n_blocks)
+    for i in range(n_blocks):
+        sl = slice(i * chunk_size, (i + 1) * chunk_size)
+        started = time.perf_counter()
+        step(mic[sl], speaker[sl])
+        times[i] = time.perf_counter() - started
+
+    block_ms = times * 1000.0
+    audio_s = n_blocks * chunk_size / sample_rate
+    result.update({
+        "blocks": n_blocks,
+        "audio_seconds": audio_s,
+        "rtf": float(times.sum() / audio_s),
+        "block_ms": {
+            "p50": float(np.percentile(block_ms, 50)),
+            "p99": float(np.percentile(block_ms, 99)),
+            "max": float(block_ms.max()),
+        },
+        "block_budget_ms": 1000.0 * chunk_size / sample_rate,
+        "algorithmic_latency_ms": 1000.0 * (chunk_size + latency_samples()) / sample_rate,
+        "peak_rss_mb": peak_rss_mb(),
+    })
+    return result
+
+
+def _per_block_clip(engine, sample_rate, chunk_size, clip):
+    """Run one clip through BlockProcessor block by block (the per-clip offline path)"""
+    from audio_pipeline import BlockProcessor
+
+    processor = BlockProcessor(sample_rate, chunk_size, engine)
+    if not processor.available:
+        raise RuntimeError("noisereduce is not installed")
+    block = np.zeros((chunk_size, 1), dtype=np.float32)
+    for i in range(0, len(clip), chunk_size):
+        data = clip[i:i + chunk_size]
+        block[:len(data), 0] = data
+        block[len(data):] = 0
+        processor.process(block)
+
+
+def batch_report(sample_rate, clips, seconds, engines, chunk_size=2048):
+    """Audio-hours per CPU-hour: batch denoising vs the per-block path, same corpus"""
+    from batch_denoiser import BatchDenoiser
+
+    rng = np.random.default_rng(0)
+    corpus = [synth_signals(sample_rate, seconds * rng.uniform(0.5, 1.5), seed=i)[0] for i in range(clips)]
+    audio_s = sum(len(c) for c in corpus) / sample_rate
+    results = []
+
+    def record(path, run):
+        try:
+            cpu = time.process_time()
+            wall = time.perf_counter()
+            run()
+            cpu = time.process_time() - cpu
+            wall = time.perf_counter() - wall
+        except (ImportError, OSError, RuntimeError) as e:
+            results.append({"path": path, "skipped": str(e)})
+            print(f"  {path:<24} skipped ({e})")
+            return
+        results.append({"path": path, "cpu_seconds": cpu, "wall_seconds": wall,
+                        "audio_hours_per_cpu_hour": audio_s / cpu if cpu else None})
+        print(f"  {path:<24} {audio_s / cpu:9.1f} audio-h/CPU-h  ({cpu:.2f} s CPU, {wall:.2f} s wall)")
+
+    print(f"Batch throughput: {clips} clips, {audio_s:.0f} s of audio at {sample_rate} Hz")
+    denoiser = BatchDenoiser(sample_rate)
+    record("batch", lambda: denoiser.process(corpus))
+    for engine in engines:
+        if engine == "subtraction":
+            continue
+        record(f"per-block {engine}",
+               lambda: [_per_block_clip(engine, sample_rate, chunk_size, clip) for clip in corpus])
+
+    batch = results[0].get("audio_hours_per_cpu_hour")
+    for r in results[1:]:
+        if batch and r.get("audio_hours_per_cpu_hour"):
+            r["batch_speedup"] = batch / r["audio_hours_per_cpu_hour"]
+            print(f"  batch vs {r['path']}: {r['batch_speedup']:.1f}x")
+    return {"clips": clips, "audio_seconds": audio_s, "sample_rate": sample_rate,
+            "batch": denoiser.report, "results": results}
+
+
+STARTUP_SNIPPET = """
+import time
+started = time.perf_counter()
+import SpeakerLove
+imported = time.perf_counter()
+import audio_pipeline
+audio_pipeline.load_noisereduce()
+print(imported - started, time.perf_counter() - imported)
+"""
+
+
+def import_breakdown(module="SpeakerLove", top=15):
+    """Parse python -X importtime for a fresh import of module
+
+    Returns (total_ms, slowest modules by self time, self time per top-level package).
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, cwd=here)
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us) / 1000.0, int(cumulative_us) / 1000.0))
+    packages = {}
+    for name, self_ms, _ in modules:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0.0) + self_ms
+    total_ms = next((cumulative for name, _, cumulative in modules if name == module), 0.0)
+    slowest = sorted(modules, key=lambda m: m[1], reverse=True)[:top]
+    return total_ms, slowest, dict(sorted(packages.items(), key=lambda p: p[1], reverse=True)[:top])
+
+
+def startup_report(runs=3):
+    """Cold-start timings (best of runs fresh interpreters) plus the import breakdown"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-c", STARTUP_SNIPPET], capture_output=True, text=True, cwd=here)
+        timings.append([float(v) * 1000.0 for v in proc.stdout.split()[-2:]])
+    window_ms = min(t[0] for t in timings)
+    dsp_ms = min(t[1] for t in timings)
+    total_ms, slowest, packages = import_breakdown()
+
+    print(f"Startup (best of {runs}):")
+    print(f"  import SpeakerLove (window can open)  {window_ms:8.1f} ms")
+    print(f"  DSP stack, loaded in the background  {dsp_ms:8.1f} ms")
+    print(f"\nimport SpeakerLove: {total_ms:.1f} ms under -X importtime")
+    print("  Self time by package:")
+    for package, ms in packages.items():
+        print(f"    {package:<40} {ms:8.1f} ms")
+    print("  Slowest modules:")
+    for name, self_ms, cumulative_ms in slowest:
+        print(f"    {name:<40} {self_ms:8.1f} ms  (cumulative {cumulative_ms:.1f} ms)")
+    return {
+        "window_ms": window_ms,
+        "dsp_ms": dsp_ms,
+        "import_ms": total_ms,
+        "packages_ms": packages,
+        "slowest_modules": [{"module": n, "self_ms": s, "cumulative_ms": c} for n, s, c in slowest],
+    }
+
+
+def compare(results, baseline_path):
+    """Print RTF changes against a previous results file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    key = lambda r: (r["engine"], r["sample_rate"], r["chunk_size"], r.get("pipeline"), r.get("processing_rate"))
+    old = {key(r): r for r in baseline["results"] if "rtf" in r}
+
+    print(f"\nCompared to {baseline_path}:")
+    for r in results:
+        prev = old.get(key(r))
+        if prev is None or "rtf" not in r:
+            continue
+        change = (r["rtf"] - prev["rtf"]) / prev["rtf"] * 100 if prev["rtf"] else 0.0
+        flag = "  <- REGRESSION" if change > 10 else ""
+        print(f"  {r['engine']:<12} {r['sample_rate']:>6} Hz {r['chunk_size']:>5}: "
+              f"RTF {prev['rtf']:.4f} -> {r['rtf']:.4f} ({change:+.1f}%){flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark SpeakerLove processing engines")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    parser.add_argument("--chunk-sizes", nargs="+", type=int, default=list(CHUNK_SIZES))
+    parser.add_argument("--sample-rates", nargs="+", type=int, default=list(SAMPLE_RATES))
+    parser.add_argument("--seconds", type=float, default=10.0, help="Signal length per case")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="JSON results file")
+    parser.add_argument("--compare", help="Previous results file to diff against")
+    parser.add_argument("--pipeline", choices=("fast", "realtime"),
+                        help="Benchmark the full live engine on the in-memory backend")
+    parser.add_argument("--processing-rate", type=int,
+                        help="Run the DSP decimated to this rate (e.g. 16000)")
+    parser.add_argument("--startup", action="store_true",
+                        help="Measure cold-start import time instead of processing")
+    parser.add_argument("--batch", action="store_true",
+                        help="Compare batch denoising throughput with the per-block path")
+    parser.add_argument("--clips", type=int, default=32, help="Clips in the --batch corpus")
+    args = parser.parse_args(argv)
+
+    if args.batch:
+        report = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "batch": batch_report(args.sample_rates[0] if len(args.sample_rates) == 1 else 48000,
+                                  args.clips, args.seconds, args.engines),
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+        return 0
+
+    if args.startup:
+        report = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "startup": startup_report(),
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+        return 0
+
+    cases = [(e, sr, cs, args.seconds, args.pipeline, args.processing_rate)
+             for e in args.engines for sr in args.sample_rates for cs in args.chunk_sizes]
+
+    results = []
+    # One fresh process per case: isolates peak RSS and warm caches
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(processes=1, maxtasksperchild=1) as pool:
+        for r in pool.imap(run_case, cases):
+            results.append(r)
+            if "skipped" in r:
+                print(f"  {r['engine']:<12} {r['sample_rate']:>6} Hz {r['chunk_size']:>5}: skipped ({r['skipped']})")
+            else:
+                print(f"  {r['engine']:<12} {r['sample_rate']:>6} Hz {r['chunk_size']:>5}: "
+                      f"RTF {r['rtf']:.4f}  p50 {r['block_ms']['p50']:.2f} ms  "
+                      f"p99 {r['block_ms']['p99']:.2f} ms  max {r['block_ms']['max']:.2f} ms"
+                      + (f"  latency {r['measured_latency_ms']:.1f} ms  underruns {r['underrun_output_blocks']}"
+                         if "pipeline" in r else ""))
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "cpu_count": os.cpu_count(),
+        "seconds": args.seconds,
+        "pipeline": args.pipeline,
+        "processing_rate": args.processing_rate,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Results written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
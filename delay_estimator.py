@@ -0,0 +1,155 @@
+"""
+SpeakerLove - Mic/Loopback Delay Estimator
+Background GCC-PHAT between the mic and the speaker loopback
+
+The processing thread only pushes decimated copies of each block into two
+preallocated history rings. A background thread periodically runs a
+phase-transform cross-correlation over the last second of history (fixed
+FFT size, spectral_core.FFT into preallocated spectra and work buffers)
+and publishes a smoothed delay that a reference-based stage such as the
+echo canceller can align to.
+
+An estimate only counts if its peak stands out twice: against the mean of
+the correlation (min_confidence) and against the best peak elsewhere
+(min_uniqueness). Tonal or periodic references correlate equally well at
+every multiple of their period, so they are skipped and the last delay
+stays in place. Both histories are Hann windowed first, otherwise the
+shared window edges correlate at lag 0 whatever the signal.
+"""
+
+import threading
+import time
+from collections import deque
+from math import gcd
+
+import numpy as np
+
+from spectral_core import FFT, hann
+
+
+class DelayEstimator:
+    """Tracks how far the mic lags the loopback reference, in samples"""
+
+    def __init__(self, sample_rate=48000, block_size=2048, decimation=4, window_s=1.0,
+                 max_delay_ms=250, interval_s=1.0, min_confidence=4.0, min_uniqueness=1.5, history=9):
+        self.sample_rate = sample_rate
+        # Decimate by whole-block averaging, so the factor must divide the block
+        self.decimation = gcd(block_size, decimation)
+        self.rate = sample_rate / self.decimation
+        self.interval_s = interval_s
+        self.min_confidence = min_confidence
+        self.min_uniqueness = min_uniqueness
+
+        self._length = int(window_s * self.rate)
+        self._max_lag = int(max_delay_ms / 1000.0 * self.rate)
+        self._nfft = 1 << int(np.ceil(np.log2(2 * self._length)))
+
+        # History rings (written by push, read by the estimator thread)
+        self._mic = np.zeros(self._length, dtype=np.float32)
+        self._ref = np.zeros(self._length, dtype=np.float32)
+        self._pos = 0
+        self._filled = 0
+
+        # Reused work buffers for the estimator thread: zero-padded histories,
+        # their spectra, the correlation and its +-max_lag window
+        self._fft = FFT()
+        self._window = hann(self._length)
+        self._mic_work = np.zeros(self._nfft)
+        self._ref_work = np.zeros(self._nfft)
+        bins = self._nfft // 2 + 1
+        self._mic_spec = np.zeros(bins, dtype=np.complex128)
+        self._cross = np.zeros(bins, dtype=np.complex128)
+        self._cross_mag = np.zeros(bins)
+        self._cc = np.zeros(self._nfft)
+        self._lags = np.zeros(2 * self._max_lag + 1)
+
+        self.delay_samples = 0     # Smoothed estimate at the full sample rate
+        self.confidence = 0.0      # Peak-to-mean ratio of the last correlation
+        self.uniqueness = 0.0      # Peak over the best peak elsewhere
+        self.estimates = deque(maxlen=history)  # (time, delay) of confident estimates
+
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def delay_ms(self):
+        return 1000.0 * self.delay_samples / self.sample_rate
+
+    def push(self, mic, reference):
+        """Add one block from each stream (called from the processing thread)"""
+        dec = self.decimation
+        mic = np.asarray(mic, dtype=np.float32).reshape(-1, dec).mean(axis=1)
+        reference = np.asarray(reference, dtype=np.float32).reshape(-1, dec).mean(axis=1)
+        n = len(mic)
+        start = self._pos
+        first = min(n, self._length - start)
+        self._mic[start:start + first] = mic[:first]
+        self._ref[start:start + first] = reference[:first]
+        if first < n:
+            self._mic[:n - first] = mic[first:]
+            self._ref[:n - first] = reference[first:]
+        self._pos = (start + n) % self._length
+        self._filled = min(self._filled + n, self._length)
+
+    def estimate(self, now=None):
+        """Run one GCC-PHAT pass; returns the raw lag in samples or None"""
+        if self._filled < self._length:
+            return None
+
+        # Unroll the rings (oldest first) into the windowed work buffers;
+        # the zero padding past _length stays untouched
+        length, pos = self._length, self._pos
+        for ring, work in ((self._mic, self._mic_work), (self._ref, self._ref_work)):
+            work[:length - pos] = ring[pos:]
+            work[length - pos:length] = ring[:pos]
+            work[:length] *= self._window
+
+        # Phase transform: keep only the phase of mic x conj(ref)
+        self._fft.rfft(self._mic_work, self._mic_spec)
+        self._fft.rfft(self._ref_work, self._cross)
+        np.conjugate(self._cross, out=self._cross)
+        self._cross *= self._mic_spec
+        np.abs(self._cross, out=self._cross_mag)
+        self._cross_mag += 1e-12
+        self._cross /= self._cross_mag
+        self._fft.irfft(self._cross, self._nfft, self._cc)
+
+        # Positive lags: mic[t] ~ ref[t - lag]
+        lags, max_lag = self._lags, self._max_lag
+        np.abs(self._cc[-max_lag:], out=lags[:max_lag])
+        np.abs(self._cc[:max_lag + 1], out=lags[max_lag:])
+        peak = int(np.argmax(lags))
+        height = lags[peak]
+        self.confidence = float(height / (lags.mean() + 1e-12))
+        # The main lobe is a couple of lags wide; look for rivals beyond it
+        lags[max(peak - 2, 0):peak + 3] = 0.0
+        self.uniqueness = float(height / (lags.max() + 1e-12))
+        if self.confidence < self.min_confidence or self.uniqueness < self.min_uniqueness:
+            return None
+
+        lag = (peak - self._max_lag) * self.decimation
+        self.estimates.append((now if now is not None else 0.0, lag))
+        self.delay_samples = max(0, int(np.median([d for _, d in self.estimates])))
+        return lag
+
+    def start(self):
+        """Re-estimate every interval_s seconds on a background thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(self.interval_s):
+                try:
+                    self.estimate(time.monotonic())
+                except Exception as e:
+                    print(f"Delay estimation error: {e}")
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=1.0)
+            self._thread = None
@@ -0,0 +1,223 @@
+"""
+SpeakerLove - Device Catalog
+One classified, cached view of the audio devices for the GUI and the CLI
+
+Every device is classified once, in a single pass with precompiled
+matchers, when it is first seen:
+
+    mic             physical capture device (not a virtual/loopback input)
+    loopback        captures what the speakers play (Stereo Mix, VoiceMeeter, ...)
+    virtual_output  virtual cable / VoiceMeeter input, the usual output target
+    speaker         physical playback device (fallback output)
+
+Devices are cached per host API (MME, WASAPI, ...). A refresh re-queries
+PortAudio, compares a cheap per-host-API signature and only re-classifies
+the host APIs that changed. watch() reports what was added and removed, so
+a USB mic that is unplugged and plugged back in reappears (usually at a
+new index) without a manual refresh.
+
+PortAudio only notices added and removed devices when it is restarted,
+which is slow and would break open streams. So it is only restarted on a
+user rescan (refresh()) or when the OS says its devices changed: watch()
+polls os_device_signature(), which reads the OS's own device list without
+touching PortAudio. Pass can_rescan to allow restarts only while no stream
+is running, and query devices and open streams while holding catalog.lock
+so a rescan cannot start in between.
+"""
+
+import os
+import re
+import sys
+import threading
+
+MIC = re.compile(r"microphone|mic|capture|input")
+NOT_MIC = re.compile(r"voicemeeter|what u hear|stereo mix")
+LOOPBACK = re.compile(r"stereo mix|loopback|what u hear|voicemeeter")
+VIRTUAL_OUTPUT = re.compile(r"voicemeeter|vb-audio|cable input")
+SPEAKER = re.compile(r"speaker|sound mapper")
+PREFERRED_OUTPUT = re.compile(r"voicemeeter input")
+
+
+class Device:
+    """One PortAudio device and its classification"""
+
+    def __init__(self, index, info, hostapi):
+        self.index = index
+        self.name = info["name"]
+        self.hostapi = hostapi
+        self.max_input_channels = info["max_input_channels"]
+        self.max_output_channels = info["max_output_channels"]
+        self.default_samplerate = info["default_samplerate"]
+        self.input_latency = info.get("default_low_input_latency", 0.0)
+        self.output_latency = info.get("default_low_output_latency", 0.0)
+
+        name = self.name.lower()
+        self.is_input = self.max_input_channels > 0
+        self.is_output = self.max_output_channels > 0
+        self.loopback = LOOPBACK.search(name) is not None
+        self.mic = self.is_input and MIC.search(name) is not None and NOT_MIC.search(name) is None
+        self.virtual_output = self.is_output and VIRTUAL_OUTPUT.search(name) is not None
+        self.speaker = self.is_output and not self.virtual_output and SPEAKER.search(name) is not None
+
+    @property
+    def key(self):
+        """Identity that survives re-enumeration (indices do not)"""
+        return (self.hostapi, self.name, self.is_input, self.is_output)
+
+    @property
+    def label(self):
+        return f"[{self.index}] {self.name}"
+
+    def __repr__(self):
+        return f"Device({self.label!r}, {self.hostapi!r})"
+
+
+def os_device_signature():
+    """A cheap value that changes when the OS adds or removes audio devices (None if unknown)"""
+    if sys.platform == "win32":
+        import ctypes
+        winmm = ctypes.windll.winmm
+        return winmm.waveInGetNumDevs(), winmm.waveOutGetNumDevs()
+    if os.path.isdir("/dev/snd"):
+        return tuple(sorted(os.listdir("/dev/snd")))  # ALSA device nodes
+    return None
+
+
+_warned_no_rescan = False
+
+
+def query_sounddevice(rescan=False):
+    """[(info, hostapi name)] for every PortAudio device"""
+    global _warned_no_rescan
+    import sounddevice as sd
+    if rescan:
+        # PortAudio takes its device list at initialisation, and restarting
+        # it invalidates every open stream: callers must only rescan with
+        # all streams closed (DeviceCatalog's can_rescan)
+        if hasattr(sd, "_terminate") and hasattr(sd, "_initialize"):
+            sd._terminate()
+            sd._initialize()
+        elif not _warned_no_rescan:
+            _warned_no_rescan = True
+            print("This sounddevice cannot restart PortAudio: hot-plugged devices need an app restart")
+    hostapis = sd.query_hostapis()
+    return [(info, hostapis[info["hostapi"]]["name"]) for info in sd.query_devices()]
+
+
+class DeviceCatalog:
+    """Cached, classified device list with change detection
+
+    query(rescan) returns [(sounddevice-style info dict, host API name)]
+    in device index order; can_rescan() says whether PortAudio may be
+    restarted to pick up hot-plugged devices right now; os_signature()
+    changes when the OS's device list does.
+    """
+
+    def __init__(self, query=query_sounddevice, can_rescan=None, os_signature=os_device_signature):
+        self._query = query
+        self._can_rescan = can_rescan
+        self._os_signature = os_signature
+        self.lock = threading.RLock()
+        self._hostapis = {}      # Host API -> [Device]
+        self._signatures = {}    # Host API -> tuple of (index, name, inputs, outputs)
+        self._devices = None
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def devices(self):
+        """All devices, in index order (enumerated on first use)"""
+        if self._devices is None:
+            self.refresh(rescan=False)
+        return self._devices
+
+    @property
+    def mics(self):
+        return [d for d in self.devices() if d.mic]
+
+    @property
+    def outputs(self):
+        """Output candidates: virtual outputs first, then speakers"""
+        devices = self.devices()
+        return [d for d in devices if d.virtual_output] + [d for d in devices if d.speaker]
+
+    @property
+    def loopbacks(self):
+        return [d for d in self.devices() if d.loopback]
+
+    def default_output(self, outputs=None):
+        """The VoiceMeeter input if there is one, else the first candidate"""
+        outputs = self.outputs if outputs is None else outputs
+        return next((d for d in outputs if PREFERRED_OUTPUT.search(d.name.lower())),
+                    outputs[0] if outputs else None)
+
+    def find(self, key):
+        """The device with this Device.key, wherever it is now, or None"""
+        return next((d for d in self.devices() if d.key == key), None)
+
+    def refresh(self, rescan=True):
+        """Re-enumerate; returns (added, removed) devices since the last refresh"""
+        with self.lock:
+            rescan = rescan and self._devices is not None and (self._can_rescan is None or self._can_rescan())
+            entries = self._query(rescan)
+
+            grouped = {}
+            for index, (info, hostapi) in enumerate(entries):
+                grouped.setdefault(hostapi, []).append((index, info))
+
+            added, removed = [], []
+            hostapis = {}
+            for hostapi, members in grouped.items():
+                signature = tuple((i, info["name"], info["max_input_channels"], info["max_output_channels"])
+                                  for i, info in members)
+                if self._signatures.get(hostapi) == signature:
+                    hostapis[hostapi] = self._hostapis[hostapi]  # Unchanged: keep the classified list
+                    continue
+                hostapis[hostapi] = [Device(i, info, hostapi) for i, info in members]
+                self._signatures[hostapi] = signature
+                if self._devices is not None:
+                    before = {d.key for d in self._hostapis.get(hostapi, ())}
+                    after = {d.key for d in hostapis[hostapi]}
+                    added += [d for d in hostapis[hostapi] if d.key not in before]
+                    removed += [d for d in self._hostapis.get(hostapi, ()) if d.key not in after]
+            for hostapi in set(self._hostapis) - set(hostapis):
+                removed += self._hostapis[hostapi]
+                del self._signatures[hostapi]
+
+            self._hostapis = hostapis
+            self._devices = sorted((d for members in hostapis.values() for d in members), key=lambda d: d.index)
+        return added, removed
+
+    def watch(self, on_change, interval_s=3.0):
+        """Rescan on a daemon thread when the OS's devices change; on_change(added, removed) after
+
+        The OS signature is checked every interval_s; PortAudio itself is
+        left alone until it changes. A change seen while can_rescan()
+        refuses is picked up once it allows.
+        """
+        if self._watcher is not None:
+            return
+
+        def run():
+            seen = self._os_signature()
+            while not self._stop.wait(interval_s):
+                try:
+                    current = self._os_signature()
+                    if current == seen or (self._can_rescan is not None and not self._can_rescan()):
+                        continue
+                    added, removed = self.refresh()
+                    seen = current
+                except Exception as e:
+                    print(f"Device refresh failed: {e}")
+                    continue
+                if added or removed:
+                    on_change(added, removed)
+
+        self._stop.clear()
+        self._watcher = threading.Thread(target=run, name="device-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
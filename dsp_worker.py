@@ -0,0 +1,345 @@
+"""
+SpeakerLove - DSP Worker Processes
+Runs signal chains in their own interpreters, away from Tk and PortAudio
+
+Heavy noise reduction on a thread shares the GIL with the Tk mainloop and
+the PortAudio callbacks, so a slow block or a GUI redraw can stall the
+audio. With a worker, blocks cross the process boundary through
+SharedRingBuffer instances: the callbacks in the main process only copy
+into and out of shared memory, and nothing is pickled per block.
+
+A DSPPool runs up to one worker process per core, each hosting any number
+of sessions (one SignalChain per session). Sessions are added and removed
+at runtime through a small control queue. A watchdog thread in the main
+process drains each session's per-block timings into its PipelineMetrics
+and restarts a worker if it dies or stops making progress. The shared
+rings, and therefore the device streams, survive a restart; the sessions
+it hosted are re-created and relearn their noise profiles.
+
+Live parameter changes reach a session through its SharedParameterChannel,
+polled by the worker between blocks.
+"""
+
+import multiprocessing as mp
+import os
+import queue
+import signal
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from jitter_buffer import JitterBuffer
+from live_params import SharedParameterChannel
+from ring_buffer import SharedRingBuffer
+
+
+class _WorkerSession:
+    """Worker-side half of a DSPSession"""
+
+    def __init__(self, chain_kwargs, input_ring, output_ring, reference_ring, timing_ring, flags_name,
+                 drift_compensation, params):
+        from audio_pipeline import SignalChain
+
+        self.chain = SignalChain(**chain_kwargs)
+        self.input_ring = input_ring
+        self.output_ring = output_ring
+        self.jitter_buffer = None
+        if drift_compensation:
+            self.jitter_buffer = JitterBuffer(output_ring, chain_kwargs["sample_rate"], chain_kwargs["blocksize"])
+        self.output = self.jitter_buffer or output_ring
+        self.reference_ring = reference_ring
+        self.timing_ring = timing_ring
+        self.params = params  # A restarted worker picks up the latest values on its first poll
+        self._flags_shm = shared_memory.SharedMemory(name=flags_name)
+        self._flags = np.ndarray((1,), dtype=np.int64, buffer=self._flags_shm.buf)
+
+        self.block = np.zeros((chain_kwargs["blocksize"], input_ring.channels), dtype=np.float32)
+        self.ref_block = np.zeros((len(self.block), 1), dtype=np.float32)
+        self._timing = np.zeros((1, 4), dtype=np.float32)
+        self.block_s = chain_kwargs["blocksize"] / chain_kwargs["sample_rate"]
+        self.chain.start()
+
+    def step(self, key, errors):
+        """Process one block if a whole one is waiting; returns whether it did"""
+        if not self.input_ring.read_into(self.block):
+            return False
+        started = time.perf_counter()
+        try:
+            changes = self.params.poll()
+            if changes:
+                self.chain.set_params(**changes)
+            if self.reference_ring is not None:
+                # Missing loopback audio counts as silence (and an underrun)
+                self.reference_ring.read_into(self.ref_block, zero_fill=True)
+            self.output.write(self.chain.process(self.block, self.ref_block, bool(self._flags[0])))
+        except Exception as e:
+            errors.put((key, str(e)))
+            self.output.write(self.block)
+        speech = self.chain.speech
+        drift = np.nan if self.jitter_buffer is None else self.jitter_buffer.drift_ppm
+        self._timing[0] = (time.perf_counter() - started, self.chain.denoise_s,
+                           -1 if speech is None else speech, drift)
+        self.timing_ring.write(self._timing)
+        return True
+
+    def close(self):
+        self.chain.stop()
+        for ring in (self.input_ring, self.output_ring, self.reference_ring, self.timing_ring):
+            if ring is not None:
+                ring.close()
+        self.params.close()
+        self._flags = None
+        self._flags_shm.close()
+
+
+def _worker_main(control, heartbeat, stop, errors):
+    """Worker process entry point: serve every hosted session until told to stop"""
+    # Shutdown comes from the main process, not from a Ctrl+C on the process group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    sessions = {}
+    poll_s = 0.001
+    try:
+        while not stop.is_set():
+            heartbeat.value = time.monotonic()
+            while True:
+                try:
+                    command, key, args = control.get_nowait()
+                except queue.Empty:
+                    break
+                except Exception as e:
+                    # e.g. a session whose shared memory was freed before it arrived
+                    errors.put((None, f"Dropped control message: {e}"))
+                    continue
+                try:
+                    if command == "add":
+                        sessions[key] = _WorkerSession(*args)
+                    elif command == "remove" and key in sessions:
+                        sessions.pop(key).close()
+                except Exception as e:
+                    errors.put((key, f"Session {command} failed: {e}"))
+                # Poll a few times per block; an Event set from a callback would cost a lock
+                poll_s = min([s.block_s for s in sessions.values()], default=0.004) / 4
+
+            busy = False
+            for key, session in list(sessions.items()):
+                busy = session.step(key, errors) or busy
+            if not busy:
+                time.sleep(poll_s)
+    finally:
+        for session in sessions.values():
+            session.close()
+
+
+class DSPSession:
+    """Main-process handle for one signal chain hosted by a DSPPool worker"""
+
+    def __init__(self, chain_kwargs, channels, output_channels, capacity, metrics=None,
+                 drift_compensation=False, params=None):
+        self.chain_kwargs = dict(chain_kwargs)
+        self.metrics = metrics
+        self.drift_compensation = drift_compensation
+
+        self.input_ring = SharedRingBuffer(capacity, channels)
+        self.output_ring = SharedRingBuffer(capacity, output_channels)
+        self.reference_ring = SharedRingBuffer(capacity) if chain_kwargs.get("reference") else None
+        # (process_s, denoise_s, speech or -1, drift ppm or NaN) per block,
+        # drained by the pool's watchdog
+        self.timing_ring = SharedRingBuffer(1024, 4)
+        # Live parameters (initial values as the chain was built with)
+        self.params = SharedParameterChannel(params or {})
+        # Flags the worker reads every block: [enabled]
+        self._flags_shm = shared_memory.SharedMemory(create=True, size=8)
+        self._flags = np.ndarray((1,), dtype=np.int64, buffer=self._flags_shm.buf)
+        self._flags[0] = 0
+        self._closed = False
+
+    @property
+    def enabled(self):
+        return bool(self._flags[0])
+
+    @enabled.setter
+    def enabled(self, value):
+        self._flags[0] = 1 if value else 0
+
+    @property
+    def closed(self):
+        """The shared memory is freed; a new session is needed to run again"""
+        return self._closed
+
+    def _worker_args(self):
+        return (self.chain_kwargs, self.input_ring, self.output_ring, self.reference_ring,
+                self.timing_ring, self._flags_shm.name, self.drift_compensation, self.params)
+
+    def drain(self):
+        """Forward the worker's block timings to the metrics"""
+        timing = np.zeros((1, 4), dtype=np.float32)
+        while self.timing_ring.read_into(timing):
+            if self.metrics is not None:
+                speech = None if timing[0, 2] < 0 else bool(timing[0, 2])
+                self.metrics.record_block(float(timing[0, 0]), float(timing[0, 1]), speech)
+                if not np.isnan(timing[0, 3]):
+                    self.metrics.record_drift(float(timing[0, 3]))
+
+    def close(self):
+        """Free the shared memory (after the session left its pool)"""
+        if self._closed:
+            return
+        self._closed = True
+        for ring in (self.input_ring, self.output_ring, self.reference_ring, self.timing_ring):
+            if ring is not None:
+                ring.close()
+        self.params.close()
+        self._flags = None
+        self._flags_shm.close()
+        self._flags_shm.unlink()
+
+
+class _Worker:
+    """One worker process and the sessions assigned to it"""
+
+    def __init__(self, ctx):
+        self._ctx = ctx
+        self.sessions = {}
+        self.heartbeat = ctx.Value("d", 0.0, lock=False)
+        self.process = None
+        self.control = None
+        self._stop = None
+        self.grace_until = 0.0
+
+    def spawn(self, errors, grace_s):
+        # Fresh queue each time so a dead worker's backlog is not replayed
+        self.control = self._ctx.Queue()
+        self._stop = self._ctx.Event()
+        self.heartbeat.value = time.monotonic()
+        self.grace_until = time.monotonic() + grace_s
+        self.process = self._ctx.Process(target=_worker_main,
+                                         args=(self.control, self.heartbeat, self._stop, errors),
+                                         daemon=True)
+        self.process.start()
+        for key, session in self.sessions.items():
+            self.control.put(("add", key, session._worker_args()))
+
+    def kill(self):
+        if self.process is None:
+            return
+        self._stop.set()
+        self.process.join(timeout=1.0)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=1.0)
+        self.process = None
+
+
+class DSPPool:
+    """Schedules DSPSessions across up to one worker process per core"""
+
+    # Spawning re-imports the DSP modules, so allow for a slow first start
+    STARTUP_GRACE_S = 10.0
+
+    def __init__(self, workers=None, hang_timeout_s=2.0, watchdog_interval_s=0.05):
+        self.max_workers = workers or os.cpu_count() or 1
+        self.hang_timeout_s = hang_timeout_s
+        self.watchdog_interval_s = watchdog_interval_s
+
+        # Spawn, not fork: the parent has Tk and PortAudio threads running
+        self._ctx = mp.get_context("spawn")
+        self._errors = self._ctx.Queue()
+        self._workers = []
+        self._sessions = {}  # key -> (worker, session)
+        self._lock = threading.Lock()
+        self._watchdog = None
+        self._running = False
+        self.restarts = 0
+
+    @property
+    def workers(self):
+        return len(self._workers)
+
+    def __contains__(self, key):
+        return key in self._sessions
+
+    def add(self, key, session):
+        """Host a session on the least loaded worker (spawning one if allowed)"""
+        with self._lock:
+            if key in self._sessions:
+                raise ValueError(f"Session {key!r} is already running")
+            worker = min(self._workers, key=lambda w: len(w.sessions), default=None)
+            if worker is None or (worker.sessions and len(self._workers) < self.max_workers):
+                worker = _Worker(self._ctx)
+                self._workers.append(worker)
+            worker.sessions[key] = session
+            self._sessions[key] = (worker, session)
+            if worker.process is None:
+                worker.spawn(self._errors, self.STARTUP_GRACE_S)
+            else:
+                worker.control.put(("add", key, session._worker_args()))
+        self._ensure_watchdog()
+
+    def remove(self, key):
+        """Stop hosting a session; the others keep running"""
+        with self._lock:
+            worker, session = self._sessions.pop(key)
+            del worker.sessions[key]
+            if worker.process is not None:
+                worker.control.put(("remove", key, None))
+        session.drain()
+
+    def _ensure_watchdog(self):
+        if self._watchdog is None:
+            self._running = True
+            self._watchdog = threading.Thread(target=self._watch, daemon=True)
+            self._watchdog.start()
+
+    def _drain_errors(self):
+        while True:
+            try:
+                key, error = self._errors.get_nowait()
+            except queue.Empty:
+                return
+            print(f"Process Error [{key}]: {error}")
+            entry = self._sessions.get(key)
+            if entry is not None and entry[1].metrics is not None:
+                entry[1].metrics.record_error(error)
+
+    def _watch(self):
+        while self._running:
+            time.sleep(self.watchdog_interval_s)
+            with self._lock:
+                for _, session in self._sessions.values():
+                    session.drain()
+                self._drain_errors()
+                if not self._running:
+                    break
+                now = time.monotonic()
+                for worker in self._workers:
+                    if worker.process is None:
+                        continue
+                    alive = worker.process.is_alive()
+                    hung = now > worker.grace_until and now - worker.heartbeat.value > self.hang_timeout_s
+                    if alive and not hung:
+                        continue
+                    reason = "stopped responding" if alive else f"exited with code {worker.process.exitcode}"
+                    print(f"DSP worker {reason} - restarting")
+                    for session in worker.sessions.values():
+                        if session.metrics is not None:
+                            session.metrics.record_error(f"DSP worker {reason}")
+                    worker.kill()
+                    self.restarts += 1
+                    worker.spawn(self._errors, self.STARTUP_GRACE_S)
+
+    def close(self):
+        """Stop every worker (sessions are left for their owners to close)"""
+        self._running = False
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1.0)
+            self._watchdog = None
+        with self._lock:
+            for worker in self._workers:
+                worker.kill()
+            self._workers = []
+            for _, session in self._sessions.values():
+                session.drain()
+            self._drain_errors()
+            self._sessions = {}
@@ -0,0 +1,137 @@
+"""
+SpeakerLove - Acoustic Echo Canceller
+Partitioned-block frequency-domain adaptive filter (PBFDAF / MDF)
+
+Models the speaker-to-mic path as an FIR filter of a few hundred
+milliseconds, split into block-sized partitions that are filtered and
+adapted in the frequency domain (overlap-save, 2x block FFTs). The
+estimated echo of the loopback reference is subtracted from the mic.
+All partitions are handled in one vectorised NumPy expression per block.
+
+A bulk delay line in front of the filter lets the tail be spent on the
+room response instead of on device/driver latency (see align()).
+"""
+
+import numpy as np
+
+
+class EchoCanceller:
+    """Removes the loopback reference's echo from mic blocks of a fixed size"""
+
+    # Headroom kept ahead of the measured delay so the echo path stays causal
+    ALIGN_GUARD_MS = 5
+
+    def __init__(self, block_size, sample_rate=48000, tail_ms=300, mu=0.5, power_smoothing=0.9,
+                 max_delay_ms=250):
+        self.block_size = block_size
+        self.sample_rate = sample_rate
+        self.n_partitions = max(1, int(np.ceil(tail_ms / 1000.0 * sample_rate / block_size)))
+        self.mu = mu
+        self._lambda = power_smoothing
+
+        n = block_size
+        self.n_bins = n + 1  # rfft of 2N samples
+        self.max_delay = int(max_delay_ms / 1000.0 * sample_rate)
+        self.delay = 0  # Bulk reference delay in samples
+        self.reset()
+
+        # Keep the update well conditioned when the reference is quiet
+        self._reg = np.float32(1e-6 * n)
+
+    @property
+    def tail_ms(self):
+        return 1000.0 * self.n_partitions * self.block_size / self.sample_rate
+
+    def reset(self):
+        """Forget the learned echo path"""
+        n = self.block_size
+        self.weights = np.zeros((self.n_partitions, self.n_bins), dtype=np.complex64)
+        self._ref_spectra = np.zeros((self.n_partitions, self.n_bins), dtype=np.complex64)
+        self._ref_prev = np.zeros(n, dtype=np.float32)
+        self._power = np.zeros(self.n_bins, dtype=np.float32)
+        self._newest = 0        # Row of _ref_spectra holding the latest block
+        self._constrain = 0     # Partition whose gradient constraint is due
+        self._delay_buf = np.zeros(self.max_delay + n, dtype=np.float32)
+        self._delay_pos = 0
+        self._ref_delayed = np.zeros(n, dtype=np.float32)
+        self._ramp = np.arange(n)
+
+    def align(self, delay_samples):
+        """Delay the reference by a measured mic lag, minus a small guard
+
+        The adapted echo path moves by the same amount, so a realignment
+        does not start the filter converging again.
+        """
+        guard = int(self.ALIGN_GUARD_MS / 1000.0 * self.sample_rate)
+        delay = int(min(max(delay_samples - guard, 0), self.max_delay))
+        if delay != self.delay:
+            self._shift_weights(delay - self.delay)
+            self.delay = delay
+
+    def _shift_weights(self, shift):
+        """Move the filter's taps shift samples earlier (later if negative)"""
+        n = self.block_size
+        # Constrained partitions: the first N of each 2N-sample impulse response
+        taps = np.fft.irfft(self.weights, n=2 * n, axis=-1)[:, :n].reshape(-1)
+        moved = np.zeros((self.n_partitions, 2 * n))
+        shifted = np.zeros_like(taps)
+        if 0 <= shift < len(taps):
+            shifted[:len(taps) - shift] = taps[shift:]
+        elif -len(taps) < shift < 0:
+            shifted[-shift:] = taps[:shift]
+        moved[:, :n] = shifted.reshape(self.n_partitions, n)
+        self.weights[:] = np.fft.rfft(moved, axis=-1)
+
+    def _delayed(self, reference):
+        """Push reference into the delay line and return the block delay samples ago"""
+        n = self.block_size
+        size = len(self._delay_buf)
+        idx = (self._delay_pos + self._ramp) % size
+        self._delay_buf[idx] = reference
+        read = (self._delay_pos - self.delay + self._ramp) % size
+        self._ref_delayed[:] = self._delay_buf[read]
+        self._delay_pos = (self._delay_pos + n) % size
+        return self._ref_delayed
+
+    def process(self, mic, reference):
+        """Return mic with the reference echo removed (1-D blocks of block_size)"""
+        n = self.block_size
+        mic = np.asarray(mic, dtype=np.float32).reshape(-1)
+        reference = np.asarray(reference, dtype=np.float32).reshape(-1)
+        if self.delay:
+            reference = self._delayed(reference)
+        elif self.max_delay:
+            self._delayed(reference)  # Keep the line primed for a later align()
+
+        # Newest reference spectrum over [previous block, this block]
+        self._newest = (self._newest - 1) % self.n_partitions
+        X = np.fft.rfft(np.concatenate([self._ref_prev, reference]))
+        self._ref_spectra[self._newest] = X
+        self._ref_prev[:] = reference  # Copy: callers may reuse their block buffer
+
+        # Partition p pairs with the reference from p blocks ago
+        order = (self._newest + np.arange(self.n_partitions)) % self.n_partitions
+        ref_hist = self._ref_spectra[order]
+
+        # Echo estimate (overlap-save: keep the last N samples)
+        echo = np.fft.irfft((ref_hist * self.weights).sum(axis=0), n=2 * n)[n:]
+        error = mic - echo
+
+        # Normalised frequency-domain gradient step
+        power = X.real ** 2 + X.imag ** 2
+        if not self._power.any():
+            self._power[:] = power  # Start from the first block, not from zero
+        self._power *= self._lambda
+        self._power += (1.0 - self._lambda) * power
+        E = np.fft.rfft(np.concatenate([np.zeros(n, dtype=np.float32), error]))
+        step = (self.mu * E / (self.n_partitions * self._power + self._reg)).astype(np.complex64)
+        self.weights += np.conj(ref_hist) * step
+
+        # Gradient constraint, one partition per block to spread the cost
+        p = self._constrain
+        taps = np.fft.irfft(self.weights[p], n=2 * n)
+        taps[n:] = 0
+        self.weights[p] = np.fft.rfft(taps)
+        self._constrain = (p + 1) % self.n_partitions
+
+        return error.astype(np.float32)
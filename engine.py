@@ -0,0 +1,539 @@
+"""
+SpeakerLove - Engine
+The real-time pipeline as a library, without any GUI
+
+Everything between the devices - streams, rings, echo cancellation, noise
+reduction, drift compensation, worker processes - driven from plain
+Python, so scripts, the session server and the Tk app share one API:
+
+    from engine import EngineConfig, SpeakerLove
+
+    config = EngineConfig(mic_device=3, output_device=7, engine="streaming",
+                          metrics_log_interval=5)
+    engine = SpeakerLove(config=config, on_error=log_error, on_metrics=store)
+    engine.enabled = True
+    if not engine.start():
+        print(engine.last_error)
+    engine.reconfigure(prop_decrease=0.8)  # Live: ramps in, no restart
+    engine.reconfigure(output_device=9)    # Live: DSP state stays warm
+    engine.reconfigure(vad=True)           # Restarts with the new settings
+    engine.stop()
+
+Settings live in EngineConfig; runtime objects (backend, shared DSP pool,
+callbacks) are constructor arguments. Live parameters travel to the
+processing loop over a lock-free live_params.ParameterChannel.
+"""
+
+import dataclasses
+import math
+import threading
+import time
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+from audio_backends import SoundDeviceBackend
+from audio_pipeline import ENGINES, NOISE_MODES, BlockProcessor, SignalChain, internal_config
+from dsp_worker import DSPPool, DSPSession
+from jitter_buffer import JitterBuffer
+from live_params import DENOISER_PARAMETERS, LIVE_PARAMETERS, ParameterChannel
+from metrics import PipelineMetrics
+from resampling import Decimator, rate_factor
+from ring_buffer import RingBuffer
+from session_recorder import MIC, OUTPUT, REFERENCE, SessionRecorder
+
+Device = Union[int, str, None]
+
+
+@dataclasses.dataclass(frozen=True)
+class EngineConfig:
+    """Settings of one mic -> output pipeline (validated on creation)"""
+
+    mic_device: Device = None
+    output_device: Device = None
+    sample_rate: Optional[int] = None        # None: the mic's default rate
+    chunk_size: int = 2048
+    engine: Optional[str] = None             # None: "streaming" if low_latency else "noisereduce"
+    buffer_blocks: int = 4
+    metrics_log_interval: Optional[float] = None
+    noise_mode: str = "fixed"
+    low_latency: bool = False
+    blocksize: Optional[int] = None
+    analysis_size: Optional[int] = None
+    reference_device: Device = None          # Speaker loopback for echo cancellation
+    aec_tail_ms: float = 300
+    auto_delay: bool = True
+    channels: int = 1
+    downmix: bool = True
+    steering_delays: Optional[Sequence[float]] = None
+    worker_process: bool = False
+    profile_cache: bool = True
+    profile_path: Optional[str] = None
+    vad: bool = False
+    gate_db: float = -40.0
+    prop_decrease: float = 1.0               # Suppression strength, 0..1
+    n_std_thresh: float = 1.5
+    attack_ms: float = 5.0
+    release_ms: float = 50.0
+    freq_smooth_hz: float = 500.0
+    drift_compensation: Optional[bool] = None  # None: only for sound cards
+    processing_rate: Optional[int] = None
+    record_path: Optional[str] = None        # Directory for a session_recorder log of every run
+    record_max_mb: float = 256
+
+    def __post_init__(self):
+        if self.engine is not None and self.engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {self.engine}")
+        if self.noise_mode not in NOISE_MODES:
+            raise ValueError(f"Unknown noise mode: {self.noise_mode}")
+        if self.low_latency and self.engine not in (None, "streaming"):
+            raise ValueError("Low-latency mode needs the streaming engine")
+        if self.channels < 1 or self.buffer_blocks < 2:
+            raise ValueError("Need at least one channel and two buffered blocks")
+        if not 0.0 <= self.prop_decrease <= 1.0:
+            raise ValueError("prop_decrease must be between 0 and 1")
+        if min(self.attack_ms, self.release_ms, self.freq_smooth_hz) < 0:
+            raise ValueError("Smoothing times and widths cannot be negative")
+        if self.record_max_mb <= 0:
+            raise ValueError("record_max_mb must be positive")
+
+    def replace(self, **changes):
+        """A copy with some values changed"""
+        return dataclasses.replace(self, **changes)
+
+    def live_values(self):
+        """The values that can change while running (live_params.LIVE_PARAMETERS)"""
+        return {name: getattr(self, name) for name in LIVE_PARAMETERS}
+
+
+class SpeakerLove:
+    """Core audio processing engine using noise reduction"""
+    
+    ENGINES = ENGINES
+    NOISE_MODES = NOISE_MODES
+    
+    # Low-latency mode: small device blocks, short sliding analysis window
+    LOW_LATENCY_BLOCKSIZE = 128
+    LOW_LATENCY_ANALYSIS = 512
+
+    def __init__(self, mic_device=None, output_device=None, config=None, backend=None, dsp_pool=None,
+                 name=None, on_error=None, on_metrics=None, **options):
+        if config is None:
+            config = EngineConfig(mic_device, output_device, **options)
+        elif mic_device is not None or output_device is not None or options:
+            raise TypeError("Pass either a config or device/option arguments, not both")
+        self.config = config
+        
+        # Streams come from sound cards unless a file/null backend is given
+        self.backend = backend or SoundDeviceBackend()
+        self._shared_pool = dsp_pool
+        self._name = name
+        
+        # on_error(error): start failures and processing errors, the latter
+        # from a background thread (DSP worker errors arrive as messages);
+        # on_metrics(snapshot): every config.metrics_log_interval seconds
+        self.on_error = on_error
+        self.on_metrics = on_metrics
+        self.last_error = None
+        
+        self.running = False
+        self._enabled = False
+        self._process_thread = None
+        self._build()
+
+    def _build(self):
+        """Create rings, DSP chain and metrics for the current config"""
+        config = self.config
+        engine = config.engine or ("streaming" if config.low_latency else "noisereduce")
+        mic_device, output_device = config.mic_device, config.output_device
+        sample_rate, chunk_size, channels = config.sample_rate, config.chunk_size, config.channels
+        noise_mode, processing_rate = config.noise_mode, config.processing_rate
+        self.mic_device = mic_device
+        self.output_device = output_device
+        self.reference_device = config.reference_device  # Speaker loopback for echo cancellation
+        
+        # Open the streams at the mic's own rate so PortAudio does not resample
+        if sample_rate is None:
+            sample_rate = self.backend.default_samplerate(mic_device) or 48000
+            output_rate = self.backend.default_samplerate(output_device, "output")
+            if output_rate and output_rate != sample_rate:
+                print(f"Output device runs at {output_rate}Hz; it will resample from {sample_rate}Hz")
+        self.sample_rate = sample_rate
+        self.chunk_size = chunk_size
+        self.engine = engine
+        self.low_latency = config.low_latency
+        self.channels = channels  # Mic channels, all denoised in one batch
+        
+        # Device block size; the denoiser's analysis window is independent
+        self.blocksize = config.blocksize or (self.LOW_LATENCY_BLOCKSIZE if config.low_latency else chunk_size)
+        analysis_size = config.analysis_size or (self.LOW_LATENCY_ANALYSIS if config.low_latency else 1024)
+        
+        # Optional lower DSP rate (e.g. 16000): blocks must split evenly
+        factor = rate_factor(sample_rate, processing_rate)
+        self.blocksize -= self.blocksize % factor
+        
+        # Echo cancellation -> noise reduction -> downmix (shared with the worker process)
+        # Learn from the same amount of audio whatever the block size; a cached
+        # profile for this mic skips learning altogether
+        chain_kwargs = dict(
+            sample_rate=sample_rate, blocksize=self.blocksize, engine=engine,
+            frames_to_learn=math.ceil(10 * chunk_size / self.blocksize),
+            noise_mode=noise_mode, analysis_size=analysis_size, channels=channels,
+            downmix=config.downmix, steering_delays=config.steering_delays,
+            reference=config.reference_device is not None, aec_tail_ms=config.aec_tail_ms,
+            auto_delay=config.auto_delay, profile_path=config.profile_path,
+            profile_key=self.backend.device_name(mic_device) if config.profile_cache else None,
+            vad=config.vad, gate_db=config.gate_db, processing_rate=processing_rate,
+            denoiser_params={name: getattr(config, name) for name in DENOISER_PARAMETERS},
+        )
+        # Multi-channel mics are mixed (or beamformed) to mono unless downmix is off
+        self.output_channels = 1 if config.downmix and channels > 1 else channels
+        capacity = self.blocksize * config.buffer_blocks
+        
+        # Mic and output on separate clocks drift apart; resample to hold the
+        # output ring at a fixed fill (auto: only for real sound cards)
+        drift_compensation = config.drift_compensation
+        if drift_compensation is None:
+            drift_compensation = self.backend.independent_clocks
+        self.drift_compensation = drift_compensation
+        
+        self.name = self._name or f"{mic_device}->{output_device}"
+        
+        self.dsp_session = None
+        self.dsp_pool = self._shared_pool
+        self._owns_pool = False
+        self.chain = None
+        self.reference_ring = None
+        if config.worker_process or self.dsp_pool is not None:
+            # DSP in a worker process (private, or shared with other sessions);
+            # callbacks only touch shared memory
+            if self.dsp_pool is None:
+                self.dsp_pool = DSPPool(workers=1)
+                self._owns_pool = True
+            self.dsp_session = DSPSession(chain_kwargs, channels, self.output_channels, capacity,
+                                          drift_compensation=drift_compensation,
+                                          params=config.live_values())
+            self.dsp_session.enabled = self._enabled
+            self.params = self.dsp_session.params
+            self.input_ring = self.dsp_session.input_ring
+            self.output_ring = self.dsp_session.output_ring
+            self.reference_ring = self.dsp_session.reference_ring
+            # Only used for configuration queries; the live one runs in the worker
+            _, rate, block, analysis = internal_config(sample_rate, self.blocksize, analysis_size,
+                                                      processing_rate)
+            self.processor = BlockProcessor(rate, block, engine, noise_mode=noise_mode,
+                                            n_fft=analysis, channels=channels)
+        else:
+            # Lock-free rings between the PortAudio callbacks and process_audio
+            self.chain = SignalChain(**chain_kwargs)
+            self.processor = self.chain.processor
+            self.params = ParameterChannel(config.live_values())
+            self.input_ring = RingBuffer(capacity, channels)
+            self.output_ring = RingBuffer(capacity, self.output_channels)
+            if config.reference_device is not None:
+                self.reference_ring = RingBuffer(capacity)
+        self.jitter_buffer = None
+        if drift_compensation and self.chain is not None:
+            self.jitter_buffer = JitterBuffer(self.output_ring, sample_rate, self.blocksize)
+        self._block = np.zeros((self.blocksize, channels), dtype=np.float32)
+        self._ref_block = np.zeros((self.blocksize, 1), dtype=np.float32)
+        # A new output device fades in over its first block
+        self._fade_in = np.repeat(np.linspace(0.0, 1.0, self.blocksize, dtype=np.float32)[:, None],
+                                  self.output_channels, axis=1)
+        self._fading = False
+        self._wake = threading.Event()
+        
+        # Timings, ring depths, dropouts and PortAudio status flags
+        self.metrics = PipelineMetrics(self.blocksize / sample_rate, self.input_ring, self.output_ring)
+        self.metrics.on_error = self._report_error
+        self.metrics_log_interval = config.metrics_log_interval
+        if self.dsp_session is not None:
+            self.dsp_session.metrics = self.metrics
+        
+        self.mic_stream = None
+        self.reference_stream = None
+        self.output_stream = None
+        self.recorder = None
+
+    def _report_error(self, error):
+        self.last_error = error
+        if self.on_error is not None:
+            try:
+                self.on_error(error)
+            except Exception as e:
+                print(f"Error callback failed: {e}")
+
+    def reconfigure(self, **changes):
+        """Apply new config values
+
+        Live parameters (live_params.LIVE_PARAMETERS) reach the DSP between
+        two blocks and ramp to their new values, and a new output device
+        is swapped in while the DSP keeps its state (noise profile, echo
+        canceller, streaming buffers). Any other change restarts a running
+        pipeline. Returns False if a change failed (the error goes to
+        on_error) or a running pipeline could not be restarted.
+        """
+        config = self.config.replace(**changes)
+        changed = {name for name in changes if getattr(config, name) != getattr(self.config, name)}
+        if changed - set(LIVE_PARAMETERS) - {"output_device"}:
+            was_running = self.running
+            if was_running:
+                self.stop()
+            self.config = config
+            self._build()
+            return self.start() if was_running else True
+
+        ok = True
+        if "output_device" in changed:
+            if self.running:
+                ok = self._switch_output(config.output_device)
+            if ok:
+                self.output_device = config.output_device
+            else:
+                config = config.replace(output_device=self.config.output_device)
+        self.config = config
+        live = changed & set(LIVE_PARAMETERS)
+        if live:
+            values = {name: getattr(config, name) for name in live}
+            self.params.set(**values)
+            if self.recorder is not None:
+                self.recorder.control(params=values)
+        return ok
+
+    def _open_output(self, device):
+        return self.backend.output_stream(
+            device=device,
+            samplerate=self.sample_rate,
+            channels=self.output_channels,
+            blocksize=self.blocksize,
+            callback=self._output_callback,
+            ready=lambda: self.output_ring.fill >= self.blocksize
+        )
+
+    def _switch_output(self, device):
+        """Move playback to another device while the DSP keeps running"""
+        try:
+            stream = self._open_output(device)
+        except Exception as e:
+            # The current device keeps playing
+            print(f"Output switch error: {e}")
+            self._report_error(e)
+            return False
+        old, self.output_stream = self.output_stream, stream
+        try:
+            old.stop()
+            old.close()
+        except:
+            pass
+        # Audio queued for the old device is late by now: start afresh, faded in
+        self.output_ring.clear()
+        self._fading = True
+        try:
+            stream.start()
+        except Exception as e:
+            print(f"Output switch error: {e}")
+            self.stop()
+            self._report_error(e)
+            return False
+        print(f"✓ Output switched to {device}")
+        return True
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, value):
+        self._enabled = value
+        if self.dsp_session is not None:
+            self.dsp_session.enabled = value
+        if self.recorder is not None:
+            self.recorder.control(enabled=value)
+
+    def _record_header(self):
+        """What replay_session.py needs to rebuild this pipeline"""
+        return {
+            "config": dataclasses.asdict(self.config),
+            "sample_rate": self.sample_rate,
+            "blocksize": self.blocksize,
+            "channels": self.channels,
+            "output_channels": self.output_channels,
+            "drift_compensation": self.drift_compensation,
+            "worker_process": self.dsp_session is not None,
+            "enabled": self.enabled,
+            "params": self.params.values(),
+        }
+
+    def latency_report(self):
+        """Algorithmic mouth-to-output latency (excluding device/driver buffers)"""
+        to_ms = 1000.0 / self.sample_rate
+        report = {
+            "input_block_ms": self.blocksize * to_ms,
+            "denoiser_ms": self.processor.expected_latency_samples * 1000.0 / self.processor.sample_rate,
+            "output_block_ms": self.blocksize * to_ms,
+        }
+        if self.processor.sample_rate != self.sample_rate:
+            # Decimation + interpolation filters, each half their length
+            factor = self.sample_rate // self.processor.sample_rate
+            report["resampler_ms"] = 2 * Decimator(factor).latency_samples * to_ms
+        if self.drift_compensation:
+            # Buffering the jitter buffer holds on purpose, on top of the blocks
+            report["jitter_buffer_ms"] = max(self.output_ring.capacity - 2 * self.blocksize, 0) // 2 * to_ms
+        report["total_ms"] = sum(report.values())
+        return report
+
+    def _input_ready(self):
+        """Room for one more mic block without either ring overflowing"""
+        in_flight = self.input_ring.fill + self.output_ring.fill + 2 * self.blocksize  # +1 being processed
+        return in_flight <= min(self.input_ring.capacity, self.output_ring.capacity)
+
+    def _mic_callback(self, indata, frames, time, status):
+        """Microphone input callback"""
+        if status:
+            self.metrics.record_status("mic", status)
+        written = self.input_ring.write(indata)
+        if self.recorder is not None:
+            self.recorder.record(MIC, indata, status, dropout=not written)
+        self._wake.set()
+    
+    def _reference_callback(self, indata, frames, time, status):
+        """Speaker loopback callback"""
+        if status:
+            self.metrics.record_status("reference", status)
+        written = self.reference_ring.write(indata)
+        if self.recorder is not None:
+            self.recorder.record(REFERENCE, indata, status, dropout=not written)
+    
+    def _output_callback(self, outdata, frames, time, status):
+        """Output callback"""
+        if status:
+            self.metrics.record_status("output", status)
+        # Zero-fills (and counts an underrun) if the worker fell behind
+        frames = self.output_ring.read_into(outdata, zero_fill=True)
+        if self._fading and frames and outdata.shape == self._fade_in.shape:
+            self._fading = False
+            outdata *= self._fade_in
+        if self.recorder is not None:
+            self.recorder.record(OUTPUT, outdata, status, dropout=frames < len(outdata))
+    
+    def process_audio(self):
+        """Main processing loop"""
+        while self.running:
+            try:
+                # Get audio chunk; the mic callback wakes us when one lands
+                self._wake.clear()
+                if not self.input_ring.read_into(self._block):
+                    self._wake.wait(0.1)
+                    continue
+                started = time.perf_counter()
+                
+                # Parameter changes land between blocks, never mid-block
+                changes = self.params.poll()
+                if changes:
+                    self.chain.set_params(**changes)
+                
+                if self.reference_ring is not None:
+                    # Missing loopback audio counts as silence (and an underrun)
+                    self.reference_ring.read_into(self._ref_block, zero_fill=True)
+                cleaned = self.chain.process(self._block, self._ref_block, self.enabled)
+
+                if self.jitter_buffer is not None:
+                    self.jitter_buffer.write(cleaned)
+                    self.metrics.record_drift(self.jitter_buffer.drift_ppm)
+                else:
+                    self.output_ring.write(cleaned)
+                self.metrics.record_block(time.perf_counter() - started, self.chain.denoise_s,
+                                          self.chain.speech)
+                
+            except Exception as e:
+                print(f"Process Error: {e}")
+                self.metrics.record_error(e)
+    
+    def start(self):
+        """Start audio streams"""
+        try:
+            if self.dsp_session is not None and self.dsp_session.closed:
+                self._build()  # Stopped before: stop() freed the worker session and its rings
+            
+            print(f"Starting with: Mic={self.mic_device}, Output={self.output_device}"
+                  + (f", Reference={self.reference_device}" if self.reference_device is not None else ""))
+            
+            if self.config.record_path:
+                self.recorder = SessionRecorder(self.config.record_path, self._record_header(),
+                                                self.config.record_max_mb)
+            
+            self.mic_stream = self.backend.input_stream(
+                device=self.mic_device,
+                samplerate=self.sample_rate,
+                channels=self.channels,
+                blocksize=self.blocksize,
+                callback=self._mic_callback,
+                ready=self._input_ready
+            )
+            self.mic_stream.start()
+            
+            if self.reference_device is not None:
+                self.reference_stream = self.backend.input_stream(
+                    device=self.reference_device,
+                    samplerate=self.sample_rate,
+                    channels=1,
+                    blocksize=self.blocksize,
+                    callback=self._reference_callback,
+                    ready=lambda: self.reference_ring.free >= self.blocksize
+                )
+                self.reference_stream.start()
+            
+            self.output_stream = self._open_output(self.output_device)
+            self.output_stream.start()
+            
+            self.running = True
+            if self.dsp_session is not None:
+                self.dsp_pool.add(self.name, self.dsp_session)
+            else:
+                self._process_thread = threading.Thread(target=self.process_audio, daemon=True)
+                self._process_thread.start()
+                self.chain.start()
+            if self.metrics_log_interval:
+                self.metrics.start_log(self.metrics_log_interval, callback=self.on_metrics)
+            
+            print(f"✓ Started successfully (algorithmic latency {self.latency_report()['total_ms']:.1f} ms)")
+            return True
+            
+        except Exception as e:
+            print(f"Start error: {e}")
+            self.stop()
+            self._report_error(e)
+            return False
+    
+    def stop(self):
+        """Stop audio"""
+        self.running = False
+        self._wake.set()
+        if self._process_thread is not None:
+            # The rings are single-consumer: the loop must be out of its last
+            # block before they are closed or a restart starts another one
+            # (unless stop() came from that loop, e.g. through on_error)
+            if self._process_thread is not threading.current_thread():
+                self._process_thread.join()
+            self._process_thread = None
+        self.metrics.stop_log()
+        if self.dsp_session is not None:
+            if self.name in self.dsp_pool:
+                self.dsp_pool.remove(self.name)
+            if self._owns_pool:
+                self.dsp_pool.close()
+        else:
+            self.chain.stop()
+        for stream in [self.mic_stream, self.reference_stream, self.output_stream]:
+            if stream:
+                try:
+                    stream.stop()
+                    stream.close()
+                except:
+                    pass
+        if self.dsp_session is not None:
+            self.dsp_session.close()  # Streams are closed, so the shared rings can go
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+        print("✓ Stopped")
@@ -0,0 +1,114 @@
+"""
+SpeakerLove - Jitter Buffer
+Keeps the output ring at a target fill while mic and output clocks drift
+
+The mic and the output device (e.g. VoiceMeeter) each run on their own
+clock. Two nominal 48kHz clocks typically differ by tens of ppm, so without
+correction the output ring slowly fills until blocks are dropped, or drains
+until the output callback plays zeros - a glitch every few minutes, and
+latency that creeps up in between.
+
+JitterBuffer sits in front of the output ring. It watches the ring's
+(smoothed) fill level and resamples every block by a ratio a few hundred
+ppm away from 1, steered by a PI controller, so the output consumes exactly
+what the mic produces and the buffered latency stays at the target. At
+these ratios the pitch change is inaudible.
+"""
+
+import time
+
+import numpy as np
+
+
+class FractionalResampler:
+    """Streaming cubic (Catmull-Rom) interpolation at a variable ratio
+
+    ratio = input samples consumed per output sample; > 1 shortens the
+    signal, < 1 stretches it. The read position carries across blocks, so a
+    ratio of exactly 1 passes samples through unchanged (2 samples late).
+    """
+
+    def __init__(self, channels=1):
+        self.channels = channels
+        self._hist = np.zeros((3, channels), dtype=np.float32)
+        self._phase = 1.0  # Next read position, relative to the start of _hist
+
+    def process(self, block, ratio=1.0):
+        x = np.concatenate([self._hist, block.reshape(len(block), -1)])
+        end = len(x) - 2  # Interpolating at t needs x[floor(t) - 1 ... floor(t) + 2]
+        count = max(0, int(np.ceil((end - self._phase) / ratio)))
+        t = self._phase + ratio * np.arange(count)
+        i = t.astype(np.int64)
+        f = (t - i).astype(np.float32)[:, None]
+
+        p0, p1, p2, p3 = x[i - 1], x[i], x[i + 1], x[i + 2]
+        out = p1 + 0.5 * f * (p2 - p0 + f * (2.0 * p0 - 5.0 * p1 + 4.0 * p2 - p3
+                                             + f * (3.0 * (p1 - p2) + p3 - p0)))
+
+        self._phase += count * ratio - (len(x) - 3)
+        self._hist = x[-3:].copy()
+        return out
+
+
+class JitterBuffer:
+    """Writes blocks to an output ring, resampled to hold its fill at a target"""
+
+    def __init__(self, ring, sample_rate, blocksize, target_fill=None, max_ppm=2000,
+                 smoothing_s=1.0, response_s=20.0):
+        self.ring = ring
+
+        # Just before a read the ring also holds the block being played and the
+        # one just written, so centre the target in what is left
+        if target_fill is None:
+            target_fill = max(ring.capacity - 2 * blocksize, 0) // 2
+        self.target_fill = target_fill
+        self.max_ratio = max_ppm * 1e-6
+        self.resampler = FractionalResampler(ring.channels)
+
+        # Fill jumps by a block at every callback; steer on a ~1s average
+        self.blocksize = blocksize
+        block_s = blocksize / sample_rate
+        self._alpha = 1.0 - np.exp(-block_s / smoothing_s)
+        # PI gains, per second of fill error: correct within ~response_s
+        self._kp = 2.0 / response_s
+        self._ki = self._kp / response_s * block_s
+        self._sample_rate = sample_rate
+
+        self.fill = None
+        self._integral = 0.0
+        self.ratio = 1.0
+
+    @property
+    def drift_ppm(self):
+        """Current correction (positive: output clock slower than the mic)"""
+        return (self.ratio - 1.0) * 1e6
+
+    def _playout_fill(self):
+        """Buffered frames, less what the output has played since its last read
+
+        The output takes whole blocks, so the raw fill only changes when the
+        two clocks slip by an entire block; counting the time since the
+        last read shows the drift as it happens.
+        """
+        fill = self.ring.fill
+        if self.ring.last_read_ns:
+            elapsed = (time.monotonic_ns() - self.ring.last_read_ns) * 1e-9 * self._sample_rate
+            fill -= min(elapsed, self.blocksize)
+        return fill
+
+    def write(self, block):
+        fill = self._playout_fill()
+        if fill < self.target_fill - self.blocksize:
+            # Starting up, or the output already ran dry: re-centre at once
+            # rather than resampling our way back over many seconds
+            pad = int(self.target_fill - fill)
+            self.ring.write(np.zeros((pad, self.ring.channels), dtype=np.float32))
+            fill += pad
+            self.fill = None
+        self.fill = fill if self.fill is None else self.fill + self._alpha * (fill - self.fill)
+        error_s = (self.fill - self.target_fill) / self._sample_rate
+
+        # Integral term learns the steady drift; clamp it to stop wind-up
+        self._integral = float(np.clip(self._integral + self._ki * error_s, -self.max_ratio, self.max_ratio))
+        self.ratio = 1.0 + float(np.clip(self._kp * error_s + self._integral, -self.max_ratio, self.max_ratio))
+        return self.ring.write(self.resampler.process(block, self.ratio))
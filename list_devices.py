@@ -5,7 +5,7 @@ List all available audio devices on the system.
 Helps identify which device numbers to use in SpeakerLove.
 """
 
-import sounddevice as sd
+from device_catalog import DeviceCatalog
 
 def main():
     print("=" * 80)
@@ -13,43 +13,33 @@ def main():
     print("=" * 80)
     print()
     
-    devices = sd.query_devices()
+    # One enumeration, classified once
+    catalog = DeviceCatalog()
+    devices = catalog.devices()
+    inputs = [dev for dev in devices if dev.is_input]
+    outputs = [dev for dev in devices if dev.is_output]
     
     print("INPUT DEVICES (Microphones):")
     print("-" * 80)
-    input_count = 0
-    for i, dev in enumerate(devices):
-        if dev['max_input_channels'] > 0:
-            channels = dev['max_input_channels']
-            sr = dev['default_samplerate']
-            latency = dev['default_low_input_latency']
-            print(f"  [{i}] {dev['name']}")
-            print(f"      Channels: {channels}, Sample Rate: {sr}Hz, Latency: {latency*1000:.1f}ms")
-            input_count += 1
+    for dev in inputs:
+        print(f"  [{dev.index}] {dev.name}")
+        print(f"      Channels: {dev.max_input_channels}, Sample Rate: {dev.default_samplerate}Hz, "
+              f"Latency: {dev.input_latency*1000:.1f}ms, Host API: {dev.hostapi}")
     
-    if input_count == 0:
+    if not inputs:
         print("  (No input devices found)")
     
     print()
     print("OUTPUT DEVICES (Speakers, Virtual Devices):")
     print("-" * 80)
-    output_count = 0
-    for i, dev in enumerate(devices):
-        if dev['max_output_channels'] > 0:
-            channels = dev['max_output_channels']
-            sr = dev['default_samplerate']
-            latency = dev['default_low_output_latency']
-            
-            # Highlight potential speaker loopback devices
-            is_loopback = any(keyword in dev['name'].lower() for keyword in 
-                             ['stereo mix', 'loopback', 'what u hear', 'voicemeeter', 'virtual'])
-            marker = " <- LIKELY LOOPBACK" if is_loopback else ""
-            
-            print(f"  [{i}] {dev['name']}{marker}")
-            print(f"      Channels: {channels}, Sample Rate: {sr}Hz, Latency: {latency*1000:.1f}ms")
-            output_count += 1
+    for dev in outputs:
+        # Highlight potential speaker loopback devices
+        marker = " <- LIKELY LOOPBACK" if dev.loopback or "virtual" in dev.name.lower() else ""
+        print(f"  [{dev.index}] {dev.name}{marker}")
+        print(f"      Channels: {dev.max_output_channels}, Sample Rate: {dev.default_samplerate}Hz, "
+              f"Latency: {dev.output_latency*1000:.1f}ms, Host API: {dev.hostapi}")
     
-    if output_count == 0:
+    if not outputs:
         print("  (No output devices found)")
     
     print()
@@ -58,33 +48,24 @@ def main():
     print("=" * 80)
     
     # Find best input
-    input_devices = [(i, dev) for i, dev in enumerate(devices) if dev['max_input_channels'] > 0]
-    if input_devices:
-        best_input = max(input_devices, key=lambda x: x[1]['max_input_channels'])
-        print(f"[OK] Recommended Microphone: [{best_input[0]}] {best_input[1]['name']}")
+    candidates = catalog.mics or inputs
+    if candidates:
+        best_input = max(candidates, key=lambda dev: dev.max_input_channels)
+        print(f"[OK] Recommended Microphone: {best_input.label}")
     
     # Find loopback
-    loopback_devices = [(i, dev) for i, dev in enumerate(devices) 
-                       if dev['max_output_channels'] > 0 and 
-                       any(keyword in dev['name'].lower() for keyword in 
-                           ['stereo mix', 'loopback', 'what u hear', 'voicemeeter'])]
-    if loopback_devices:
-        print(f"[OK] Speaker Loopback: [{loopback_devices[0][0]}] {loopback_devices[0][1]['name']}")
+    loopbacks = [dev for dev in catalog.loopbacks if dev.is_output]
+    if loopbacks:
+        print(f"[OK] Speaker Loopback: {loopbacks[0].label}")
     else:
         print("[WARNING] Speaker Loopback: NOT FOUND - Install VB-Audio VoiceMeeter")
     
-    # Find output
-    output_devices = [(i, dev) for i, dev in enumerate(devices) if dev['max_output_channels'] > 0]
-    if output_devices:
-        # Prefer non-loopback output
-        regular_output = [(i, dev) for i, dev in output_devices 
-                         if not any(keyword in dev['name'].lower() for keyword in 
-                                   ['loopback', 'stereo mix'])]
-        if regular_output:
-            best_output = regular_output[0]
-        else:
-            best_output = output_devices[0]
-        print(f"[OK] Output Device: [{best_output[0]}] {best_output[1]['name']}")
+    # Find output (the same choice the app's GUI makes)
+    best_output = catalog.default_output()
+    if best_output is None and outputs:
+        best_output = next((dev for dev in outputs if not dev.loopback), outputs[0])
+    if best_output is not None:
+        print(f"[OK] Output Device: {best_output.label}")
     
     print()
     print("USAGE IN VOICE ISOLATOR:")
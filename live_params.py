@@ -0,0 +1,163 @@
+"""
+SpeakerLove - Live Parameters
+Lock-free parameter updates into a running pipeline, ramped so they never click
+
+Changing how hard the denoiser works used to mean a full restart: streams
+torn down, the noise profile relearned, an audible gap. Instead, the
+control side (GUI, scripts, the session server) publishes new values on a
+ParameterChannel and the processing loop picks them up between blocks:
+
+  - set() writes every value into a small array bracketed by a sequence
+    counter that is odd while a write is in progress (a seqlock)
+  - poll() copies the values and checks the counter did not move, so the
+    audio side never waits on a lock; a torn read is just retried, or
+    left for the next block
+  - each poll returns the complete latest snapshot, so updates published
+    between two blocks coalesce instead of queueing up
+
+SharedParameterChannel keeps the same array in shared memory for DSP
+worker processes (see dsp_worker.py).
+
+Values then move to their new setting through a Ramp, one step per STFT
+frame or per block, over RAMP_MS: a gain that jumps from one block to the
+next is a click, one that glides over 50 ms is not.
+"""
+
+import math
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Applied per block without a restart; all are EngineConfig fields too
+DENOISER_PARAMETERS = ("prop_decrease", "n_std_thresh", "attack_ms", "release_ms", "freq_smooth_hz")
+LIVE_PARAMETERS = DENOISER_PARAMETERS + ("gate_db",)
+
+RAMP_MS = 50.0
+
+
+def ramp_steps(step_s, ramp_ms=RAMP_MS):
+    """Steps of step_s seconds in a ramp of ramp_ms (at least one)"""
+    return max(1, math.ceil(ramp_ms / 1000.0 / step_s))
+
+
+class Ramp:
+    """A value that glides linearly to a new target over a fixed number of steps"""
+
+    def __init__(self, value, steps):
+        self.value = self.target = float(value)
+        self.steps = steps
+        self._delta = 0.0
+        self._left = 0
+
+    @property
+    def ramping(self):
+        return self._left > 0
+
+    def set(self, target):
+        target = float(target)
+        if target == self.target:
+            return
+        self.target = target
+        self._left = self.steps
+        self._delta = (target - self.value) / self.steps
+
+    def step(self, n=1):
+        """Advance n steps; returns the new value"""
+        if self._left:
+            if n >= self._left:
+                self._left = 0
+                self.value = self.target
+            else:
+                self._left -= n
+                self.value += n * self._delta
+        return self.value
+
+
+class ParameterChannel:
+    """Latest-value mailbox for named float parameters (any writers, one reader)
+
+    Writers are serialised among themselves with a lock the reader never
+    touches.
+    """
+
+    # Reads that find a write in progress before poll() gives up for this block
+    RETRIES = 8
+
+    def __init__(self, values):
+        self.names = tuple(values)
+        self._index = {name: i for i, name in enumerate(self.names)}
+        self._seq = np.zeros(1, dtype=np.int64)
+        self._values = np.array([values[name] for name in self.names], dtype=np.float64)
+        self._setup()
+
+    def _setup(self):
+        self._snapshot = np.zeros(len(self.names))
+        self._seen = 0  # Sequence number of the last snapshot poll() returned
+        self._write_lock = threading.Lock()
+
+    def set(self, **values):
+        """Publish new values (control side)"""
+        unknown = set(values) - set(self.names)
+        if unknown:
+            raise ValueError(f"Unknown parameter(s): {', '.join(sorted(unknown))}")
+        with self._write_lock:
+            self._seq[0] += 1  # Odd: readers retry
+            for name, value in values.items():
+                self._values[self._index[name]] = value
+            self._seq[0] += 1
+
+    def values(self):
+        """The last published values (control side)"""
+        with self._write_lock:
+            return dict(zip(self.names, self._values.tolist()))
+
+    def poll(self):
+        """The latest values if anything was published since the last poll, else None"""
+        for _ in range(self.RETRIES):
+            seq = int(self._seq[0])
+            if seq == self._seen:
+                return None
+            if seq & 1:
+                continue
+            np.copyto(self._snapshot, self._values)
+            if int(self._seq[0]) == seq:
+                self._seen = seq
+                return dict(zip(self.names, self._snapshot.tolist()))
+        return None  # Still being written: picked up next block
+
+
+class SharedParameterChannel(ParameterChannel):
+    """ParameterChannel whose counter and values live in shared memory
+
+    Pickling an instance (e.g. as a Process argument) attaches to the same
+    block; each process keeps its own reader state.
+    """
+
+    def __init__(self, values, name=None):
+        self.names = tuple(values)
+        self._index = {n: i for i, n in enumerate(self.names)}
+        self._owner = name is None
+        self._shm = shared_memory.SharedMemory(name=name, create=self._owner, size=8 * (1 + len(self.names)))
+        self._seq = np.ndarray((1,), dtype=np.int64, buffer=self._shm.buf)
+        self._values = np.ndarray((len(self.names),), dtype=np.float64, buffer=self._shm.buf, offset=8)
+        if self._owner:
+            self._seq[0] = 0
+            self._values[:] = [values[n] for n in self.names]
+        self._setup()
+
+    def __reduce__(self):
+        return (SharedParameterChannel, (dict.fromkeys(self.names, 0.0), self.name))
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def close(self):
+        """Detach this process; the creator also frees the block"""
+        # Keep private copies so values() and poll() stay usable
+        self._seq = self._seq.copy()
+        self._values = self._values.copy()
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
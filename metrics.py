@@ -0,0 +1,164 @@
+"""
+SpeakerLove - Pipeline Metrics
+Cheap hot-path counters and timings for the real-time pipeline
+
+Recording a block is a couple of array stores; percentiles and ring fill
+levels are only computed when a snapshot is taken, so the processing
+thread and the PortAudio callbacks pay next to nothing.
+"""
+
+import json
+import sys
+import threading
+import time
+
+import numpy as np
+
+# sounddevice.CallbackFlags attributes worth counting, per stream side
+STATUS_FLAGS = {
+    "mic": ("input_underflow", "input_overflow"),
+    "reference": ("input_underflow", "input_overflow"),
+    "output": ("output_underflow", "output_overflow", "priming_output"),
+}
+
+
+class PipelineMetrics:
+    """Per-block timings, ring depths, dropouts and PortAudio status flags"""
+
+    def __init__(self, block_duration, input_ring=None, output_ring=None, window=512):
+        self.block_duration = block_duration
+        self.input_ring = input_ring
+        self.output_ring = output_ring
+
+        # Rolling window of recent block timings (seconds)
+        self._window = window
+        self._process_s = np.zeros(window)
+        self._denoise_s = np.zeros(window)
+        self._speech = np.zeros(window, dtype=bool)
+        self._index = 0
+
+        self.blocks = 0
+        self.speech_blocks = 0  # VAD decisions (only counted when a VAD runs)
+        self.gated_blocks = 0
+        self.speech = None
+        self.drift_ppm = None   # Output resampling correction (jitter buffer only)
+        self.max_input_depth = 0
+        self.max_output_depth = 0
+        self.status_counts = {f"{side}.{flag}": 0 for side, flags in STATUS_FLAGS.items() for flag in flags}
+        self.errors = 0
+        self.last_error = None
+        self.on_error = None    # Called with every recorded error
+        self.started = time.time()
+
+        self._log_thread = None
+        self._log_stop = threading.Event()
+
+    def record_block(self, process_s, denoise_s, speech=None):
+        """Called once per processed block (speech: the VAD decision, if any)"""
+        i = self._index % self._window
+        self._process_s[i] = process_s
+        self._denoise_s[i] = denoise_s
+        if speech is not None:
+            self._speech[i] = speech
+            self.speech = speech
+            if speech:
+                self.speech_blocks += 1
+            else:
+                self.gated_blocks += 1
+        self._index += 1
+        self.blocks += 1
+        if self.input_ring is not None and self.input_ring.fill > self.max_input_depth:
+            self.max_input_depth = self.input_ring.fill
+        if self.output_ring is not None and self.output_ring.fill > self.max_output_depth:
+            self.max_output_depth = self.output_ring.fill
+
+    def record_drift(self, ppm):
+        self.drift_ppm = ppm
+
+    def record_status(self, side, status):
+        """Count the flags set on a PortAudio callback status ('mic', 'reference' or 'output')"""
+        for flag in STATUS_FLAGS[side]:
+            if getattr(status, flag, False):
+                self.status_counts[f"{side}.{flag}"] += 1
+
+    def record_error(self, error):
+        self.errors += 1
+        self.last_error = str(error)
+        if self.on_error is not None:
+            self.on_error(error)
+
+    @staticmethod
+    def _summary(samples):
+        if not len(samples):
+            return {"mean_ms": 0.0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        ms = samples * 1000.0
+        return {
+            "mean_ms": float(ms.mean()),
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p99_ms": float(np.percentile(ms, 99)),
+            "max_ms": float(ms.max()),
+        }
+
+    def snapshot(self):
+        """Return a JSON-serialisable view of the current metrics"""
+        n = min(self._index, self._window)
+        process = self._summary(self._process_s[:n])
+        budget_ms = self.block_duration * 1000.0
+        load = process["mean_ms"] / budget_ms if budget_ms else 0.0
+
+        snap = {
+            "time": time.time(),
+            "uptime_s": time.time() - self.started,
+            "blocks": self.blocks,
+            "block_budget_ms": budget_ms,
+            "process": process,
+            "denoise": self._summary(self._denoise_s[:n]),
+            "load": load,
+            "behind_realtime": load >= 1.0 or process["p99_ms"] > budget_ms,
+            "status": dict(self.status_counts),
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+        if self.drift_ppm is not None:
+            snap["drift_ppm"] = self.drift_ppm
+        if self.speech_blocks or self.gated_blocks:
+            snap["vad"] = {
+                "speech": self.speech,
+                "speech_blocks": self.speech_blocks,
+                "gated_blocks": self.gated_blocks,
+                "recent_speech_ratio": float(self._speech[:n].mean()) if n else 0.0,
+            }
+        if self.input_ring is not None:
+            snap["input_depth"] = self.input_ring.fill
+            snap["max_input_depth"] = self.max_input_depth
+            snap["dropped_input_blocks"] = self.input_ring.overruns
+        if self.output_ring is not None:
+            snap["output_depth"] = self.output_ring.fill
+            snap["max_output_depth"] = self.max_output_depth
+            snap["dropped_output_blocks"] = self.output_ring.overruns
+            snap["underrun_output_blocks"] = self.output_ring.underruns
+        return snap
+
+    def start_log(self, interval=10.0, stream=None, callback=None):
+        """Write one JSON snapshot line every interval seconds (or pass the snapshot to callback)"""
+        if self._log_thread is not None:
+            return
+        stream = stream or sys.stdout
+        self._log_stop.clear()
+
+        def run():
+            while not self._log_stop.wait(interval):
+                if callback is not None:
+                    callback(self.snapshot())
+                    continue
+                stream.write(json.dumps(self.snapshot()) + "\n")
+                stream.flush()
+
+        self._log_thread = threading.Thread(target=run, daemon=True)
+        self._log_thread.start()
+
+    def stop_log(self):
+        if self._log_thread is not None:
+            self._log_stop.set()
+            self._log_thread.join(timeout=1.0)
+            self._log_thread = None
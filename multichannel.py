@@ -0,0 +1,49 @@
+"""
+SpeakerLove - Multi-Channel Output Stage
+Downmix or delay-and-sum beamform N denoised channels to mono
+
+Stereo headsets and small mic arrays are denoised per channel; voice chat
+usually wants one channel back. With no steering delays this is a plain
+(weighted) average. With per-channel delays it becomes a delay-and-sum
+beamformer: each channel is delayed so the talker's wavefront lines up
+before summing, which adds the voice coherently and the diffuse noise
+incoherently. The delay history is carried across blocks.
+"""
+
+import numpy as np
+
+
+class Downmix:
+    """Mixes (frames, channels) blocks to (frames, 1)"""
+
+    def __init__(self, channels, weights=None, delays=None):
+        self.channels = channels
+        if weights is None:
+            weights = np.full(channels, 1.0 / channels)
+        self.weights = np.asarray(weights, dtype=np.float32).reshape(channels)
+
+        # Integer steering delays in samples (0 = plain downmix)
+        if delays is None:
+            delays = np.zeros(channels, dtype=int)
+        self.delays = np.asarray(delays, dtype=int).reshape(channels)
+        if (self.delays < 0).any():
+            raise ValueError("Steering delays must be non-negative")
+        self.reset()
+
+    def reset(self):
+        self._hist = np.zeros((int(self.delays.max()), self.channels), dtype=np.float32)
+
+    def process(self, block):
+        """Mix one (frames, channels) block down to (frames, 1)"""
+        block = np.asarray(block, dtype=np.float32)
+        if not len(self._hist):
+            return (block @ self.weights).reshape(-1, 1)
+
+        n = len(block)
+        signal = np.concatenate([self._hist, block])
+        start = len(self._hist) - self.delays
+        # Gather channel c from `delays[c]` samples back, for all channels at once
+        idx = start[None, :] + np.arange(n)[:, None]
+        aligned = np.take_along_axis(signal, idx, axis=0)
+        self._hist = signal[n:]
+        return (aligned @ self.weights).reshape(-1, 1)
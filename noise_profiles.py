@@ -0,0 +1,147 @@
+"""
+SpeakerLove - Noise Profile Cache
+Learned noise statistics persisted across sessions
+
+Learning a profile costs the first ~10 blocks of every start: audio passes
+through unprocessed and the statistics are computed in one CPU spike. The
+store keeps the computed per-bin dB mean/std (never raw audio) for each
+mic device, sample rate and analysis size, so a later start can install
+them before the first block and suppress noise immediately.
+
+File format (little-endian):
+    header   b"SLNP", u16 version, u32 entry count
+    entry    u16 key length, key (UTF-8), u32 sample rate, u16 n_fft,
+             u16 channels, f64 created, f64 last used,
+             float32 mean_db[channels, n_fft // 2 + 1], float32 std_db[...]
+
+Entries learned more than max_age_s ago are dropped however often they are
+used (the room's noise drifts), and only the max_entries most recently
+used are kept. A use is only written back once the stored one is
+touch_interval_s old, so starting an engine does not rewrite the file
+every time (LRU order is that coarse). Writes go to a temporary file that replaces the store, so
+a crash or a concurrent writer never leaves a corrupt file.
+"""
+
+import os
+import struct
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+MAGIC = b"SLNP"
+VERSION = 1
+_HEADER = struct.Struct("<4sHI")
+_ENTRY = struct.Struct("<IHHdd")
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".speakerlove", "noise_profiles.bin")
+
+
+class NoiseProfileStore:
+    """Noise statistics keyed by (device name, sample rate, analysis size)"""
+
+    def __init__(self, path=None, max_entries=32, max_age_s=30 * 86400, touch_interval_s=86400):
+        self.path = path or DEFAULT_PATH
+        self.max_entries = max_entries
+        self.max_age_s = max_age_s
+        self.touch_interval_s = touch_interval_s
+        self._lock = threading.Lock()
+
+    def _read(self):
+        """All entries in the file: {(device, sr, n_fft): (channels, created, used, mean, std)}"""
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return {}
+        try:
+            magic, version, count = _HEADER.unpack_from(data, 0)
+            if magic != MAGIC or version != VERSION:
+                print(f"Ignoring noise profile store {self.path} (format {version})")
+                return {}
+            entries = {}
+            offset = _HEADER.size
+            for _ in range(count):
+                (key_len,) = struct.unpack_from("<H", data, offset)
+                offset += 2
+                device = data[offset:offset + key_len].decode("utf-8")
+                offset += key_len
+                sample_rate, n_fft, channels, created, used = _ENTRY.unpack_from(data, offset)
+                offset += _ENTRY.size
+                shape = (channels, n_fft // 2 + 1)
+                size = shape[0] * shape[1]
+                stats = np.frombuffer(data, dtype="<f4", count=2 * size, offset=offset).reshape(2, *shape)
+                offset += 2 * size * 4
+                entries[(device, sample_rate, n_fft)] = (channels, created, used, stats[0], stats[1])
+            return entries
+        except (struct.error, ValueError, UnicodeDecodeError) as e:
+            print(f"Ignoring corrupt noise profile store {self.path}: {e}")
+            return {}
+
+    def _write(self, entries, now):
+        """Evict stale / least recently used entries, then atomically replace the file"""
+        fresh = [(key, entry) for key, entry in entries.items() if now - entry[1] <= self.max_age_s]
+        fresh.sort(key=lambda item: item[1][2], reverse=True)
+        fresh = fresh[:self.max_entries]
+
+        parts = [_HEADER.pack(MAGIC, VERSION, len(fresh))]
+        for (device, sample_rate, n_fft), (channels, created, used, mean_db, std_db) in fresh:
+            key = device.encode("utf-8")
+            parts.append(struct.pack("<H", len(key)) + key)
+            parts.append(_ENTRY.pack(sample_rate, n_fft, channels, created, used))
+            parts.append(np.ascontiguousarray(mean_db, dtype="<f4").tobytes())
+            parts.append(np.ascontiguousarray(std_db, dtype="<f4").tobytes())
+
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".noise_profiles")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(b"".join(parts))
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def get(self, device, sample_rate, n_fft, channels=1):
+        """(mean_db, std_db) as (channels, bins) arrays, or None on a miss"""
+        if device is None:
+            return None
+        with self._lock:
+            entries = self._read()
+            entry = entries.get((device, sample_rate, n_fft))
+            now = time.time()
+            if entry is None or entry[0] != channels or now - entry[1] > self.max_age_s:
+                return None
+            if now - entry[2] >= self.touch_interval_s:
+                entries[(device, sample_rate, n_fft)] = entry[:2] + (now,) + entry[3:]
+                try:
+                    self._write(entries, now)  # Record the use for LRU eviction
+                except OSError as e:
+                    print(f"Noise profile store not updated: {e}")
+            return entry[3].copy(), entry[4].copy()
+
+    def put(self, device, sample_rate, mean_db, std_db):
+        """Save statistics for a device (replacing any older profile)"""
+        if device is None:
+            return
+        mean_db = np.atleast_2d(np.asarray(mean_db, dtype=np.float32))
+        std_db = np.atleast_2d(np.asarray(std_db, dtype=np.float32))
+        channels, bins = mean_db.shape
+        n_fft = 2 * (bins - 1)
+        with self._lock:
+            entries = self._read()
+            now = time.time()
+            entries[(device, sample_rate, n_fft)] = (channels, now, now, mean_db, std_db)
+            try:
+                self._write(entries, now)
+            except OSError as e:
+                print(f"Noise profile not saved: {e}")
+
+    def clear(self):
+        with self._lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,111 @@
+"""
+SpeakerLove - Adaptive Noise Tracker
+Continuously updated per-bin noise estimate for the streaming denoiser
+
+Minimum-statistics controlled recursive averaging (MCRA): the smoothed
+power spectrum's running minimum decides, per bin, how likely speech is,
+and the noise estimate is only averaged in where speech is unlikely.
+Each STFT frame costs a handful of O(bins) vector operations, all into
+preallocated arrays.
+"""
+
+import numpy as np
+
+# dB statistics of a Rayleigh-distributed noise magnitude, relative to the
+# noise power: the mean sits 2.51 dB below 10*log10(power), std is 5.57 dB
+RAYLEIGH_DB_OFFSET = -2.51
+RAYLEIGH_DB_STD = 5.57
+
+
+def _alpha(hop_s, tau_s):
+    return float(np.exp(-hop_s / tau_s))
+
+
+class NoiseTracker:
+    """Per-bin noise power estimate updated frame by frame
+
+    The estimate takes the shape of whatever it is seeded with, so one
+    tracker can follow (channels, bins) just as well as (bins,).
+    """
+
+    def __init__(self, n_bins, sample_rate=48000, hop_length=256, smooth_ms=20,
+                 noise_ms=300, presence_ms=50, min_window_s=1.5, speech_ratio=5.0):
+        hop_s = hop_length / sample_rate
+        self.n_bins = n_bins
+        self._alpha_s = _alpha(hop_s, smooth_ms / 1000.0)
+        self._alpha_d = _alpha(hop_s, noise_ms / 1000.0)
+        self._alpha_p = _alpha(hop_s, presence_ms / 1000.0)
+        self._min_window = max(int(min_window_s / hop_s), 1)
+        self.speech_ratio = float(speech_ratio)
+
+        self.noise_power = None
+        self.speech_prob = None
+        self._smoothed = None
+        self._min = None
+        self._min_tmp = None
+        self._count = 0
+
+    @property
+    def ready(self):
+        return self.noise_power is not None
+
+    def seed(self, noise_power):
+        """Start from a known noise power spectrum"""
+        power = np.maximum(np.asarray(noise_power, dtype=np.float64), 1e-20)
+        self.noise_power = power.copy()
+        self._smoothed = power.copy()
+        self._min = power.copy()
+        self._min_tmp = power.copy()
+        self.speech_prob = np.zeros_like(power)
+        self._count = 0
+        # Work arrays for update()
+        self._present = np.zeros(power.shape, dtype=bool)
+        self._work = np.zeros_like(power)
+        self._alpha_buf = np.zeros_like(power)
+
+    def seed_from_db(self, mean_db):
+        """Start from learned dB statistics (see StreamingDenoiser.learn_noise)"""
+        self.seed(10.0 ** ((np.asarray(mean_db) - RAYLEIGH_DB_OFFSET) / 10.0))
+
+    def update(self, power):
+        """Fold a (..., frames, bins) power spectrogram into the estimate"""
+        if self.noise_power is None:
+            self.seed(power[..., 0, :])
+
+        work = self._work
+        for f in range(power.shape[-2]):
+            frame = power[..., f, :]
+            # Smoothed periodogram and its running minimum
+            self._smoothed *= self._alpha_s
+            np.multiply(frame, 1.0 - self._alpha_s, out=work)
+            self._smoothed += work
+            np.minimum(self._min, self._smoothed, out=self._min)
+            np.minimum(self._min_tmp, self._smoothed, out=self._min_tmp)
+            self._count += 1
+            if self._count >= self._min_window:
+                np.minimum(self._min_tmp, self._smoothed, out=self._min)
+                self._min_tmp[:] = self._smoothed
+                self._count = 0
+
+            # Speech presence probability from the ratio to the minimum
+            np.multiply(self._min, self.speech_ratio, out=work)
+            np.greater(self._smoothed, work, out=self._present)
+            self.speech_prob *= self._alpha_p
+            np.copyto(work, self._present)
+            work *= 1.0 - self._alpha_p
+            self.speech_prob += work
+
+            # Recursive averaging, frozen where speech is likely
+            alpha = self._alpha_buf
+            np.multiply(self.speech_prob, 1.0 - self._alpha_d, out=alpha)
+            alpha += self._alpha_d
+            self.noise_power *= alpha
+            np.subtract(1.0, alpha, out=work)
+            work *= frame
+            self.noise_power += work
+
+    def threshold(self, n_std, out=None):
+        """Magnitude threshold equivalent to mean_db + n_std * std_db"""
+        out = np.sqrt(self.noise_power, out=out)
+        out *= 10.0 ** ((RAYLEIGH_DB_OFFSET + n_std * RAYLEIGH_DB_STD) / 20.0)
+        return out
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+SpeakerLove - Session Replay
+Re-drive the engine with a recorded session's exact callback timing
+
+Reads a session_recorder log (EngineConfig.record_path) and, for every
+recorded run, rebuilds the pipeline from the run's config and plays the
+callbacks back into it: mic and reference blocks arrive, with their
+status flags, at the moments they arrived live, and the output callback
+asks for audio whenever the device did. process_audio runs in its own
+thread (or DSP worker) exactly as it does live, so a run whose processing
+fell behind overflows the same rings and underruns the same output blocks
+when replayed - on a developer machine, without the user's hardware.
+
+Each run's report puts the recorded dropouts and status flags next to the
+replayed ones, with the replay's own worst scheduling lateness (if that
+is large, this machine could not keep the recorded pace).
+
+The replay learns its noise profile from the recorded audio (the profile
+cache is not used), and a run whose first segments were rotated away
+starts mid-session with fresh DSP state.
+
+Usage:
+    python replay_session.py recordings/
+    python replay_session.py recordings/ --run -1 --engine streaming
+    python replay_session.py recordings/ -o replay.json
+"""
+
+import argparse
+import dataclasses
+import json
+import sys
+import time
+
+import numpy as np
+
+from audio_pipeline import ENGINES
+from engine import EngineConfig, SpeakerLove
+from metrics import STATUS_FLAGS
+from session_recorder import CONTROL, MIC, OUTPUT, REFERENCE, RING_DROPOUT, Status, read_session
+
+SIDES = {MIC: "mic", REFERENCE: "reference", OUTPUT: "output"}
+DROPOUTS = {MIC: "dropped_input_blocks", REFERENCE: "dropped_reference_blocks", OUTPUT: "underrun_output_blocks"}
+
+
+class _ReplayStream:
+    """A stream whose callback runs when the replay calls it, not on a clock"""
+
+    def __init__(self, channels, blocksize, callback):
+        self.channels = channels
+        self.blocksize = blocksize
+        self.callback = callback
+        self.active = False
+
+    def start(self):
+        self.active = True
+
+    def stop(self):
+        self.active = False
+
+    def close(self):
+        self.active = False
+
+
+class ReplayBackend:
+    """Streams named "mic", "reference" and "output", driven by replay()"""
+
+    name = "replay"
+    independent_clocks = False
+
+    def __init__(self):
+        self.streams = {}
+
+    def device_name(self, device):
+        return None
+
+    def default_samplerate(self, device, kind="input"):
+        return None
+
+    def input_stream(self, device, samplerate, channels, blocksize, callback, ready=None):
+        self.streams[device] = _ReplayStream(channels, blocksize, callback)
+        return self.streams[device]
+
+    def output_stream(self, device, samplerate, channels, blocksize, callback, ready=None):
+        self.streams["output"] = _ReplayStream(channels, blocksize, callback)
+        return self.streams["output"]
+
+
+def replay_config(header, **overrides):
+    """The recorded run's EngineConfig, on the replay backend's devices"""
+    fields = {field.name for field in dataclasses.fields(EngineConfig)}
+    options = {key: value for key, value in header["config"].items() if key in fields}
+    options.update(header["params"])
+    options.update(
+        mic_device="mic",
+        output_device="output",
+        reference_device="reference" if options.get("reference_device") is not None else None,
+        # As resolved live, not re-derived from the replay backend
+        sample_rate=header["sample_rate"],
+        blocksize=header["blocksize"],
+        drift_compensation=header["drift_compensation"],
+        worker_process=header["worker_process"],
+        record_path=None,
+        metrics_log_interval=None,
+    )
+    options.update(overrides)
+    return EngineConfig(**options)
+
+
+def replay(header, records, **overrides):
+    """Play one recorded run through a fresh engine at its recorded timing; returns a report"""
+    backend = ReplayBackend()
+    engine = SpeakerLove(config=replay_config(header, **overrides), backend=backend)
+    engine.enabled = header["enabled"]
+
+    blocks = dict.fromkeys(SIDES.values(), 0)
+    recorded = {"status": {f"{side}.{flag}": 0 for side, flags in STATUS_FLAGS.items() for flag in flags}}
+    recorded.update(dict.fromkeys(DROPOUTS.values(), 0))
+    late = output_diff = 0.0
+    first = t = None
+
+    if not engine.start():
+        raise RuntimeError(f"Could not start the replay: {engine.last_error}")
+    started = time.perf_counter()
+    try:
+        for kind, flags, t, data in records:
+            if first is None:
+                first = t
+            delay = started + (t - first) - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                late = max(late, -delay)
+
+            if kind == CONTROL:
+                if "enabled" in data:
+                    engine.enabled = data["enabled"]
+                if "params" in data:
+                    engine.reconfigure(**data["params"])
+                if "recorder_dropped" in data:
+                    recorded["recorder_dropped"] = data["recorder_dropped"]
+                continue
+
+            side = SIDES[kind]
+            blocks[side] += 1
+            status = Status(flags)
+            for flag in STATUS_FLAGS[side]:
+                if getattr(status, flag):
+                    recorded["status"][f"{side}.{flag}"] += 1
+            if flags & RING_DROPOUT:
+                recorded[DROPOUTS[kind]] += 1
+
+            stream = backend.streams.get(side)
+            if stream is None:
+                continue
+            if kind == OUTPUT:
+                out = np.zeros_like(data)
+                stream.callback(out, len(out), None, status)
+                output_diff = max(output_diff, float(np.abs(out - data).max()))
+            else:
+                stream.callback(data, len(data), None, status)
+    finally:
+        engine.stop()
+
+    snap = engine.metrics.snapshot()
+    replayed = {"status": snap["status"], "process": snap["process"], "load": snap["load"]}
+    for kind, key in DROPOUTS.items():
+        if kind == REFERENCE:
+            if engine.reference_ring is not None:
+                replayed[key] = engine.reference_ring.overruns
+        else:
+            replayed[key] = snap[key]
+    return {
+        "run": header["run"],
+        "recorded_at": header["started"],
+        "seconds": (t - first) if first is not None else 0.0,
+        "blocks": blocks,
+        "recorded": recorded,
+        "replayed": replayed,
+        "max_replay_late_ms": late * 1000.0,
+        "max_output_diff": output_diff,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded sessions through the engine")
+    parser.add_argument("directory", help="A session recording (EngineConfig.record_path)")
+    parser.add_argument("--run", type=int, help="Only this run (index, -1 for the latest)")
+    parser.add_argument("--engine", choices=ENGINES, help="Replay on another engine than recorded")
+    parser.add_argument("-o", "--output", help="Write the reports as JSON")
+    args = parser.parse_args(argv)
+
+    runs = read_session(args.directory)
+    if not runs:
+        print(f"✗ No recorded runs in {args.directory}")
+        return 1
+    if args.run is not None:
+        runs = [runs[args.run]]
+    overrides = {"engine": args.engine} if args.engine else {}
+
+    reports = []
+    for header, records in runs:
+        try:
+            report = replay(header, records, **overrides)
+        except Exception as e:
+            print(f"✗ Run {header['run']}: {e}")
+            return 1
+        reports.append(report)
+        recorded, replayed = report["recorded"], report["replayed"]
+        print(f"✓ Run {report['run']} ({time.ctime(report['recorded_at'])}, {report['seconds']:.1f}s): "
+              f"dropped input {recorded['dropped_input_blocks']} -> {replayed['dropped_input_blocks']}, "
+              f"output underruns {recorded['underrun_output_blocks']} -> {replayed['underrun_output_blocks']}, "
+              f"p99 {replayed['process']['p99_ms']:.2f} ms, replay late by up to "
+              f"{report['max_replay_late_ms']:.1f} ms")
+        if recorded.get("recorder_dropped"):
+            print(f"  Recorder dropped {recorded['recorder_dropped']} records: the log has gaps")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(reports, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
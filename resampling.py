@@ -0,0 +1,84 @@
+"""
+SpeakerLove - Polyphase Resampling
+Integer-factor streaming decimation and interpolation around the DSP
+
+Voice chat apps resample to 16-24kHz anyway, so nothing above 8-12kHz
+survives to the listener. Running echo cancellation, the VAD and the
+denoiser at a third of 48kHz makes every FFT three times smaller.
+
+Both directions use the same linear-phase windowed-sinc lowpass. The
+decimator only computes the outputs it keeps and the interpolator never
+multiplies the inserted zeros (polyphase form), with filter history carried
+across blocks. Each adds a fixed delay of `latency_samples` at the device
+rate (taps_per_side input-rate samples per low-rate sample; ~1ms).
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def lowpass(factor, taps_per_side=16, cutoff=0.85, beta=8.0):
+    """Kaiser-windowed sinc for a rate change by factor
+
+    cutoff is relative to the low rate's Nyquist frequency. The length,
+    2 * factor * taps_per_side + 1, keeps the delay a whole number of
+    low-rate samples.
+    """
+    half = factor * taps_per_side
+    n = np.arange(-half, half + 1)
+    fc = cutoff / (2.0 * factor)  # Cycles per high-rate sample
+    h = 2.0 * fc * np.sinc(2.0 * fc * n) * np.kaiser(len(n), beta)
+    return (h / h.sum()).astype(np.float32)
+
+
+def rate_factor(sample_rate, processing_rate):
+    """Integer decimation factor for a requested processing rate (1 = none)"""
+    if not processing_rate or processing_rate >= sample_rate:
+        return 1
+    return max(1, int(round(sample_rate / processing_rate)))
+
+
+class Decimator:
+    """Lowpass + keep every factor-th sample, for (frames, channels) blocks
+
+    Blocks must be a multiple of factor long so the output phase never moves.
+    """
+
+    def __init__(self, factor, channels=1, taps_per_side=16):
+        self.factor = factor
+        self._taps = lowpass(factor, taps_per_side)[::-1].copy()
+        self._hist = np.zeros((len(self._taps) - 1, channels), dtype=np.float32)
+        self.latency_samples = len(self._taps) // 2
+
+    def process(self, block):
+        if len(block) % self.factor:
+            raise ValueError(f"Block of {len(block)} frames is not a multiple of {self.factor}")
+        x = np.concatenate([self._hist, block.reshape(len(block), -1)])
+        self._hist = x[len(block):]
+        # Windows ending at every factor-th input sample: (frames / factor, channels, taps)
+        windows = sliding_window_view(x, len(self._taps), axis=0)[::self.factor]
+        return windows @ self._taps
+
+
+class Interpolator:
+    """Zero-stuff by factor + lowpass (gain factor), in polyphase form"""
+
+    def __init__(self, factor, channels=1, taps_per_side=16):
+        self.factor = factor
+        h = lowpass(factor, taps_per_side) * factor
+        per_phase = -(-len(h) // factor)
+        h = np.concatenate([h, np.zeros(per_phase * factor - len(h), dtype=np.float32)])
+        # Phase p of output k * factor + p uses taps p, p + factor, ...,
+        # applied to inputs k, k - 1, ... (reversed to match the windows)
+        self._phases = h.reshape(per_phase, factor)[::-1].copy()
+        self._hist = np.zeros((per_phase - 1, channels), dtype=np.float32)
+        self.latency_samples = len(lowpass(factor, taps_per_side)) // 2
+
+    def process(self, block):
+        block = block.reshape(len(block), -1)
+        x = np.concatenate([self._hist, block])
+        self._hist = x[len(block):]
+        windows = sliding_window_view(x, len(self._phases), axis=0)  # (frames, channels, per_phase)
+        # One flat matrix product is far cheaper than a stack of tiny ones
+        out = windows.reshape(-1, len(self._phases)) @ self._phases   # (frames * channels, factor)
+        return out.reshape(len(block), -1, self.factor).transpose(0, 2, 1).reshape(len(block) * self.factor, -1)
@@ -0,0 +1,160 @@
+"""
+SpeakerLove - Lock-free Ring Buffer
+Single-producer/single-consumer float32 FIFO for the audio callbacks
+
+Backed by one preallocated NumPy array. The producer only ever advances the
+write index and the consumer only ever advances the read index, so no lock
+is needed between a PortAudio callback and the processing thread. Reads and
+writes copy straight between the caller's array and the ring storage.
+
+SharedRingBuffer keeps the same storage and counters in a
+multiprocessing.shared_memory block so the two sides can live in
+different processes (see dsp_worker.py).
+"""
+
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class RingBuffer:
+    """Preallocated SPSC ring buffer of float32 frames"""
+
+    def __init__(self, capacity, channels=1):
+        self.capacity = int(capacity)
+        self.channels = channels
+        self._buf = np.zeros((self.capacity, channels), dtype=np.float32)
+
+        # Monotonic frame counters; each is written by one side only
+        self._write_pos = 0
+        self._read_pos = 0
+
+        self.overruns = 0   # Blocks dropped because the ring was full
+        self.underruns = 0  # Reads that had to be zero-filled
+        self.last_read_ns = 0  # time.monotonic_ns() of the last read (consumer pacing)
+
+    @property
+    def fill(self):
+        """Frames currently buffered"""
+        return self._write_pos - self._read_pos
+
+    @property
+    def free(self):
+        return self.capacity - self.fill
+
+    @property
+    def fill_ratio(self):
+        return self.fill / self.capacity
+
+    def write(self, data):
+        """Copy a (frames, channels) or (frames,) block in; drop it if it does not fit"""
+        frames = len(data)
+        if frames > self.free:
+            self.overruns += 1
+            return False
+
+        if data.ndim == 1:
+            data = data[:, None]
+
+        start = self._write_pos % self.capacity
+        first = min(frames, self.capacity - start)
+        np.copyto(self._buf[start:start + first], data[:first])
+        if first < frames:
+            np.copyto(self._buf[:frames - first], data[first:])
+
+        self._write_pos += frames  # Publish only after the data is in place
+        return True
+
+    def read_into(self, out, zero_fill=False):
+        """Copy the next len(out) frames into out
+
+        Returns the number of frames read. When fewer frames are buffered,
+        nothing is consumed unless zero_fill is set, in which case what is
+        available is copied, the rest of out is zeroed and an underrun counted.
+        """
+        frames = len(out)
+        available = self.fill
+        if available < frames:
+            if not zero_fill:
+                return 0
+            self.underruns += 1
+            out[available:] = 0
+            frames = available
+            if not frames:
+                return 0
+
+        view = out[:frames] if out.ndim > 1 else out[:frames, None]
+        start = self._read_pos % self.capacity
+        first = min(frames, self.capacity - start)
+        np.copyto(view[:first], self._buf[start:start + first])
+        if first < frames:
+            np.copyto(view[first:], self._buf[:frames - first])
+
+        self._read_pos += frames
+        self.last_read_ns = time.monotonic_ns()
+        return frames
+
+    def clear(self):
+        """Discard buffered frames (consumer side)"""
+        self._read_pos = self._write_pos
+
+    def stats(self):
+        return {
+            "fill": self.fill,
+            "capacity": self.capacity,
+            "overruns": self.overruns,
+            "underruns": self.underruns,
+        }
+
+
+class SharedRingBuffer(RingBuffer):
+    """RingBuffer whose frames and counters live in shared memory
+
+    Created by one process and attached by name from another; pickling
+    an instance (e.g. as a Process argument) attaches to the same block.
+    """
+
+    # int64 header: write_pos, read_pos, overruns, underruns, last_read_ns
+    _HEADER = 5
+
+    def __init__(self, capacity, channels=1, name=None):
+        self.capacity = int(capacity)
+        self.channels = channels
+        size = self._HEADER * 8 + self.capacity * channels * 4
+        self._owner = name is None
+        self._shm = shared_memory.SharedMemory(name=name, create=self._owner, size=size)
+        self._header = np.ndarray((self._HEADER,), dtype=np.int64, buffer=self._shm.buf)
+        self._buf = np.ndarray((self.capacity, channels), dtype=np.float32,
+                               buffer=self._shm.buf, offset=self._HEADER * 8)
+        if self._owner:
+            self._header[:] = 0
+            self._buf[:] = 0
+
+    def __reduce__(self):
+        return (SharedRingBuffer, (self.capacity, self.channels, self.name))
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    # Counters are header cells so both processes see them
+    _write_pos = property(lambda self: int(self._header[0]),
+                          lambda self, v: self._header.__setitem__(0, v))
+    _read_pos = property(lambda self: int(self._header[1]),
+                         lambda self, v: self._header.__setitem__(1, v))
+    overruns = property(lambda self: int(self._header[2]),
+                        lambda self, v: self._header.__setitem__(2, v))
+    underruns = property(lambda self: int(self._header[3]),
+                         lambda self, v: self._header.__setitem__(3, v))
+    last_read_ns = property(lambda self: int(self._header[4]),
+                            lambda self, v: self._header.__setitem__(4, v))
+
+    def close(self):
+        """Detach this process; the creator also frees the block"""
+        # Keep a private copy of the counters so stats stay readable
+        self._header = self._header.copy()
+        self._buf = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
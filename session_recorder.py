@@ -0,0 +1,224 @@
+"""
+SpeakerLove - Session Recorder
+Everything the audio callbacks saw, on disk, for replaying crackles offline
+
+A crackle report is usually all a user can give: the callback status flags
+and timings were printed and lost. With EngineConfig.record_path set, the
+engine logs every mic, reference and output block as it passes through
+the callbacks, with a timestamp, the PortAudio status flags and whether
+the ring dropped (input) or zero-filled (output) it. Control changes
+(enabled, live parameters) are logged in between. replay_session.py then
+re-drives the engine with exactly that timing.
+
+The log is a directory of append-only segments:
+
+  - every segment starts with a magic, then a length-prefixed JSON header
+    (config, rates, current enabled state and live parameters), so replay
+    can start from any segment that survived rotation
+  - records are a 16-byte header (kind, flags, channels, frames, time)
+    followed by raw float32 audio, or a JSON payload for control records
+  - a segment is closed at max_mb / SEGMENTS and the oldest are deleted,
+    so disk usage stays bounded however long the session runs
+
+Callbacks only copy the block onto a queue; a writer thread does the disk
+I/O. If the disk falls behind by more than MAX_QUEUED records, records are
+dropped and the count logged rather than ever blocking a callback.
+"""
+
+import json
+import os
+import struct
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+MAGIC = b"SLREC001"
+RECORD = struct.Struct("<BBHId")  # kind, flags, channels, frames (or payload bytes), seconds
+
+MIC, REFERENCE, OUTPUT, CONTROL = range(4)
+
+# sounddevice.CallbackFlags attributes, one bit each
+STATUS_BITS = ("input_underflow", "input_overflow", "output_underflow", "output_overflow", "priming_output")
+RING_DROPOUT = 0x80  # Input block dropped by a full ring, or output zero-filled
+
+SEGMENTS = 8
+
+
+def status_flags(status, dropout=False):
+    """Pack a callback status (and a ring dropout) into one byte"""
+    flags = RING_DROPOUT if dropout else 0
+    if status:
+        for bit, name in enumerate(STATUS_BITS):
+            if getattr(status, name, False):
+                flags |= 1 << bit
+    return flags
+
+
+class Status:
+    """A recorded callback status, shaped like sounddevice.CallbackFlags"""
+
+    def __init__(self, flags):
+        self.flags = flags
+        for bit, name in enumerate(STATUS_BITS):
+            setattr(self, name, bool(flags & (1 << bit)))
+
+    def __bool__(self):
+        return bool(self.flags & ~RING_DROPOUT)
+
+
+def _segments(directory):
+    """Segment paths in the order they were written"""
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(n for n in os.listdir(directory) if n.startswith("segment-") and n.endswith(".slog"))
+    return [os.path.join(directory, n) for n in names]
+
+
+class SessionRecorder:
+    """Rotating binary log of callback blocks, timings and control changes
+
+    header: JSON-serialisable description of the run (see SpeakerLove.start);
+    its "enabled" and "params" entries are kept current by control().
+    """
+
+    MAX_QUEUED = 4096
+    FLUSH_S = 0.05
+
+    def __init__(self, directory, header, max_mb=256):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_bytes = max(int(max_mb * 1024 * 1024 / SEGMENTS), 64 * 1024)
+        existing = _segments(directory)
+        self._index = int(os.path.basename(existing[-1])[8:-5]) + 1 if existing else 0
+        self.header = dict(header, run=self._index)
+        self.started = time.perf_counter()
+        self.header["started"] = time.time()
+
+        self.dropped = 0
+        self._logged_drops = 0
+        self._queue = deque()
+        self._file = None
+        self._size = 0
+        self._stop = threading.Event()
+        self._open_segment()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def record(self, kind, data, status=None, dropout=False):
+        """Queue one callback block (called from the audio callbacks)"""
+        if len(self._queue) >= self.MAX_QUEUED:
+            self.dropped += 1
+            return
+        self._queue.append((kind, status_flags(status, dropout), time.perf_counter() - self.started,
+                            np.array(data, dtype=np.float32)))
+
+    def control(self, **changes):
+        """Log a control change: enabled=bool and/or params={live parameter: value}"""
+        self._queue.append((CONTROL, 0, time.perf_counter() - self.started, changes))
+
+    def _open_segment(self):
+        path = os.path.join(self.directory, f"segment-{self._index:08d}.slog")
+        self._index += 1
+        self._file = open(path, "wb")
+        header = json.dumps(dict(self.header, segment=os.path.basename(path)), default=str).encode()
+        self._file.write(MAGIC + struct.pack("<I", len(header)) + header)
+        self._size = len(MAGIC) + 4 + len(header)
+        # Bounded disk usage: the oldest segments go first
+        for old in _segments(self.directory)[:-SEGMENTS]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def _write(self, kind, flags, t, data):
+        if kind == CONTROL:
+            # Later segments start from the state in effect
+            if "enabled" in data:
+                self.header["enabled"] = data["enabled"]
+            if "params" in data:
+                self.header["params"] = dict(self.header.get("params", {}), **data["params"])
+            payload = json.dumps(data).encode()
+            self._file.write(RECORD.pack(kind, flags, 0, len(payload), t))
+            self._file.write(payload)
+            self._size += RECORD.size + len(payload)
+        else:
+            frames, channels = len(data), (data.shape[1] if data.ndim > 1 else 1)
+            self._file.write(RECORD.pack(kind, flags, channels, frames, t))
+            self._file.write(data)
+            self._size += RECORD.size + data.nbytes
+        if self._size >= self.segment_bytes:
+            self._file.close()
+            self._open_segment()
+
+    def _drain(self):
+        while self._queue:
+            self._write(*self._queue.popleft())
+        if self.dropped != self._logged_drops:
+            self._logged_drops = self.dropped
+            self._write(CONTROL, 0, time.perf_counter() - self.started, {"recorder_dropped": self.dropped})
+        self._file.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.FLUSH_S):
+            try:
+                self._drain()
+            except Exception as e:
+                print(f"Session recorder error: {e}")
+                return
+
+    def close(self):
+        if self._file is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=2.0)
+        try:
+            self._drain()
+        finally:
+            self._file.close()
+            self._file = None
+
+
+def read_session(directory):
+    """The recorded runs, oldest first, as (header, records) pairs
+
+    A run is one engine start; records iterates over its (kind, flags, t,
+    data) across all its surviving segments, data being a (frames,
+    channels) float32 array or, for CONTROL records, a dict. The header
+    is that of the run's oldest surviving segment. A record cut short by
+    a crash ends the run.
+    """
+    runs = []
+    for path in _segments(directory):
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                continue
+            header = json.loads(f.read(struct.unpack("<I", f.read(4))[0]))
+        if runs and runs[-1][0]["run"] == header["run"]:
+            runs[-1][1].append(path)
+        else:
+            runs.append((header, [path]))
+    return [(header, _records(paths)) for header, paths in runs]
+
+
+def _records(paths):
+    for path in paths:
+        with open(path, "rb") as f:
+            f.read(len(MAGIC))
+            f.seek(struct.unpack("<I", f.read(4))[0], 1)
+            while True:
+                head = f.read(RECORD.size)
+                if len(head) < RECORD.size:
+                    break
+                kind, flags, channels, frames, t = RECORD.unpack(head)
+                if kind == CONTROL:
+                    payload = f.read(frames)
+                    if len(payload) < frames:
+                        return
+                    yield kind, flags, t, json.loads(payload)
+                else:
+                    data = np.fromfile(f, dtype=np.float32, count=frames * channels)
+                    if len(data) < frames * channels:
+                        return
+                    yield kind, flags, t, data.reshape(frames, channels)
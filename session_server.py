@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+SpeakerLove - Multi-Session Server
+Headless daemon hosting many mic -> output pipelines in one process
+
+Each session is an independent SpeakerLove pipeline (its own streams,
+noise profile and metrics); their DSP is scheduled across one shared pool
+of worker processes sized to the machine's cores. The config file is
+watched while running: sessions added to it are started, removed ones are
+stopped and changed ones are reconfigured, without touching the others.
+A changed output device or live parameter (suppression strength, gate
+threshold, smoothing) is applied to the running session; anything else
+restarts it.
+
+Config (JSON):
+    {
+        "workers": 4,
+        "metrics_interval": 10,
+        "sessions": {
+            "streamer": {"mic": 3, "output": 7, "engine": "streaming"},
+            "cohost":   {"mic": 5, "output": 9, "low_latency": true},
+            "ci":       {"backend": "file", "mic": "in.wav", "output": "out.wav"}
+        }
+    }
+
+Session keys: mic, output, reference, backend ("sounddevice", "file",
+"null", or e.g. {"name": "file", "realtime": false}) plus any of
+SESSION_OPTIONS.
+
+Usage:
+    python session_server.py sessions.json
+"""
+
+import argparse
+import dataclasses
+import json
+import os
+import sys
+import threading
+import time
+
+from audio_backends import make_backend
+from dsp_worker import DSPPool
+from engine import EngineConfig, SpeakerLove
+
+# SpeakerLove keyword arguments a session may set: every EngineConfig field
+# but the devices (the mic, output and reference keys) and worker_process
+# (sessions always run on the server's pool)
+SESSION_OPTIONS = tuple(
+    field.name for field in dataclasses.fields(EngineConfig)
+    if field.name not in ("mic_device", "output_device", "reference_device", "worker_process")
+)
+
+# What an option left out of a session's config falls back to
+DEFAULTS = {field.name: field.default for field in dataclasses.fields(EngineConfig)}
+
+
+def _check_options(options):
+    unknown = set(options) - {"mic", "output", "reference", "backend", *SESSION_OPTIONS}
+    if unknown:
+        raise ValueError(f"Unknown session option(s): {', '.join(sorted(unknown))}")
+
+
+class SessionServer:
+    """Runs named SpeakerLove sessions on a shared DSP worker pool"""
+
+    def __init__(self, workers=None, metrics_interval=None, stream=None):
+        self.pool = DSPPool(workers)
+        self.metrics_interval = metrics_interval
+        self.stream = stream or sys.stdout
+        self.sessions = {}   # name -> SpeakerLove
+        self._options = {}   # name -> options it was started with
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def add_session(self, name, options):
+        """Start one session; raises if its streams cannot be opened"""
+        options = dict(options)
+        _check_options(options)
+        kwargs = {key: options[key] for key in SESSION_OPTIONS if key in options}
+        with self._lock:
+            if name in self.sessions:
+                raise ValueError(f"Session {name!r} is already running")
+            session = SpeakerLove(options.get("mic"), options.get("output"),
+                                  reference_device=options.get("reference"),
+                                  backend=make_backend(options.get("backend", "sounddevice")),
+                                  dsp_pool=self.pool, name=name, **kwargs)
+            session.enabled = True
+            if not session.start():
+                raise RuntimeError(f"Session {name!r} failed to start")
+            self.sessions[name] = session
+            self._options[name] = options
+        print(f"✓ Session {name} started")
+
+    def remove_session(self, name):
+        with self._lock:
+            session = self.sessions.pop(name)
+            del self._options[name]
+        session.enabled = False
+        session.stop()
+        print(f"✓ Session {name} removed")
+
+    def update_session(self, name, options):
+        """Reconfigure a running session in place; returns False if it has to be re-created"""
+        options = dict(options)
+        _check_options(options)
+        old = self._options[name]
+        if any(options.get(key) != old.get(key) for key in ("mic", "reference", "backend")):
+            return False
+        changes = {key: options.get(key, DEFAULTS[key]) for key in SESSION_OPTIONS}
+        if not self.sessions[name].reconfigure(output_device=options.get("output"), **changes):
+            return False
+        with self._lock:
+            self._options[name] = options
+        print(f"✓ Session {name} reconfigured")
+        return True
+
+    def apply_config(self, config):
+        """Bring the running sessions in line with a config's "sessions" table"""
+        wanted = config.get("sessions", {})
+        for name in list(self.sessions):
+            if name in wanted and wanted[name] != self._options[name]:
+                try:
+                    if self.update_session(name, wanted[name]):
+                        continue
+                except Exception as e:
+                    print(f"✗ Session {name}: {e}")
+            if name not in wanted or wanted[name] != self._options[name]:
+                self.remove_session(name)
+        for name, options in wanted.items():
+            if name not in self.sessions:
+                try:
+                    self.add_session(name, options)
+                except Exception as e:
+                    print(f"✗ Session {name}: {e}")
+
+    def snapshot(self):
+        """Per-session metrics plus pool state, JSON-serialisable"""
+        with self._lock:
+            sessions = {name: session.metrics.snapshot() for name, session in self.sessions.items()}
+        return {
+            "time": time.time(),
+            "workers": self.pool.workers,
+            "worker_restarts": self.pool.restarts,
+            "sessions": sessions,
+        }
+
+    def run(self, config_path, poll_s=1.0):
+        """Serve the sessions in config_path until stop() or Ctrl+C, reloading on change"""
+        mtime = None
+        last_log = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                try:
+                    current = os.path.getmtime(config_path)
+                    if current != mtime:
+                        mtime = current
+                        with open(config_path) as f:
+                            config = json.load(f)
+                        self.apply_config(config)
+                except (OSError, ValueError) as e:
+                    print(f"Config error: {e}")
+
+                if self.metrics_interval and time.monotonic() - last_log >= self.metrics_interval:
+                    last_log = time.monotonic()
+                    self.stream.write(json.dumps(self.snapshot()) + "\n")
+                    self.stream.flush()
+                self._stop.wait(poll_s)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        for name in list(self.sessions):
+            self.remove_session(name)
+        self.pool.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run several SpeakerLove pipelines headless")
+    parser.add_argument("config", help="JSON session config (reloaded when it changes)")
+    parser.add_argument("--workers", type=int, help="DSP worker processes (default: config or CPU count)")
+    parser.add_argument("--metrics-interval", type=float, help="Seconds between metrics lines")
+    args = parser.parse_args(argv)
+
+    with open(args.config) as f:
+        config = json.load(f)
+    server = SessionServer(args.workers or config.get("workers"),
+                           args.metrics_interval or config.get("metrics_interval"))
+    print(f"✓ Serving {args.config} (Ctrl+C to stop)")
+    server.run(args.config)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+"""
+SpeakerLove - Spectral Core
+Allocation-free STFT framing, FFTs and overlap-add for block streaming
+
+Building every block's STFT from scratch (concatenated histories, fresh
+frame, spectrum and mask arrays, a new output FIFO) means constant
+allocator churn in the real-time thread at ~23 blocks/s per channel.
+SpectralCore owns all of that state instead:
+
+  - windows and smoothing kernels are computed once per configuration and
+    shared, read-only, between instances
+  - every work array is allocated up front for the block size; a block
+    only takes views of them and writes with out=
+  - arrays are frame-major, (frames, channels, n_fft), so the frames of a
+    block are one contiguous slice and windows are pre-tiled to that shape:
+    NumPy's ufuncs allocate iteration buffers for broadcast or strided
+    operands, but not for contiguous ones
+  - analysis history, overlap-add tail and output FIFO are ping-pong
+    buffers, so carrying state across blocks is a copy, never a new array
+
+Work arrays are float64: NumPy's FFTs only run into out= arrays without
+temporaries at double precision.
+
+FFT backends: "numpy" (in place with NumPy >= 2), "scipy" (scipy.fft with
+worker threads, worthwhile for many channels; allocates its result) or
+"auto": scipy when workers > 1 are asked for, otherwise numpy when it
+supports out=, otherwise scipy if installed.
+"""
+
+from functools import lru_cache
+from math import gcd
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+
+def _numpy_fft_out():
+    try:
+        np.fft.rfft(np.zeros(4), out=np.zeros(3, dtype=np.complex128))
+        return True
+    except TypeError:
+        return False
+
+
+NUMPY_FFT_OUT = _numpy_fft_out()
+
+
+def _scipy_fft():
+    """scipy.fft, imported on demand (it is slow to import), or None"""
+    try:
+        import scipy.fft
+        return scipy.fft
+    except ImportError:
+        return None
+
+
+def _frozen(array):
+    array.setflags(write=False)
+    return array
+
+
+@lru_cache(maxsize=None)
+def hann(n_fft):
+    """Periodic Hann window (COLA at 50% and 75% overlap)"""
+    return _frozen(0.5 - 0.5 * np.cos(2.0 * np.pi * np.arange(n_fft) / n_fft))
+
+
+@lru_cache(maxsize=None)
+def synthesis_window(n_fft, hop_length):
+    """Analysis window scaled so analysis * synthesis overlap-adds to 1"""
+    window = hann(n_fft)
+    return _frozen(window * (hop_length / np.sum(window ** 2)))
+
+
+@lru_cache(maxsize=None)
+def smoothing_kernel(sample_rate, n_fft, freq_smooth_hz):
+    """Triangular kernel spanning freq_smooth_hz either side of a bin"""
+    n_grad = max(int(freq_smooth_hz / (sample_rate / n_fft)), 0)
+    ramp = np.concatenate([
+        np.linspace(0, 1, n_grad + 1, endpoint=False),
+        np.linspace(1, 0, n_grad + 2),
+    ])[1:-1]
+    return _frozen(ramp / ramp.sum())
+
+
+def mask_smoothing_steps(frame_s, attack_ms, release_ms):
+    """Per-frame (attack, release) steps of a one-pole mask smoother (1 - coefficient)"""
+    attack = np.exp(-frame_s / (attack_ms / 1000.0)) if attack_ms else 0.0
+    release = np.exp(-frame_s / (release_ms / 1000.0)) if release_ms else 0.0
+    return float(1.0 - attack), float(1.0 - release)
+
+
+class FFT:
+    """Real FFTs along the last axis into caller-provided arrays"""
+
+    def __init__(self, backend="auto", workers=None):
+        if backend not in ("auto", "numpy", "scipy"):
+            raise ValueError(f"Unknown FFT backend: {backend}")
+        self._scipy = None
+        if backend == "scipy" or (backend == "auto" and (workers and workers > 1 or not NUMPY_FFT_OUT)):
+            self._scipy = _scipy_fft()
+            if self._scipy is None and backend == "scipy":
+                raise ValueError("The scipy FFT backend needs scipy installed")
+        self.backend = "scipy" if self._scipy is not None else "numpy"
+        self.workers = workers
+
+    @property
+    def in_place(self):
+        """Whether transforms write straight into out (no temporaries)"""
+        return self.backend == "numpy" and NUMPY_FFT_OUT
+
+    def rfft(self, x, out):
+        if self.backend == "scipy":
+            out[...] = self._scipy.rfft(x, axis=-1, workers=self.workers)
+        elif NUMPY_FFT_OUT:
+            np.fft.rfft(x, axis=-1, out=out)
+        else:
+            out[...] = np.fft.rfft(x, axis=-1)
+        return out
+
+    def irfft(self, spec, n, out):
+        if self.backend == "scipy":
+            out[...] = self._scipy.irfft(spec, n=n, axis=-1, workers=self.workers)
+        elif NUMPY_FFT_OUT:
+            np.fft.irfft(spec, n=n, axis=-1, out=out)
+        else:
+            out[...] = np.fft.irfft(spec, n=n, axis=-1)
+        return out
+
+
+class SpectralCore:
+    """Block-streaming STFT: samples in, frames/spectra to work on, samples out
+
+    Per block: push() the input, then either rfft() -> modify spectrum ->
+    irfft() or scale() the frames directly, then overlap_add() and pop()
+    the finished output. frames is (max_frames, channels, n_fft) and spec
+    (max_frames, channels, n_bins); only the first n_frames rows belong to
+    the current block.
+    """
+
+    def __init__(self, channels, block_size, n_fft, hop_length, fft_backend="auto", fft_workers=None):
+        if n_fft % hop_length:
+            raise ValueError("n_fft must be a multiple of hop_length")
+        self.channels = channels
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.n_bins = n_fft // 2 + 1
+        self.fft = FFT(fft_backend, fft_workers)
+        self.window = hann(n_fft)
+        self.synthesis = synthesis_window(n_fft, hop_length)
+        # Blocks that are not a multiple of the hop need a small output cushion
+        self.prefill = (hop_length - gcd(block_size, hop_length)) % hop_length
+        self._allocate(block_size)
+        self.reset()
+
+    def _allocate(self, block_size):
+        c, hop, tail = self.channels, self.hop_length, self.n_fft - self.hop_length
+        self.block_size = block_size
+        self.max_frames = (block_size - 1) // hop + 1
+        frames = self.max_frames
+        self.frames = np.zeros((frames, c, self.n_fft))
+        self.spec = np.zeros((frames, c, self.n_bins), dtype=np.complex128)
+        self._window = np.broadcast_to(self.window, self.frames.shape).copy()
+        self._synthesis = np.broadcast_to(self.synthesis, self.frames.shape).copy()
+        self._signal = [np.zeros((c, self.n_fft - 1 + block_size)) for _ in range(2)]
+        # Every frame a block can complete, as a fixed view of each signal buffer
+        self._views = [as_strided(s, shape=(frames, c, self.n_fft),
+                                  strides=(hop * s.strides[1], s.strides[0], s.strides[1]), writeable=False)
+                       for s in self._signal]
+        self._acc = [np.zeros((c, frames * hop + tail)) for _ in range(2)]
+        self._fifo = [np.zeros((c, self.prefill + (frames + 2) * hop + block_size)) for _ in range(2)]
+
+    def reset(self):
+        """Clear all streaming state"""
+        for buffers in (self._signal, self._acc, self._fifo):
+            for buffer in buffers:
+                buffer.fill(0)
+        self._hist_len = self.n_fft - self.hop_length
+        self._fifo_len = self.prefill
+        self._sig_cur = self._acc_cur = self._fifo_cur = 0
+        self.n_frames = 0
+        self.underruns = 0
+
+    def _grow(self, block_size):
+        """Re-allocate for a longer block, keeping the streaming state (rare)"""
+        hist = self._signal[self._sig_cur][:, :self._hist_len].copy()
+        tail = self._acc[self._acc_cur][:, :self.n_fft - self.hop_length].copy()
+        fifo = self._fifo[self._fifo_cur][:, :self._fifo_len].copy()
+        self._allocate(block_size)
+        self._signal[0][:, :len(hist[0])] = hist
+        self._acc[0][:, :len(tail[0])] = tail
+        self._fifo[0][:, :len(fifo[0])] = fifo
+        self._sig_cur = self._acc_cur = self._fifo_cur = 0
+
+    def push(self, x):
+        """Append a (channels, samples) block; returns how many frames it completed"""
+        n = x.shape[1]
+        if n > self.block_size:
+            self._grow(n)
+        hop = self.hop_length
+        signal = self._signal[self._sig_cur]
+        total = self._hist_len + n
+        np.copyto(signal[:, self._hist_len:total], x)
+
+        n_frames = (total - self.n_fft) // hop + 1 if total >= self.n_fft else 0
+        if n_frames:
+            frames = self.frames[:n_frames]
+            np.copyto(frames, self._views[self._sig_cur][:n_frames])
+            frames *= self._window[:n_frames]
+
+        # Unconsumed samples become the next block's history
+        consumed = n_frames * hop
+        self._hist_len = total - consumed
+        self._sig_cur ^= 1
+        np.copyto(self._signal[self._sig_cur][:, :self._hist_len], signal[:, consumed:total])
+        self.n_frames = n_frames
+        return n_frames
+
+    def rfft(self):
+        """Spectra of this block's frames (a view of spec)"""
+        f = self.n_frames
+        return self.fft.rfft(self.frames[:f], self.spec[:f])
+
+    def irfft(self):
+        """Back to windowed time-domain frames, ready for overlap_add"""
+        f = self.n_frames
+        frames = self.fft.irfft(self.spec[:f], self.n_fft, self.frames[:f])
+        frames *= self._synthesis[:f]
+
+    def scale(self, gain):
+        """Skip the spectrum: frames straight to synthesis, times a flat gain"""
+        f = self.n_frames
+        frames = self.frames[:f]
+        frames *= self._synthesis[:f]
+        frames *= gain
+
+    def overlap_add(self):
+        """Sum this block's frames into the output FIFO"""
+        f, hop = self.n_frames, self.hop_length
+        if not f:
+            return
+        tail = self.n_fft - hop
+        acc = self._acc[self._acc_cur]  # Starts with the previous block's tail
+        end = f * hop + tail
+        acc[:, tail:end] = 0
+        # One contiguous add per frame and channel (no iteration buffers)
+        for i in range(f):
+            for c in range(self.channels):
+                segment = acc[c, i * hop:i * hop + self.n_fft]
+                segment += self.frames[i, c]
+
+        fifo = self._fifo[self._fifo_cur]
+        np.copyto(fifo[:, self._fifo_len:self._fifo_len + f * hop], acc[:, :f * hop])
+        self._fifo_len += f * hop
+        self._acc_cur ^= 1
+        np.copyto(self._acc[self._acc_cur][:, :tail], acc[:, f * hop:end])
+
+    def pop(self, out):
+        """Move the next out.shape[1] finished samples into out (channels, samples)"""
+        n = out.shape[1]
+        fifo = self._fifo[self._fifo_cur]
+        if self._fifo_len < n:
+            self.underruns += 1
+            missing = n - self._fifo_len
+            self._fifo_cur ^= 1
+            padded = self._fifo[self._fifo_cur]
+            padded[:, :missing] = 0
+            np.copyto(padded[:, missing:n], fifo[:, :self._fifo_len])
+            fifo, self._fifo_len = padded, n
+        np.copyto(out, fifo[:, :n])
+
+        rest = self._fifo_len - n
+        self._fifo_cur ^= 1
+        np.copyto(self._fifo[self._fifo_cur][:, :rest], fifo[:, n:self._fifo_len])
+        self._fifo_len = rest
+        return out
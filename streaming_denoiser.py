@@ -0,0 +1,327 @@
+"""
+SpeakerLove - Streaming Spectral Gate
+Stateful block-by-block noise suppression for the real-time pipeline
+
+The noise profile's spectral statistics are computed once. Every block then
+costs one batched FFT/IFFT pair; the analysis history, overlap-add tail and
+mask smoothing state are carried from one block to the next. Framing, FFTs
+and overlap-add live in spectral_core.SpectralCore, and the gating below
+works in preallocated arrays too, so a block allocates nothing but its
+result (and not even that when out= is given).
+
+Suppression strength, threshold and smoothing can be changed between
+blocks (set_params); strength and threshold glide to their new values
+over live_params.RAMP_MS so a change never clicks.
+"""
+
+import numpy as np
+
+from live_params import DENOISER_PARAMETERS, Ramp, ramp_steps
+from spectral_core import SpectralCore, mask_smoothing_steps, smoothing_kernel
+
+
+class StreamingDenoiser:
+    """Spectral gating denoiser that keeps its STFT state between blocks
+
+    Blocks are (frames,) for mono or (frames, channels); all channels go
+    through one batched 2-D STFT with per-channel noise statistics.
+    """
+
+    def __init__(self, sample_rate=48000, block_size=2048, n_fft=1024, hop_length=None,
+                 n_std_thresh=1.5, prop_decrease=1.0, freq_smooth_hz=500,
+                 attack_ms=5, release_ms=50, noise_tracker=None, channels=1,
+                 fft_backend="auto", fft_workers=None):
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.channels = channels
+        self.n_fft = n_fft
+        self.hop_length = hop_length or n_fft // 4
+
+        # Live parameters ramp frame by frame towards what was last set
+        frame_s = self.hop_length / sample_rate
+        self._strength = Ramp(prop_decrease, ramp_steps(frame_s))
+        self._n_std = Ramp(n_std_thresh, ramp_steps(frame_s))
+
+        # STFT state and buffers; windows are shared between instances
+        self.core = SpectralCore(channels, block_size, n_fft, self.hop_length, fft_backend, fft_workers)
+        self.window = self.core.window
+        self._freq_smooth_hz = freq_smooth_hz
+        self._freq_kernel = smoothing_kernel(sample_rate, n_fft, freq_smooth_hz)
+
+        self._attack_ms = attack_ms
+        self._release_ms = release_ms
+        self._set_time_smoothing()
+
+        # Optional adaptive estimate that keeps refining the threshold
+        self.noise_tracker = noise_tracker
+
+        # Noise statistics, (channels, bins) (set by learn_noise)
+        self.noise_mean_db = None
+        self.noise_std_db = None
+        self._mean_db = None
+        self._std_db = None
+        self._thresh = None
+
+        self._mask_state = np.zeros((channels, self.n_bins))
+        self._allocate()
+        self.reset()
+
+    def _allocate(self):
+        """Gating work arrays for the core's largest block, frame-major like the core"""
+        shape = (self.core.max_frames, self.channels, self.n_bins)
+        self._mag = np.zeros(shape)
+        self._power = np.zeros(shape)
+        self._mask = np.zeros(shape)
+        self._above = np.zeros(shape, dtype=bool)
+        self._thresh_frames = np.zeros(shape)
+        if self._thresh is not None:
+            np.copyto(self._thresh_frames, self._thresh)
+        self._allocate_smoothing()
+        self._up = np.zeros((self.channels, self.n_bins), dtype=bool)
+        self._step = np.zeros((self.channels, self.n_bins))
+        self._diff = np.zeros((self.channels, self.n_bins))
+
+    def _allocate_smoothing(self):
+        # Frequency smoothing runs on rows padded to width n_bins + 2 * half
+        # and laid end to end, so every kernel tap is one contiguous 1-D op
+        half = len(self._freq_kernel) // 2
+        rows = self.core.max_frames * self.channels
+        self._padded = np.zeros((rows, self.n_bins + 2 * half))  # Edges stay zero
+        self._smoothed = np.zeros(self._padded.size)
+        self._tmp = np.zeros(self._padded.size)
+
+    def _set_time_smoothing(self):
+        self._attack_step, self._release_step = mask_smoothing_steps(
+            self.hop_length / self.sample_rate, self._attack_ms, self._release_ms)
+
+    @property
+    def prop_decrease(self):
+        """Suppression strength: 1 gates fully, 0 leaves the audio untouched (ramped)"""
+        return self._strength.value
+
+    @prop_decrease.setter
+    def prop_decrease(self, value):
+        self._strength.set(value)
+
+    @property
+    def n_std_thresh(self):
+        """Gate threshold in noise standard deviations above the mean (ramped)"""
+        return self._n_std.value
+
+    @n_std_thresh.setter
+    def n_std_thresh(self, value):
+        self._n_std.set(value)
+
+    @property
+    def attack_ms(self):
+        return self._attack_ms
+
+    @attack_ms.setter
+    def attack_ms(self, value):
+        self._attack_ms = value
+        self._set_time_smoothing()
+
+    @property
+    def release_ms(self):
+        return self._release_ms
+
+    @release_ms.setter
+    def release_ms(self, value):
+        self._release_ms = value
+        self._set_time_smoothing()
+
+    @property
+    def freq_smooth_hz(self):
+        return self._freq_smooth_hz
+
+    @freq_smooth_hz.setter
+    def freq_smooth_hz(self, value):
+        kernel = smoothing_kernel(self.sample_rate, self.n_fft, value)
+        resize = len(kernel) != len(self._freq_kernel)
+        self._freq_smooth_hz = value
+        self._freq_kernel = kernel
+        if resize:
+            self._allocate_smoothing()
+
+    def set_params(self, **params):
+        """Change live parameters between blocks (see live_params.DENOISER_PARAMETERS)"""
+        for name, value in params.items():
+            if name not in DENOISER_PARAMETERS:
+                raise ValueError(f"Unknown denoiser parameter: {name}")
+            setattr(self, name, value)
+
+    @property
+    def n_bins(self):
+        return self.n_fft // 2 + 1
+
+    @property
+    def latency_samples(self):
+        """Algorithmic delay between an input sample and its output"""
+        return self.n_fft - self.hop_length + self.core.prefill
+
+    @property
+    def latency_ms(self):
+        return 1000.0 * self.latency_samples / self.sample_rate
+
+    @property
+    def ready(self):
+        return self._thresh is not None or self.noise_tracker is not None
+
+    @property
+    def underruns(self):
+        """Blocks whose output had to be padded with silence"""
+        return self.core.underruns
+
+    def reset(self):
+        """Clear all streaming state (keeps the learned noise statistics)"""
+        self.core.reset()
+        self._mask_state.fill(0)
+
+    def _channels_first(self, data):
+        """(frames,) or (frames, channels) -> (channels, frames) float32"""
+        data = np.asarray(data, dtype=np.float32)
+        if data.ndim == 1:
+            data = data[:, None]
+        if data.shape[1] != self.channels:
+            raise ValueError(f"Expected {self.channels} channel(s), got {data.shape[1]}")
+        return data.T
+
+    def _frames(self, signal):
+        """Windowed (channels, frames, n_fft) STFT frames of a whole signal (for learning)"""
+        hop = self.hop_length
+        length = signal.shape[-1]
+        n_frames = (length - self.n_fft) // hop + 1 if length >= self.n_fft else 0
+        if n_frames <= 0:
+            return np.empty((signal.shape[0], 0, self.n_fft))
+        view = np.lib.stride_tricks.sliding_window_view(signal, self.n_fft, axis=-1)[:, ::hop][:, :n_frames]
+        return view * self.window
+
+    def learn_noise(self, noise):
+        """Compute per-channel, per-bin noise statistics from a noise-only recording"""
+        noise = self._channels_first(noise)
+        if noise.shape[1] < self.n_fft:
+            noise = np.pad(noise, ((0, 0), (0, self.n_fft - noise.shape[1])))
+        frames = self._frames(noise)
+        noise_db = 20.0 * np.log10(np.abs(np.fft.rfft(frames, axis=-1)) + 1e-10)
+        self.set_noise_stats(noise_db.mean(axis=1), noise_db.std(axis=1))
+
+    def set_noise_stats(self, mean_db, std_db):
+        """Install precomputed (channels, bins) or (bins,) noise statistics in dB"""
+        shape = (self.channels, self.n_bins)
+        self.noise_mean_db = np.broadcast_to(np.asarray(mean_db, dtype=np.float32), shape).copy()
+        self.noise_std_db = np.broadcast_to(np.asarray(std_db, dtype=np.float32), shape).copy()
+        self._mean_db = self.noise_mean_db.astype(np.float64)
+        self._std_db = self.noise_std_db.astype(np.float64)
+        self._thresh = np.zeros(shape)
+        self._update_threshold()
+        if self.noise_tracker is not None:
+            self.noise_tracker.seed_from_db(self.noise_mean_db)
+
+    def _update_threshold(self):
+        """Magnitude threshold for the current n_std_thresh, from the learned statistics"""
+        # Compare magnitudes directly so no log is needed per block
+        thresh = self._thresh
+        np.multiply(self._std_db, self.n_std_thresh, out=thresh)
+        thresh += self._mean_db
+        thresh /= 20.0
+        np.power(10.0, thresh, out=thresh)
+        np.copyto(self._thresh_frames, thresh)
+
+    def _gain(self, mag, mask):
+        """Smoothed gating gain for a (frames, channels, bins) magnitude array, into mask"""
+        frames = len(mag)
+        above = self._above[:frames]
+        np.greater(mag, self._thresh_frames[:frames], out=above)
+        np.copyto(mask, above)
+
+        # Frequency smoothing softens the gate edges but never closes
+        # a bin that is clearly above the noise threshold
+        k = len(self._freq_kernel)
+        if k > 1:
+            half = k // 2
+            rows = frames * self.channels
+            padded = self._padded[:rows]
+            np.copyto(padded[:, half:half + self.n_bins], mask.reshape(rows, self.n_bins))
+            # Output j of the flat sum is bin j % width of its row; taps that
+            # reach into the next row only land on the discarded edge columns
+            flat = padded.reshape(-1)
+            n = flat.size - k + 1
+            smoothed, tmp = self._smoothed[:n], self._tmp[:n]
+            smoothed.fill(0)
+            for i, w in enumerate(self._freq_kernel):
+                np.multiply(flat[i:i + n], w, out=tmp)
+                smoothed += tmp
+            valid = mag  # Magnitudes are no longer needed: reuse the buffer
+            np.copyto(valid.reshape(rows, self.n_bins),
+                      self._smoothed[:flat.size].reshape(rows, -1)[:, :self.n_bins])
+            np.maximum(mask, valid, out=mask)
+
+        # Time smoothing carried across blocks: fast attack, slow release
+        state, up, step, diff = self._mask_state, self._up, self._step, self._diff
+        strength = self._strength
+        for f in range(frames):
+            frame = mask[f]
+            np.greater(frame, state, out=up)
+            step.fill(self._release_step)
+            np.copyto(step, self._attack_step, where=up)
+            np.subtract(frame, state, out=diff)
+            diff *= step
+            state += diff
+            np.copyto(frame, state)
+
+            s = strength.step()
+            if s != 1.0:
+                frame *= s
+                frame += 1.0 - s
+        return mask
+
+    def process(self, block, gain=None, out=None):
+        """Denoise one block; returns the same shape
+
+        With a gain, the spectral stage is skipped and the block is only
+        scaled, through the same framing and overlap-add so the delay and
+        streaming state stay continuous (the cheap path for non-speech).
+        out: optional array of the block's shape to write the result into.
+        """
+        x = self._channels_first(block)
+        core = self.core
+        if x.shape[1] > core.block_size:
+            core.push(x)  # Grows the core's buffers
+            self._allocate()
+        else:
+            core.push(x)
+        frames = core.n_frames
+
+        if frames:
+            if gain is not None:
+                # irfft(rfft(frame)) == frame, so a flat gain needs no FFT at all
+                core.scale(gain)
+                self._mask_state.fill(gain)  # Re-open from here when spectral gating resumes
+            else:
+                # One batched FFT/IFFT pair for every frame of every channel
+                spec = core.rfft()
+                if self.ready:
+                    if self._n_std.ramping:
+                        self._n_std.step(frames)
+                        if self._mean_db is not None and self.noise_tracker is None:
+                            self._update_threshold()
+                    mag = np.abs(spec, out=self._mag[:frames])
+                    if self.noise_tracker is not None:
+                        power = np.square(mag, out=self._power[:frames])
+                        self.noise_tracker.update(power.transpose(1, 0, 2))
+                        if self._thresh is None:
+                            self._thresh = np.zeros((self.channels, self.n_bins))
+                        self.noise_tracker.threshold(self.n_std_thresh, out=self._thresh)
+                        np.copyto(self._thresh_frames, self._thresh)
+                    mask = self._gain(mag, self._mask[:frames])
+                    # Real and imaginary parts separately: no complex temporary
+                    np.multiply(spec.real, mask, out=spec.real)
+                    np.multiply(spec.imag, mask, out=spec.imag)
+                core.irfft()
+            core.overlap_add()
+
+        if out is None:
+            out = np.empty(np.shape(block)[:1] + ((self.channels,) if np.ndim(block) > 1 else ()),
+                           dtype=np.float32)
+        core.pop(out.T if out.ndim > 1 else out[None])
+        return out
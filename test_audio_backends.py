@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Checks for the file/null/memory audio backends driving the live engine
+"""
+
+import time
+
+import numpy as np
+
+from audio_backends import MemoryBackend
+from audio_pipeline import BlockProcessor
+from engine import SpeakerLove
+
+
+def _run_until_drained(engine, backend, frames, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    engine.start()
+    try:
+        while backend.pending("mic") or engine.input_ring.fill or len(backend.capture("out")) < frames:
+            assert time.monotonic() < deadline, "timed out"
+            time.sleep(0.001)
+    finally:
+        engine.stop()
+    return backend.capture("out")
+
+
+def test_fast_pacing_matches_offline_processing():
+    """As-fast-as-possible pacing processes every block, exactly like the offline path"""
+    rng = np.random.default_rng(0)
+    mic = (0.05 * rng.standard_normal(48000 * 2)).astype(np.float32)
+    backend = MemoryBackend(realtime=False)
+    backend.feed("mic", mic)
+    engine = SpeakerLove("mic", "out", engine="streaming", blocksize=512, backend=backend)
+    engine.enabled = True
+    out = _run_until_drained(engine, backend, len(mic))
+
+    offline = BlockProcessor(48000, 512, "streaming", engine.processor.frames_to_learn)
+    expected = np.concatenate([offline.process(mic[i:i + 512, None]) for i in range(0, len(mic), 512)])
+    np.testing.assert_array_equal(out[:len(expected)], expected)
+    snap = engine.metrics.snapshot()
+    assert snap["dropped_input_blocks"] == snap["dropped_output_blocks"] == 0
+    assert snap["underrun_output_blocks"] == 0
+
+
+def test_realtime_pacing_and_loopback():
+    """Real-time streams keep the block clock; outputs loop back to inputs on the same device"""
+    backend = MemoryBackend()
+    backend.feed("mic", np.full(4800, 0.25, dtype=np.float32))
+    engine = SpeakerLove("mic", "speakers", engine="streaming", blocksize=480, backend=backend,
+                         reference_device="speakers", auto_delay=False)
+    started = time.monotonic()
+    engine.start()
+    time.sleep(0.5)
+    engine.stop()
+    elapsed = time.monotonic() - started
+
+    out = backend.capture("speakers")[:, 0]
+    assert abs(len(out) / 48000 - elapsed) < 0.1
+    assert np.isclose(out, 0.25).sum() == 4800   # Passthrough (not enabled), in order
+    assert engine.metrics.snapshot()["dropped_input_blocks"] == 0
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"{name}: OK")
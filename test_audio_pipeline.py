@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Checks for the block processor's live parameters on the noisereduce engine
+"""
+
+import numpy as np
+
+from audio_pipeline import BlockProcessor
+
+
+def _learned(rng):
+    processor = BlockProcessor(48000, 4800, "noisereduce", frames_to_learn=2)
+    for _ in range(2):
+        processor.process((0.02 * rng.standard_normal((4800, 1))).astype(np.float32))
+    assert not processor.learning_mode
+    return processor
+
+
+def test_threshold_and_smoothing_reach_noisereduce():
+    rng = np.random.default_rng(0)
+    processor = _learned(rng)
+    t = np.arange(4800) / 48000
+    block = (0.02 * rng.standard_normal(4800) + 0.03 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)[:, None]
+
+    default = processor.process(block)
+    assert not np.array_equal(default, block)  # Denoised, not passed through on an error
+    np.testing.assert_array_equal(processor.process(block), default)
+
+    # A higher threshold gates more of the block away
+    processor.set_params(n_std_thresh=10.0)
+    strict = processor.process(block)
+    assert np.std(strict) < 0.9 * np.std(default)
+
+    # Smoothing changes the mask too; widths below noisereduce's resolution mean none
+    processor.set_params(n_std_thresh=1.5, release_ms=200.0)
+    assert not np.allclose(processor.process(block), default)
+    processor.set_params(attack_ms=0.0, release_ms=0.0, freq_smooth_hz=0.0)
+    unsmoothed = processor.process(block)
+    assert not np.array_equal(unsmoothed, block) and not np.allclose(unsmoothed, default)
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"{name}: OK")
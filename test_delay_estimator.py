@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Checks for the GCC-PHAT mic/loopback delay estimator
+"""
+
+import numpy as np
+
+from delay_estimator import DelayEstimator
+
+
+def _push(estimator, reference, delay, rng, block=2048):
+    """Feed reference and a mic that hears it delay samples late, over its own noise"""
+    mic = 0.5 * np.concatenate([np.zeros(delay), reference[:len(reference) - delay]])
+    mic += 0.01 * rng.standard_normal(len(mic))
+    for i in range(0, len(reference) - block + 1, block):
+        estimator.push(mic[i:i + block], reference[i:i + block])
+
+
+def test_recovers_a_known_delay():
+    rng = np.random.default_rng(0)
+    estimator = DelayEstimator(48000, 2048)
+    _push(estimator, 0.3 * rng.standard_normal(96000), 1200, rng)
+    assert estimator.estimate() == 1200
+    assert estimator.delay_samples == 1200 and estimator.confidence > estimator.min_confidence
+
+
+def test_tonal_reference_keeps_the_last_delay():
+    """A steady tone correlates at every period: no estimate rather than a wrong one"""
+    rng = np.random.default_rng(1)
+    estimator = DelayEstimator(48000, 2048)
+    _push(estimator, 0.3 * rng.standard_normal(96000), 1200, rng)
+    assert estimator.estimate() == 1200
+
+    tone = 0.3 * np.sin(2 * np.pi * 440 * np.arange(96000) / 48000)
+    _push(estimator, tone, 600, rng)
+    assert estimator.estimate() is None
+    assert estimator.uniqueness < estimator.min_uniqueness
+    assert estimator.delay_samples == 1200
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"{name}: OK")
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Checks for device classification, caching and hot-plug detection
+"""
+
+import sys
+import threading
+import time
+import types
+
+import device_catalog
+from device_catalog import DeviceCatalog
+
+
+def _info(name, inputs, outputs):
+    return {"name": name, "max_input_channels": inputs, "max_output_channels": outputs,
+            "default_samplerate": 48000.0}
+
+
+MME = [
+    (_info("Microsoft Sound Mapper - Output", 0, 2), "MME"),
+    (_info("Microphone (Realtek Audio)", 2, 0), "MME"),
+    (_info("Stereo Mix (Realtek Audio)", 2, 0), "MME"),
+    (_info("VoiceMeeter Input (VB-Audio VoiceMeeter VAIO)", 0, 8), "MME"),
+    (_info("Speakers (Realtek Audio)", 0, 2), "MME"),
+]
+WASAPI = [
+    (_info("Microphone (Realtek Audio)", 2, 0), "Windows WASAPI"),
+    (_info("Speakers (Realtek Audio)", 0, 2), "Windows WASAPI"),
+]
+USB_MIC = (_info("Microphone (USB Audio Device)", 1, 0), "MME")
+
+
+class FakePortAudio:
+    def __init__(self, devices):
+        self.devices = list(devices)
+        self.visible = list(devices)  # What PortAudio saw at its last initialisation
+        self.rescans = 0
+
+    def __call__(self, rescan):
+        if rescan:
+            self.rescans += 1
+            self.visible = list(self.devices)
+        return self.visible
+
+
+def test_classifies_in_one_pass():
+    catalog = DeviceCatalog(FakePortAudio(MME + WASAPI))
+    assert [d.label for d in catalog.mics] == ["[1] Microphone (Realtek Audio)", "[5] Microphone (Realtek Audio)"]
+    assert [d.index for d in catalog.outputs] == [3, 0, 4, 6]  # Virtual output first
+    assert catalog.default_output().index == 3
+    assert {d.index for d in catalog.loopbacks} == {2, 3}
+
+
+def test_hotplug_diff_and_reselection():
+    portaudio = FakePortAudio(MME + WASAPI)
+    running = [False]
+    catalog = DeviceCatalog(portaudio, can_rescan=lambda: not running[0])
+    wasapi_before = [d for d in catalog.devices() if d.hostapi == "Windows WASAPI"]
+
+    # Plugged in while streaming: PortAudio is not restarted, nothing changes yet
+    portaudio.devices = MME[:2] + [USB_MIC] + MME[2:] + WASAPI
+    running[0] = True
+    assert catalog.refresh() == ([], [])
+    running[0] = False
+    added, removed = catalog.refresh()
+    assert [d.name for d in added] == ["Microphone (USB Audio Device)"] and removed == []
+    usb = added[0]
+
+    # Later host APIs move up an index; a refresh without changes re-uses everything
+    wasapi_after = [d for d in catalog.devices() if d.hostapi == "Windows WASAPI"]
+    assert [d.index for d in wasapi_after] == [d.index + 1 for d in wasapi_before]
+    unchanged = catalog.devices()
+    assert catalog.refresh() == ([], [])
+    assert all(a is b for a, b in zip(catalog.devices(), unchanged))
+
+    # Unplugged, then back at a different index: found again by key
+    portaudio.devices = MME + WASAPI
+    added, removed = catalog.refresh()
+    assert [d.name for d in removed] == [usb.name] and catalog.find(usb.key) is None
+    portaudio.devices = MME + WASAPI + [USB_MIC]
+    catalog.refresh()
+    assert catalog.find(usb.key).index == len(MME) + len(WASAPI)
+
+
+def test_watch_reports_changes():
+    portaudio = FakePortAudio(MME)
+    signature = [0]  # Bumped by the OS when devices come and go
+    catalog = DeviceCatalog(portaudio, os_signature=lambda: signature[0])
+    catalog.devices()
+    changed = threading.Event()
+    catalog.watch(lambda added, removed: changed.set(), interval_s=0.01)
+    try:
+        portaudio.devices = MME + [USB_MIC]
+        signature[0] += 1
+        assert changed.wait(2.0)
+        assert catalog.mics[-1].name == USB_MIC[0]["name"]
+    finally:
+        catalog.stop_watching()
+
+
+def test_watch_leaves_portaudio_alone_while_idle():
+    """No OS change, no restart; a change while streaming waits for the streams to stop"""
+    portaudio = FakePortAudio(MME)
+    signature = [0]
+    running = [True]
+    catalog = DeviceCatalog(portaudio, can_rescan=lambda: not running[0], os_signature=lambda: signature[0])
+    catalog.devices()
+    changed = threading.Event()
+    catalog.watch(lambda added, removed: changed.set(), interval_s=0.01)
+    try:
+        time.sleep(0.2)
+        assert portaudio.rescans == 0
+
+        portaudio.devices = MME + [USB_MIC]
+        signature[0] += 1
+        time.sleep(0.2)
+        assert portaudio.rescans == 0 and not changed.is_set()
+        running[0] = False
+        assert changed.wait(2.0) and portaudio.rescans == 1
+        time.sleep(0.2)
+        assert portaudio.rescans == 1
+    finally:
+        catalog.stop_watching()
+
+
+def test_rescan_without_portaudio_restart_keeps_the_list():
+    """A sounddevice without the private restart calls falls back to its current list"""
+    sd = types.ModuleType("sounddevice")
+    sd.query_hostapis = lambda: [{"name": "MME"}]
+    sd.query_devices = lambda: [dict(info, hostapi=0) for info, _ in MME]
+    saved = sys.modules.get("sounddevice")
+    sys.modules["sounddevice"] = sd
+    try:
+        catalog = DeviceCatalog()
+        before = catalog.devices()
+        assert catalog.refresh() == ([], [])
+        assert catalog.devices() == before and device_catalog._warned_no_rescan
+    finally:
+        if saved is None:
+            del sys.modules["sounddevice"]
+        else:
+            sys.modules["sounddevice"] = saved
+
+
+class _FakeRoot:
+    """Tk's after() scheduling, run by hand"""
+
+    def __init__(self):
+        self.pending = {}
+        self.scheduled = 0
+
+    def after(self, ms, callback):
+        self.scheduled += 1
+        self.pending[f"after#{self.scheduled}"] = callback
+        return f"after#{self.scheduled}"
+
+    def run_pending(self):
+        pending, self.pending = self.pending, {}
+        for callback in pending.values():
+            callback()
+
+
+def test_refreshes_share_one_hotplug_poll():
+    from SpeakerLove import GUI
+
+    gui = GUI.__new__(GUI)  # No window: only the polling is exercised
+    gui.root = _FakeRoot()
+    gui.catalog = DeviceCatalog(FakePortAudio(MME))
+    gui._devices_changed = threading.Event()
+    gui._hotplug_after = None
+    gui._device_error = None
+    gui._device_thread = threading.Thread(target=lambda: None)
+    gui._device_thread.start()
+    gui._device_thread.join()
+    shown = []
+    gui.show_devices = lambda: shown.append(True)
+    try:
+        for _ in range(2):  # Two "Refresh Devices" clicks
+            gui._poll_devices()
+        assert list(gui.root.pending) == [gui._hotplug_after]
+
+        gui._devices_changed.set()
+        gui.root.run_pending()
+        assert list(gui.root.pending) == [gui._hotplug_after] and len(shown) == 3
+    finally:
+        gui.catalog.stop_watching()
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"{name}: OK")
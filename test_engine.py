@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Checks for the headless engine API: config, callbacks, reconfigure
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+from audio_backends import MemoryBackend
+from engine import EngineConfig, SpeakerLove
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_engine_imports_without_tkinter():
+    proc = subprocess.run([sys.executable, "-c", "import sys, engine; print('tkinter' in sys.modules)"],
+                          capture_output=True, text=True, cwd=HERE)
+    assert proc.stdout.split()[-1] == "False", proc.stderr
+
+
+def test_config_is_validated():
+    for bad in ({"engine": "magic"}, {"noise_mode": "sometimes"}, {"low_latency": True, "engine": "noisereduce"}):
+        try:
+            EngineConfig("mic", "out", **bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"accepted {bad}")
+    try:
+        SpeakerLove("mic", config=EngineConfig("mic", "out"), backend=MemoryBackend())
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("accepted both a config and devices")
+
+
+def test_callbacks_and_reconfigure_while_running():
+    backend = MemoryBackend()
+    backend.feed("mic", np.zeros(48000 * 2, dtype=np.float32))
+    snapshots = []
+    got_metrics = threading.Event()
+
+    def on_metrics(snapshot):
+        snapshots.append(snapshot)
+        got_metrics.set()
+
+    config = EngineConfig("mic", "out", engine="streaming", blocksize=480, metrics_log_interval=0.05)
+    engine = SpeakerLove(config=config, backend=backend, on_metrics=on_metrics)
+    engine.enabled = True
+    assert engine.start()
+    try:
+        assert got_metrics.wait(2.0)
+        thread = engine._process_thread
+        assert engine.reconfigure(vad=True, blocksize=960)
+        # The old processing loop ended before the new one started
+        assert not thread.is_alive() and engine._process_thread is not thread
+        assert engine.running and engine.enabled and engine.blocksize == 960
+        assert engine.chain.vad is not None
+        blocks = engine.metrics.blocks
+        time.sleep(0.2)
+        assert engine.metrics.blocks > blocks  # Still processing after the restart
+    finally:
+        engine.stop()
+    assert engine._process_thread is None and not thread.is_alive()
+    assert snapshots[0]["block_budget_ms"] == 10.0
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def test_live_changes_keep_the_dsp_warm():
+    backend = MemoryBackend()
+    backend.feed("mic", 0.05 * np.random.default_rng(0).standard_normal(48000 * 3).astype(np.float32))
+    engine = SpeakerLove("mic", "speakers", engine="streaming", blocksize=480, backend=backend)
+    engine.enabled = True
+    assert engine.start()
+    try:
+        _wait_for(lambda: engine.processor.denoiser is not None)
+        chain, denoiser, mic_stream = engine.chain, engine.processor.denoiser, engine.mic_stream
+
+        assert engine.reconfigure(prop_decrease=0.5, gate_db=-30.0, output_device="headset")
+        _wait_for(lambda: denoiser._strength.target == 0.5)
+        _wait_for(lambda: len(backend.capture("headset")) >= 4800)
+        # Same DSP objects, same mic stream: nothing was rebuilt or relearned
+        assert engine.chain is chain and engine.processor.denoiser is denoiser
+        assert engine.mic_stream is mic_stream and engine.running
+        assert engine.output_device == engine.config.output_device == "headset"
+        assert abs(chain._gate.target - 10 ** (-30 / 20)) < 1e-9
+        # The new device fades in from silence
+        first = next(block for block in backend.capture("headset").reshape(-1, 480) if block.any())
+        assert first[0] == 0.0 and abs(first[1]) < abs(first).max()
+    finally:
+        engine.stop()
+
+
+def test_worker_engine_restarts_after_stop():
+    backend = MemoryBackend()
+    backend.feed("mic", 0.05 * np.random.default_rng(0).standard_normal(48000 * 4).astype(np.float32))
+    engine = SpeakerLove("mic", "out", engine="streaming", blocksize=480, worker_process=True,
+                         prop_decrease=0.0, backend=backend)
+    engine.enabled = True
+    try:
+        for _ in range(2):
+            captured = len(backend.capture("out"))
+            assert engine.start(), engine.last_error
+            # Processed audio, not the silence of an output ring nobody fills
+            _wait_for(lambda: np.abs(backend.capture("out")[captured:]).max(initial=0.0) > 0.01, timeout=30.0)
+            engine.stop()
+        assert engine.metrics.errors == 0
+    finally:
+        engine.stop()
+
+
+def test_start_failure_is_reported_not_shown():
+    class BrokenBackend(MemoryBackend):
+        def output_stream(self, *args, **kwargs):
+            raise OSError("device unplugged")
+
+    errors = []
+    engine = SpeakerLove("mic", "out", engine="streaming", backend=BrokenBackend(), on_error=errors.append)
+    assert not engine.start()
+    assert not engine.running
+    assert isinstance(engine.last_error, OSError) and errors == [engine.last_error]
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"{name}: OK")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Checks for the drift-compensating jitter buffer
+"""
+
+import numpy as np
+
+import jitter_buffer
+import ring_buffer
+from jitter_buffer import FractionalResampler, JitterBuffer
+from ring_buffer import RingBuffer
+
+
+def test_resampler_is_continuous_across_blocks():
+    sr = 48000
+    x = np.sin(2 * np.pi * 440 * np.arange(sr) / sr).astype(np.float32)
+    resampler = FractionalResampler()
+    np.testing.assert_array_equal(resampler.process(x[:1000])[2:, 0], x[:998])
+
+    resampler = FractionalResampler()
+    ratio = 1.0005
+    rng = np.random.default_rng(0)
+    cuts = np.sort(rng.integers(0, len(x), 40))
+    out = np.concatenate([resampler.process(part, ratio) for part in np.split(x, cuts)])[:, 0]
+    positions = ratio * np.arange(len(out)) - 2  # Read positions in x (output starts 2 samples early)
+    expected = np.sin(2 * np.pi * 440 * positions / sr)
+    np.testing.assert_allclose(out[2:], expected[2:], atol=1e-3)
+
+
+class _Clock:
+    """Stands in for the time module so a session can be simulated quickly"""
+    now = 0.0
+
+    def monotonic_ns(self):
+        return int(self.now * 1e9)
+
+
+def test_holds_target_fill_under_drift():
+    sr, block = 48000, 2048
+    clock = _Clock()
+    real_time = jitter_buffer.time
+    jitter_buffer.time = ring_buffer.time = clock
+    try:
+        for drift in (150e-6, -150e-6):
+            ring = RingBuffer(4 * block)
+            jb = JitterBuffer(ring, sr, block)
+            silence = np.zeros((block, 1), dtype=np.float32)
+            out = np.zeros((block, 1), dtype=np.float32)
+            t_in, t_out = block / sr, block / sr / 2
+            while t_in < 600:
+                if t_in <= t_out:
+                    clock.now = t_in
+                    jb.write(silence)
+                    t_in += block / sr
+                else:
+                    clock.now = t_out
+                    ring.read_into(out, zero_fill=True)
+                    t_out += block / (sr * (1 + drift))
+            assert ring.overruns == 0 and ring.underruns <= 1  # Only while first filling
+            assert abs(jb.fill - jb.target_fill) < 64
+            assert abs(jb.drift_ppm + drift * 1e6) < 30
+    finally:
+        jitter_buffer.time = ring_buffer.time = real_time
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"{name}: OK")
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Checks for the lock-free live parameter channel and ramps
+"""
+
+import pickle
+
+from live_params import ParameterChannel, Ramp, SharedParameterChannel
+
+
+def test_updates_coalesce_into_one_snapshot():
+    channel = ParameterChannel({"prop_decrease": 1.0, "gate_db": -40.0})
+    assert channel.poll() is None  # The initial values are not news
+    channel.set(prop_decrease=0.5)
+    channel.set(gate_db=-30.0)
+    assert channel.poll() == {"prop_decrease": 0.5, "gate_db": -30.0}
+    assert channel.poll() is None
+    try:
+        channel.set(volume=11)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("accepted an unknown parameter")
+
+
+def test_shared_channel_attaches_by_pickling():
+    owner = SharedParameterChannel({"prop_decrease": 1.0})
+    reader = pickle.loads(pickle.dumps(owner))
+    try:
+        owner.set(prop_decrease=0.25)
+        assert reader.poll() == {"prop_decrease": 0.25}
+        assert reader.poll() is None
+    finally:
+        reader.close()
+        owner.close()
+    assert owner.values() == {"prop_decrease": 0.25}
+
+
+def test_ramp_reaches_target_in_steps():
+    ramp = Ramp(1.0, steps=4)
+    ramp.set(0.0)
+    assert [ramp.step() for _ in range(5)] == [0.75, 0.5, 0.25, 0.0, 0.0]
+    ramp.set(1.0)
+    assert ramp.step(10) == 1.0 and not ramp.ramping
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"{name}: OK")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Checks for pipeline metrics: status flags, ring dropouts and the JSON log
+"""
+
+import io
+import json
+import time
+
+import numpy as np
+
+from metrics import PipelineMetrics
+from ring_buffer import RingBuffer
+
+
+class _Status:
+    """Stands in for sounddevice.CallbackFlags"""
+
+    def __init__(self, **flags):
+        self.__dict__.update(flags)
+
+
+def test_status_flags_are_counted_per_side():
+    metrics = PipelineMetrics(0.01)
+    metrics.record_status("mic", _Status(input_overflow=True))
+    metrics.record_status("mic", _Status(input_overflow=True, input_underflow=True))
+    metrics.record_status("output", _Status(output_underflow=True, priming_output=False))
+    metrics.record_status("reference", _Status(output_underflow=True))  # Not a reference flag
+    counts = metrics.snapshot()["status"]
+    assert counts["mic.input_overflow"] == 2 and counts["mic.input_underflow"] == 1
+    assert counts["output.output_underflow"] == 1 and counts["output.priming_output"] == 0
+    assert not any(counts[key] for key in counts if key.startswith("reference."))
+
+
+def test_ring_dropouts_and_depths():
+    input_ring, output_ring = RingBuffer(4), RingBuffer(4)
+    metrics = PipelineMetrics(0.01, input_ring, output_ring)
+    block = np.ones((3, 1), dtype=np.float32)
+    input_ring.write(block)
+    input_ring.write(block)  # Does not fit: dropped
+    output_ring.write(block)
+    metrics.record_block(0.002, 0.001)
+    output_ring.read_into(np.zeros((4, 1), dtype=np.float32), zero_fill=True)  # One frame short
+
+    snap = metrics.snapshot()
+    assert snap["dropped_input_blocks"] == 1 and snap["dropped_output_blocks"] == 0
+    assert snap["underrun_output_blocks"] == 1
+    assert snap["max_input_depth"] == 3 and snap["max_output_depth"] == 3
+    assert snap["blocks"] == 1 and snap["process"]["max_ms"] == 2.0
+
+
+def test_log_writes_json_lines():
+    metrics = PipelineMetrics(0.01)
+    metrics.record_status("output", _Status(output_underflow=True))
+    metrics.record_block(0.02, 0.01)  # Twice the 10 ms budget
+    stream = io.StringIO()
+    metrics.start_log(0.02, stream=stream)
+    try:
+        deadline = time.monotonic() + 5.0
+        while stream.getvalue().count("\n") < 2:
+            assert time.monotonic() < deadline, "timed out"
+            time.sleep(0.01)
+    finally:
+        metrics.stop_log()
+
+    lines = stream.getvalue().splitlines()
+    line = json.loads(lines[0])
+    assert line["status"]["output.output_underflow"] == 1
+    assert line["blocks"] == 1 and line["load"] == 2.0 and line["behind_realtime"] is True
+    assert json.loads(lines[-1])["time"] >= line["time"]
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"{name}: OK")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Checks for the on-disk noise profile cache
+"""
+
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from audio_pipeline import BlockProcessor
+from noise_profiles import NoiseProfileStore
+
+
+def test_cached_profile_is_active_from_first_block():
+    rng = np.random.default_rng(0)
+    noise = (0.05 * rng.standard_normal((2048 * 20, 1))).astype(np.float32)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = NoiseProfileStore(os.path.join(tmp, "profiles.bin"))
+        first = BlockProcessor(48000, 2048, "streaming", profile_store=store, profile_key="USB Mic")
+        for i in range(10):
+            first.process(noise[i * 2048:(i + 1) * 2048])
+        assert not first.learning_mode and not first.profile_cached
+
+        second = BlockProcessor(48000, 2048, "streaming", profile_store=store, profile_key="USB Mic")
+        assert second.profile_cached and not second.learning_mode
+        np.testing.assert_allclose(second.denoiser.noise_mean_db, first.denoiser.noise_mean_db, atol=1e-5)
+        out = np.concatenate([second.process(noise[i:i + 2048]) for i in range(0, 2048 * 8, 2048)])
+        assert np.std(out[4096:]) < 0.4 * np.std(noise)
+
+        # Other devices, rates and analysis sizes do not share the profile
+        assert store.get("Other Mic", 48000, 1024) is None
+        assert store.get("USB Mic", 44100, 1024) is None
+        assert store.get("USB Mic", 48000, 512) is None
+
+
+def test_eviction_by_age_and_lru():
+    stats = np.zeros((1, 513), dtype=np.float32)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = NoiseProfileStore(os.path.join(tmp, "profiles.bin"), max_entries=2, max_age_s=3600,
+                                  touch_interval_s=0)
+        store.put("a", 48000, stats, stats)
+        store.put("b", 48000, stats, stats)
+        assert store.get("a", 48000, 1024) is not None  # "a" is now the most recently used
+        store.put("c", 48000, stats, stats)
+        assert store.get("b", 48000, 1024) is None
+        assert store.get("a", 48000, 1024) is not None
+
+        store.max_age_s = 0
+        time.sleep(0.01)
+        assert store.get("c", 48000, 1024) is None
+
+
+def test_regularly_used_profile_still_expires():
+    """Age counts from when a profile was learned, not when it was last used"""
+    stats = np.zeros((1, 513), dtype=np.float32)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = NoiseProfileStore(os.path.join(tmp, "profiles.bin"), max_age_s=0.5)
+        learned = time.monotonic()
+        store.put("a", 48000, stats, stats)
+        for _ in range(4):  # Used every 100 ms
+            time.sleep(0.1)
+            assert store.get("a", 48000, 1024) is not None
+        # Last used < 0.3 s ago, but learned > 0.5 s ago
+        time.sleep(max(0.0, learned + 0.6 - time.monotonic()))
+        assert store.get("a", 48000, 1024) is None
+
+        store.put("a", 48000, stats, stats)  # Learned again: fresh
+        assert store.get("a", 48000, 1024) is not None
+
+
+def test_hits_only_rewrite_the_store_once_a_day():
+    stats = np.zeros((1, 513), dtype=np.float32)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "profiles.bin")
+        store = NoiseProfileStore(path)
+        store.put("a", 48000, stats, stats)
+        written = os.stat(path).st_ino, os.stat(path).st_mtime_ns
+        for _ in range(3):
+            assert store.get("a", 48000, 1024) is not None
+        assert (os.stat(path).st_ino, os.stat(path).st_mtime_ns) == written
+
+        store.touch_interval_s = 0  # The stored use is now "a day" old
+        assert store.get("a", 48000, 1024) is not None
+        assert os.stat(path).st_ino != written[0]  # Replaced by a new file
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"{name}: OK")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Checks for the lock-free ring buffer
+"""
+
+import pickle
+
+import numpy as np
+
+from ring_buffer import RingBuffer, SharedRingBuffer
+
+
+def test_wraparound_preserves_order():
+    ring = RingBuffer(10)
+    out = np.zeros((4, 1), dtype=np.float32)
+    seen = []
+    for i in range(20):
+        assert ring.write(np.arange(i * 4, i * 4 + 4, dtype=np.float32)[:, None])
+        assert ring.read_into(out) == 4
+        seen.extend(out[:, 0])
+    assert seen == list(range(80))
+    assert ring.overruns == 0 and ring.underruns == 0
+
+
+def test_overrun_drops_whole_block():
+    ring = RingBuffer(8)
+    assert ring.write(np.ones(6, dtype=np.float32))
+    assert not ring.write(np.ones(4, dtype=np.float32))
+    assert ring.fill == 6
+    assert ring.overruns == 1
+
+
+def test_underrun_zero_fills():
+    ring = RingBuffer(8)
+    ring.write(np.full(3, 0.5, dtype=np.float32))
+    out = np.ones((5, 1), dtype=np.float32)
+    assert ring.read_into(out) == 0  # Not enough: nothing consumed
+    assert ring.fill == 3
+    assert ring.read_into(out, zero_fill=True) == 3
+    assert out[:, 0].tolist() == [0.5, 0.5, 0.5, 0.0, 0.0]
+    assert ring.underruns == 1
+
+
+def test_shared_ring_attaches_by_name():
+    """A pickled copy (as handed to a worker process) sees the same frames and counters"""
+    ring = SharedRingBuffer(8, 2)
+    other = pickle.loads(pickle.dumps(ring))
+    try:
+        assert ring.write(np.arange(12, dtype=np.float32).reshape(6, 2))
+        assert not ring.write(np.ones((4, 2), dtype=np.float32))
+        out = np.zeros((6, 2), dtype=np.float32)
+        assert other.read_into(out) == 6
+        assert out.ravel().tolist() == list(range(12))
+        assert ring.fill == 0 and other.overruns == 1
+    finally:
+        other.close()
+        ring.close()
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"{name}: OK")
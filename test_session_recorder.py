@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Checks for session recording, segment rotation and timed replay
+"""
+
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import session_recorder
+from audio_backends import MemoryBackend
+from engine import SpeakerLove
+from replay_session import replay
+from session_recorder import CONTROL, MIC, OUTPUT, RING_DROPOUT, SessionRecorder, read_session
+
+
+class _Flags:
+    input_overflow = True
+
+
+def test_segments_rotate_within_the_budget():
+    with tempfile.TemporaryDirectory() as tmp:
+        recorder = SessionRecorder(tmp, {"params": {"gate_db": -40.0}, "enabled": False}, max_mb=0.5)
+        block = np.ones((480, 1), dtype=np.float32)
+        for i in range(1000):  # ~1.9 MB of audio into a 0.5 MB budget
+            recorder.record(MIC, block * i, _Flags() if i == 999 else None)
+            if i == 100:
+                recorder.control(params={"gate_db": -20.0})
+        recorder.close()
+
+        segments = sorted(os.listdir(tmp))
+        assert len(segments) == session_recorder.SEGMENTS and segments[0] != "segment-00000000.slog"
+        budget = 0.5 * 1024 * 1024 + len(segments) * (session_recorder.RECORD.size + block.nbytes)
+        assert sum(os.path.getsize(os.path.join(tmp, s)) for s in segments) < budget
+
+        (header, records), = read_session(tmp)
+        records = list(records)
+        audio = [r for r in records if r[0] == MIC]
+        # The newest blocks survive, contiguous and in order
+        assert [int(data[0, 0]) for _, _, _, data in audio] == list(range(1000 - len(audio), 1000))
+        assert all(a[2] <= b[2] for a, b in zip(audio, audio[1:]))
+        assert audio[-1][1] == 0b10 and audio[-2][1] == 0
+        # The change itself was rotated away, but the surviving segments start from it
+        assert not [kind for kind, _, _, _ in records if kind == CONTROL]
+        assert header["params"]["gate_db"] == -20.0
+
+
+def test_engine_records_and_replays():
+    rng = np.random.default_rng(0)
+    mic = (0.05 * rng.standard_normal(48000)).astype(np.float32)
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = MemoryBackend()
+        backend.feed("mic", mic)
+        engine = SpeakerLove("mic", "out", engine="streaming", blocksize=480, backend=backend, record_path=tmp)
+        engine.start()
+        time.sleep(0.2)
+        engine.enabled = True
+        engine.reconfigure(prop_decrease=0.5)
+        time.sleep(0.2)
+        engine.stop()
+
+        (header, records), = read_session(tmp)
+        assert header["blocksize"] == 480 and header["enabled"] is False
+        records = list(records)
+        recorded_mic = np.concatenate([data for kind, _, _, data in records if kind == MIC])
+        np.testing.assert_array_equal(recorded_mic[:, 0], mic[:len(recorded_mic)])
+        controls = [data for kind, _, _, data in records if kind == CONTROL]
+        assert controls == [{"enabled": True}, {"params": {"prop_decrease": 0.5}}]
+
+        report = replay(header, iter(records))
+        assert report["blocks"]["mic"] == len(recorded_mic) // 480
+        assert report["blocks"]["output"] == sum(kind == OUTPUT for kind, _, _, _ in records)
+        assert report["max_replay_late_ms"] < 50.0
+
+
+def test_replay_reproduces_a_callback_burst():
+    """Mic blocks that arrived in a burst overflow the input ring again on replay"""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = SpeakerLove("mic", "out", engine="streaming", blocksize=480, buffer_blocks=4,
+                             backend=MemoryBackend())
+        recorder = SessionRecorder(tmp, engine._record_header())
+        block = np.zeros((480, 1), dtype=np.float32)
+        records = []  # A steady 10 ms callback clock
+        for i in range(20):
+            records.append((MIC, 0, 0.01 * i, block))
+            records.append((OUTPUT, 0, 0.01 * i + 0.005, block))
+        # The driver stalled for 100 ms, then delivered everything at once
+        records += [(MIC, RING_DROPOUT if i >= 4 else 0, 0.3, block) for i in range(10)]
+        for record in records:
+            recorder._queue.append(record)
+        recorder.close()
+
+        (header, recorded), = read_session(tmp)
+        report = replay(header, recorded)
+        assert report["recorded"]["dropped_input_blocks"] == 6
+        assert report["replayed"]["dropped_input_blocks"] >= 1
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"{name}: OK")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Checks for the headless multi-session server (null audio backend)
+"""
+
+import time
+
+from session_server import SessionServer, _check_options
+
+
+def _wait_for(condition, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+def test_sessions_added_and_removed_independently():
+    server = SessionServer(workers=2)
+    try:
+        options = {"backend": "null", "engine": "streaming", "blocksize": 512}
+        server.add_session("a", options)
+        server.add_session("b", options)
+        _wait_for(lambda: all(s["blocks"] > 20 for s in server.snapshot()["sessions"].values()))
+
+        server.remove_session("a")
+        before = server.snapshot()["sessions"]["b"]["blocks"]
+        _wait_for(lambda: server.snapshot()["sessions"]["b"]["blocks"] > before + 20)
+
+        # Live parameters reach the running worker session; nothing restarts
+        dsp_session = server.sessions["b"].dsp_session
+        assert server.update_session("b", dict(options, prop_decrease=0.5))
+        assert server.sessions["b"].dsp_session is dsp_session
+        assert dsp_session.params.values()["prop_decrease"] == 0.5
+        assert not server.update_session("b", dict(options, backend="memory"))
+
+        snap = server.snapshot()
+        assert list(snap["sessions"]) == ["b"]
+        assert snap["workers"] == 2 and snap["worker_restarts"] == 0
+        assert snap["sessions"]["b"]["errors"] == 0
+    finally:
+        server.close()
+
+
+def test_every_engine_option_is_a_session_option():
+    _check_options({"mic": 3, "profile_cache": False, "profile_path": "profiles.npz",
+                    "metrics_log_interval": 10.0, "record_path": "recordings"})
+    try:
+        _check_options({"mic_device": 3})
+    except ValueError:
+        return
+    raise AssertionError("accepted mic_device")
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"{name}: OK")
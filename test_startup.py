@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Checks that the app starts without importing the slow DSP stack
+"""
+
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _fresh(code):
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=HERE)
+    assert proc.returncode == 0, proc.stderr
+    return proc.stdout.split()[-1]
+
+
+def test_import_defers_noisereduce_and_scipy():
+    loaded = _fresh("import sys, SpeakerLove; print(any(m in sys.modules for m in ('noisereduce', 'scipy')))")
+    assert loaded == "False"
+
+
+def test_streaming_engine_never_loads_noisereduce():
+    code = ("import sys, numpy as np; from audio_pipeline import SignalChain; "
+            "chain = SignalChain(48000, 2048, 'streaming', frames_to_learn=2); "
+            "[chain.process(np.zeros((2048, 1), np.float32)) for _ in range(4)]; "
+            "print('noisereduce' in sys.modules)")
+    assert _fresh(code) == "False"
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"{name}: OK")
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Checks for the streaming spectral gate
+"""
+
+import tracemalloc
+
+import numpy as np
+
+from noise_tracker import NoiseTracker
+from streaming_denoiser import StreamingDenoiser
+
+
+def _run(denoiser, signal, block):
+    return np.concatenate([denoiser.process(signal[i:i + block])
+                           for i in range(0, len(signal), block)])
+
+
+def test_passthrough_reconstructs_input():
+    """With no noise profile the STFT round trip is a pure delay"""
+    rng = np.random.default_rng(0)
+    for block in (2048, 480, 128):
+        signal = rng.standard_normal(block * 40).astype(np.float32)
+        den = StreamingDenoiser(48000, block)
+        out = _run(den, signal, block)
+        d = den.latency_samples
+        assert len(out) == len(signal)
+        np.testing.assert_allclose(out[d + 1024:], signal[:len(signal) - d][1024:], atol=1e-4)
+
+
+def test_noise_only_is_suppressed():
+    rng = np.random.default_rng(1)
+    noise = 0.05 * rng.standard_normal(48000 * 2).astype(np.float32)
+    den = StreamingDenoiser(48000, 2048)
+    den.learn_noise(noise[:20480])
+    out = _run(den, noise[20480:], 2048)
+    assert np.std(out[4096:]) < 0.4 * np.std(noise)
+
+
+def test_tone_survives_gating():
+    rng = np.random.default_rng(2)
+    t = np.arange(48000 * 2) / 48000
+    noise = 0.02 * rng.standard_normal(len(t)).astype(np.float32)
+    tone = (0.3 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+    den = StreamingDenoiser(48000, 2048)
+    den.learn_noise(noise[:20480])
+    out = _run(den, tone + noise, 2048)
+    assert np.std(out[8192:]) > 0.8 * np.std(tone)
+
+
+def test_adaptive_tracker_follows_noise_change():
+    """A fixed profile goes stale when the noise gets louder; the tracker recovers"""
+    rng = np.random.default_rng(3)
+    noise = 0.02 * rng.standard_normal(48000 * 10).astype(np.float32)
+    noise[48000 * 3:] *= 4
+    late = slice(48000 * 8, 48000 * 10)
+    residual = {}
+    for mode in ("fixed", "adaptive"):
+        den = StreamingDenoiser(48000, 2048)
+        if mode == "adaptive":
+            den.noise_tracker = NoiseTracker(den.n_bins, 48000, den.hop_length)
+        den.learn_noise(noise[:20480])
+        out = _run(den, noise, 2048)
+        residual[mode] = np.std(out[late]) / np.std(noise[late])
+    assert residual["fixed"] > 0.9
+    assert residual["adaptive"] < 0.4
+
+
+def test_channels_match_separate_mono_runs():
+    """The batched multi-channel STFT gives each channel its own statistics"""
+    rng = np.random.default_rng(4)
+    gains = np.array([0.01, 0.1], dtype=np.float32)
+    stereo = rng.standard_normal((48000, 2)).astype(np.float32) * gains
+    den = StreamingDenoiser(48000, 2048, channels=2)
+    den.learn_noise(stereo[:20480])
+    out = _run(den, stereo[:47104], 2048)
+    assert out.shape == (47104, 2)
+    for c in range(2):
+        mono = StreamingDenoiser(48000, 2048)
+        mono.learn_noise(stereo[:20480, c])
+        np.testing.assert_allclose(out[:, c], _run(mono, stereo[:47104, c], 2048), atol=1e-5)
+
+
+def test_steady_state_blocks_do_not_allocate():
+    """After warm-up, process(out=) works entirely in preallocated buffers"""
+    rng = np.random.default_rng(5)
+    x = (0.05 * rng.standard_normal((48000, 2))).astype(np.float32)
+    for block, tracker in ((2048, False), (480, True)):
+        den = StreamingDenoiser(48000, block, channels=2)
+        if tracker:
+            den.noise_tracker = NoiseTracker(den.n_bins, 48000, den.hop_length)
+        den.learn_noise(x[:20480])
+        out = np.empty((block, 2), dtype=np.float32)
+        blocks = [x[i:i + block] for i in range(0, len(x) - block + 1, block)]
+        for b in blocks[:4]:
+            den.process(b, out=out)
+
+        tracemalloc.start()
+        try:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            for b in blocks[4:]:
+                den.process(b, out=out)
+            after, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # Only small Python objects (views, floats) come and go
+        assert after - before < 1024
+        assert peak - before < 8192
+
+
+def test_strength_change_ramps_in():
+    """Dropping suppression to zero mid-stream glides over ~50 ms instead of jumping"""
+    rng = np.random.default_rng(1)
+    noise = 0.05 * rng.standard_normal(48000 * 2).astype(np.float32)
+    den = StreamingDenoiser(48000, 480)
+    den.learn_noise(noise[:20480])
+    signal = noise[20480:20480 + 480 * 60]
+    out = []
+    for i in range(60):
+        if i == 30:
+            den.set_params(prop_decrease=0.0)
+        out.append(den.process(signal[i * 480:(i + 1) * 480]))
+    out = np.concatenate(out)[den.latency_samples:]
+    # Output/input level per 5 ms, as a fraction of the way from gated to open
+    level = np.array([np.sqrt(np.mean(out[j:j + 240] ** 2) / np.mean(signal[j:j + 240] ** 2))
+                      for j in range(0, len(out) - 240, 240)])
+    gated, open_ = level[40:55].mean(), level[-10:].mean()
+    assert gated < 0.5 and abs(open_ - 1.0) < 0.05
+    progress = (level - gated) / (open_ - gated)
+    assert np.sum((progress > 0.1) & (progress < 0.9)) >= 6
+    assert den.prop_decrease == 0.0
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"{name}: OK")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Checks for the voice activity detector and the gated (non-speech) path
+"""
+
+import numpy as np
+
+from audio_pipeline import SignalChain
+from streaming_denoiser import StreamingDenoiser
+from vad import VoiceActivityDetector
+
+SR = 48000
+
+
+def _noise_with_voice(seconds=6, onset_s=3.0):
+    rng = np.random.default_rng(0)
+    n = SR * seconds
+    x = (0.01 * rng.standard_normal(n)).astype(np.float32)
+    t = np.arange(n - int(onset_s * SR)) / SR
+    voiced = sum(np.sin(2 * np.pi * 150 * k * t) / k for k in range(1, 10))
+    x[int(onset_s * SR):] += (0.2 * voiced).astype(np.float32)
+    return x
+
+
+def test_detects_voice_not_noise():
+    x = _noise_with_voice()
+    for block in (128, 2048):
+        vad = VoiceActivityDetector(SR, block)
+        decisions = np.array([vad.update(x[i:i + block]) for i in range(0, len(x) - block + 1, block)])
+        onset = 3 * SR // block
+        assert not decisions[:onset].any()
+        assert decisions[onset + 1:].all()
+
+
+def test_gain_path_keeps_stream_continuous():
+    rng = np.random.default_rng(1)
+    x = (0.1 * rng.standard_normal(SR)).astype(np.float32)
+    denoiser = StreamingDenoiser(SR, n_fft=512, hop_length=128)
+    out = np.concatenate([denoiser.process(x[i:i + 256], gain=1.0) for i in range(0, len(x), 256)])
+    delay = denoiser.latency_samples
+    np.testing.assert_allclose(out[delay + 512:], x[512:len(x) - delay], atol=1e-5)
+
+
+def test_chain_gates_silence_and_keeps_onsets():
+    x = _noise_with_voice()[:, None]
+    outputs = {}
+    for vad in (False, True):
+        chain = SignalChain(SR, 2048, "streaming", 10, "fixed", 1024, 1, True, None, False, 300, False, vad=vad)
+        outputs[vad] = np.concatenate([chain.process(x[i:i + 2048], None, True)
+                                       for i in range(0, len(x) - 2047, 2048)])[:, 0]
+    noise = slice(int(1.0 * SR), int(2.5 * SR))
+    assert np.std(outputs[True][noise]) < 0.1 * np.std(outputs[False][noise])
+    # The first 50ms of speech comes through as loud as without the VAD
+    onset = slice(int(3.0 * SR) + 1024, int(3.05 * SR) + 1024)
+    assert np.std(outputs[True][onset]) > 0.8 * np.std(outputs[False][onset])
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"{name}: OK")
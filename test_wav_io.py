@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Checks for the memory-mapped WAV reader and writer
+"""
+
+import os
+import struct
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+import wav_io
+from audio_backends import FileBackend
+from audio_pipeline import BlockProcessor
+from engine import SpeakerLove
+from wav_io import WavReader, WavWriter
+
+
+def _signal(frames, channels, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.clip(0.3 * rng.standard_normal((frames, channels)), -1.0, 1.0).astype(np.float32)
+
+
+def test_round_trip_every_subtype():
+    audio = _signal(5001, 2)
+    audio[:2] = [[1.0, -1.0], [-1.0, 0.999]]  # Full scale clips, never wraps
+    with tempfile.TemporaryDirectory() as tmp:
+        for subtype, tolerance in (("PCM_U8", 1 / 128), ("PCM_16", 1 / 32768), ("PCM_24", 2 ** -23),
+                                   ("PCM_32", 2 ** -23), ("FLOAT", 0.0), ("DOUBLE", 0.0)):
+            path = os.path.join(tmp, f"{subtype}.wav")
+            writer = WavWriter(path, 44100, 2, subtype)
+            for i in range(0, len(audio), 1000):
+                writer.write(audio[i:i + 1000])
+            writer.close()
+
+            reader = WavReader(path)
+            assert (reader.subtype, reader.sample_rate, reader.channels, reader.frames) == (subtype, 44100, 2, 5001)
+            back = reader.read()
+            assert np.abs(back - audio).max() <= tolerance, subtype
+            assert back[0, 1] == -1.0 and back[1, 0] == -1.0, subtype
+
+        # The standard library agrees on the 16-bit file
+        with wave.open(os.path.join(tmp, "PCM_16.wav"), "rb") as w:
+            pcm = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2").reshape(-1, 2)
+        assert np.array_equal(WavReader(os.path.join(tmp, "PCM_16.wav")).raw(), pcm)
+
+
+def test_integer_formats_round_to_the_nearest_step():
+    steps = np.array([100.6, -100.6, 0.4, -0.4, 2.7, -2.3])
+    with tempfile.TemporaryDirectory() as tmp:
+        for subtype in ("PCM_U8", "PCM_16", "PCM_24", "PCM_32"):
+            scale = wav_io.SCALES[subtype]
+            path = os.path.join(tmp, f"{subtype}.wav")
+            writer = WavWriter(path, 48000, 1, subtype)
+            writer.write(steps / scale)
+            writer.close()
+            reader = WavReader(path)
+            if subtype == "PCM_24":  # No integer view: every 24-bit value is exact in float32
+                stored = reader.read()[:, 0] * scale
+            else:
+                stored = reader.raw()[:, 0].astype(np.float64) - (128 if subtype == "PCM_U8" else 0)
+            np.testing.assert_array_equal(stored, [101, -101, 0, 0, 3, -2], err_msg=subtype)
+
+
+def _fmt_chunk(path):
+    with open(path, "rb") as f:
+        f.seek(12)
+        while True:
+            chunk, size = struct.unpack("<4sI", f.read(8))
+            if chunk == b"fmt ":
+                return f.read(size)
+            f.seek(size + size % 2, 1)
+
+
+def test_wide_and_deep_files_use_the_extensible_format():
+    with tempfile.TemporaryDirectory() as tmp:
+        for channels, subtype, extensible in ((2, "PCM_16", False), (4, "PCM_16", True),
+                                              (1, "PCM_24", True), (2, "FLOAT", True)):
+            path = os.path.join(tmp, f"{channels}-{subtype}.wav")
+            audio = _signal(1000, channels)
+            writer = WavWriter(path, 48000, channels, subtype)
+            writer.write(audio)
+            writer.close()
+
+            fmt = _fmt_chunk(path)
+            tag, = struct.unpack("<H", fmt[:2])
+            if extensible:
+                assert tag == wav_io.FORMAT_EXTENSIBLE and len(fmt) == 40
+                _, valid_bits, mask = struct.unpack("<HHI", fmt[16:24])
+                assert valid_bits == wav_io.FORMATS[subtype][1]
+                assert mask == {1: 0x4, 2: 0x3}.get(channels, 0)
+                assert fmt[24:] == struct.pack("<H", wav_io.FORMATS[subtype][0]) + wav_io.GUID_TAIL
+            else:
+                assert tag == wav_io.FORMAT_PCM and len(fmt) == 16
+            reader = WavReader(path)
+            assert (reader.subtype, reader.channels) == (subtype, channels)
+            np.testing.assert_allclose(reader.read(), audio, atol=1 / 32768)
+
+
+def test_blocks_are_mapped_and_reuse_one_buffer():
+    audio = _signal(4096 * 3 + 100, 1)
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
+        path = f.name
+    try:
+        writer = WavWriter(path, 48000, 1, "PCM_24")
+        writer.write(audio)
+        writer.close()
+        reader = WavReader(path)
+        assert isinstance(reader.raw(0, 4096), np.memmap)  # A view of the file, not a copy
+
+        blocks = [(b.__array_interface__["data"][0], len(b), b[0, 0]) for b in reader.blocks(4096)]
+        assert len({pointer for pointer, _, _ in blocks}) == 1
+        assert [n for _, n, _ in blocks] == [4096, 4096, 4096, 100]
+        starts = audio[::4096, 0]
+        np.testing.assert_allclose([first for _, _, first in blocks], starts, atol=2 ** -23)
+        reader.close()
+    finally:
+        os.remove(path)
+
+
+def test_rf64_beyond_the_riff_limit():
+    audio = _signal(3000, 1)
+    limit = wav_io.RIFF_LIMIT
+    wav_io.RIFF_LIMIT = 1000  # Pretend 3000 16-bit frames outgrow RIFF
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "long.wav")
+            writer = WavWriter(path, 48000, 1)
+            writer.write(audio)
+            writer.close()
+            with open(path, "rb") as f:
+                assert f.read(4) == b"RF64"
+            reader = WavReader(path)
+            assert reader.frames == 3000
+            np.testing.assert_allclose(reader.read(), audio, atol=1 / 32768)
+    finally:
+        wav_io.RIFF_LIMIT = limit
+
+
+def test_file_backend_feeds_process_audio():
+    """A 24-bit file through the live engine matches the offline block loop"""
+    audio = _signal(48000, 1, seed=1) * 0.2
+    with tempfile.TemporaryDirectory() as tmp:
+        mic, out = os.path.join(tmp, "mic.wav"), os.path.join(tmp, "out.wav")
+        writer = WavWriter(mic, 48000, 1, "PCM_24")
+        writer.write(audio)
+        writer.close()
+        audio = WavReader(mic).read()
+
+        engine = SpeakerLove(mic, out, engine="streaming", blocksize=512, backend=FileBackend(realtime=False))
+        engine.enabled = True
+        deadline = time.monotonic() + 30.0
+        engine.start()
+        try:
+            while not engine.mic_stream.finished or engine.input_ring.fill:
+                assert time.monotonic() < deadline, "timed out"
+                time.sleep(0.001)
+            time.sleep(0.1)
+        finally:
+            engine.stop()
+
+        offline = BlockProcessor(48000, 512, "streaming", engine.processor.frames_to_learn)
+        padded = np.zeros((-(-len(audio) // 512) * 512, 1), dtype=np.float32)
+        padded[:len(audio)] = audio
+        expected = np.concatenate([offline.process(padded[i:i + 512]) for i in range(0, len(padded), 512)])
+        result = WavReader(out)
+        assert result.subtype == "PCM_16"
+        np.testing.assert_allclose(result.read()[:len(audio)], expected[:len(audio)], atol=1 / 32768)
+
+
+def test_file_backend_only_probes_the_input():
+    """An existing output file at another rate is neither opened nor reported"""
+    with tempfile.TemporaryDirectory() as tmp:
+        mic, out = os.path.join(tmp, "mic.wav"), os.path.join(tmp, "out.wav")
+        for path, rate in ((mic, 44100), (out, 16000)):
+            writer = WavWriter(path, rate)
+            writer.write(np.zeros(100, dtype=np.float32))
+            writer.close()
+        backend = FileBackend()
+        assert backend.default_samplerate(mic) == 44100
+        assert backend.default_samplerate(out, "output") is None
+        assert SpeakerLove(mic, out, engine="streaming", backend=backend).sample_rate == 44100
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"{name}: OK")
@@ -0,0 +1,96 @@
+"""
+SpeakerLove - Voice Activity Detector
+Cheap per-block speech/non-speech decision ahead of the denoiser
+
+Most of an always-on session is silence on the mic, and spectral noise
+reduction on silence only ever produces more silence. The detector looks at
+one windowed FFT of the latest audio (mixed to mono) per block, averaged
+over ~20ms:
+
+  - energy in the voice band relative to a tracked noise floor (the floor
+    follows drops quickly and rises slowly, so speech does not pull it up)
+  - spectral flatness in the same band (noise is flat, voiced speech is not)
+
+A block is speech when it is clearly above the floor and not noise-like.
+A hangover keeps the decision on for a few hundred milliseconds after the
+last speech block so word endings and short pauses are not gated.
+"""
+
+import numpy as np
+
+
+class VoiceActivityDetector:
+    """Energy + spectral-flatness VAD with hangover"""
+
+    def __init__(self, sample_rate=48000, block_size=2048, margin_db=6.0, flatness_threshold=0.5,
+                 hangover_ms=300, floor_rise_db_per_s=2.0, band_hz=(100, 4000), min_analysis=512,
+                 smoothing_ms=20):
+        self.margin_db = margin_db
+        self.flatness_threshold = flatness_threshold
+
+        # Small blocks are analysed together with their predecessors
+        self.n_fft = max(block_size, min_analysis)
+        self._hist = np.zeros(self.n_fft - block_size, dtype=np.float32) if self.n_fft > block_size else None
+        self._fill_blocks = -(-self.n_fft // block_size)  # Until the history holds only real audio
+        self.window = (0.5 - 0.5 * np.cos(2.0 * np.pi * np.arange(self.n_fft) / self.n_fft)).astype(np.float32)
+        freqs = np.fft.rfftfreq(self.n_fft, 1.0 / sample_rate)
+        self._band = (freqs >= band_hz[0]) & (freqs <= band_hz[1])
+
+        block_s = block_size / sample_rate
+        self._rise_db = floor_rise_db_per_s * block_s
+        # Spectrum averaging steadies the features of short blocks (~instant at 2048)
+        self._alpha = 1.0 - np.exp(-block_s / (smoothing_ms / 1000.0))
+        self._power = None
+        self.hangover_blocks = int(np.ceil(hangover_ms / 1000.0 / block_s))
+
+        self.floor_db = None
+        self._blocks = 0
+        self.energy_db = 0.0
+        self.flatness = 1.0
+        self.speech = False
+        self._hang = 0
+
+    def reset(self):
+        self.floor_db = None
+        self._blocks = 0
+        self.speech = False
+        self._hang = 0
+        self._power = None
+        if self._hist is not None:
+            self._hist[:] = 0
+
+    def update(self, block):
+        """Classify one (frames,) or (frames, channels) block; returns True for speech"""
+        block = np.asarray(block, dtype=np.float32)
+        mono = block.mean(axis=1) if block.ndim > 1 else block
+        if self._hist is not None:
+            mono = np.concatenate([self._hist, mono])
+            self._hist[:] = mono[-len(self._hist):]
+
+        power = np.abs(np.fft.rfft(mono[-self.n_fft:] * self.window))[self._band] ** 2
+        if self._power is None:
+            self._power = power
+        else:
+            self._power += self._alpha * (power - self._power)
+        band = self._power + 1e-20
+        mean = band.mean()
+        self.energy_db = float(10.0 * np.log10(mean))
+        self.flatness = float(np.exp(np.log(band).mean()) / mean)
+
+        # Noise floor: fall with the signal at once, creep up slowly
+        self._blocks += 1
+        if self._blocks < self._fill_blocks:
+            return self.speech
+        if self.floor_db is None or self.energy_db < self.floor_db:
+            self.floor_db = self.energy_db
+        else:
+            self.floor_db += self._rise_db
+
+        active = (self.energy_db > self.floor_db + self.margin_db
+                  and self.flatness < self.flatness_threshold)
+        if active:
+            self._hang = self.hangover_blocks
+        elif self._hang:
+            self._hang -= 1
+        self.speech = active or self._hang > 0
+        return self.speech
@@ -0,0 +1,261 @@
+"""
+SpeakerLove - Memory-Mapped WAV I/O
+Long recordings in and out block by block, without loading them
+
+A 4-hour 48 kHz recording is ~2.7 GB as float32, so offline processing
+should never hold one whole. WavReader memory-maps the data chunk instead:
+raw() slices are views of the file (the OS pages them in on demand), and
+read_into()/blocks() convert each block from the file's sample format
+into one reused float32 buffer, so a long file costs the same handful of
+buffers as a short one. WavWriter converts back into a reused byte buffer
+and appends it through a buffered file; the header sizes are patched when
+it is closed.
+
+Formats: PCM 8/16/24/32-bit and 32/64-bit float, plain or
+WAVE_FORMAT_EXTENSIBLE. The writer uses the extensible fmt chunk where
+the spec asks for it: more than two channels or more than 16 bits. Data beyond 4 GB uses RF64: the writer reserves
+room for the ds64 chunk with a JUNK chunk (EBU Tech 3306) and only turns
+it into RF64 when the data outgrows RIFF's 32-bit sizes.
+"""
+
+import struct
+
+import numpy as np
+
+FORMAT_PCM = 1
+FORMAT_FLOAT = 3
+FORMAT_EXTENSIBLE = 0xFFFE
+
+# (format tag, bits) -> (subtype name as soundfile spells it, sample dtype on disk)
+SUBTYPES = {
+    (FORMAT_PCM, 8): ("PCM_U8", np.dtype("u1")),
+    (FORMAT_PCM, 16): ("PCM_16", np.dtype("<i2")),
+    (FORMAT_PCM, 24): ("PCM_24", np.dtype("u1")),  # Three bytes, assembled on conversion
+    (FORMAT_PCM, 32): ("PCM_32", np.dtype("<i4")),
+    (FORMAT_FLOAT, 32): ("FLOAT", np.dtype("<f4")),
+    (FORMAT_FLOAT, 64): ("DOUBLE", np.dtype("<f8")),
+}
+FORMATS = {name: (tag, bits) for (tag, bits), (name, _) in SUBTYPES.items()}
+
+# Full scale of each integer subtype; float samples are already in [-1, 1]
+SCALES = {"PCM_U8": 128.0, "PCM_16": 32768.0, "PCM_24": 8388608.0, "PCM_32": 2147483648.0}
+
+RIFF_LIMIT = 0xFFFFFFFF
+
+# WAVE_FORMAT_EXTENSIBLE: the format tag leads the sub-format GUID
+GUID_TAIL = b"\x00\x00\x00\x00\x10\x00\x80\x00\x00\xaa\x00\x38\x9b\x71"
+# Speaker positions for mono (front centre) and stereo; wider files are
+# mic arrays here, whose channels have no speaker position
+CHANNEL_MASKS = {1: 0x4, 2: 0x3}
+
+
+def is_supported(subtype):
+    return subtype in FORMATS
+
+
+class WavReader:
+    """Memory-mapped WAV file read sequentially as (frames, channels) float32"""
+
+    def __init__(self, path):
+        self.path = path
+        self.format = "WAV"
+        with open(path, "rb") as f:
+            riff, _, wave = struct.unpack("<4sI4s", f.read(12))
+            if riff not in (b"RIFF", b"RF64") or wave != b"WAVE":
+                raise ValueError(f"{path} is not a WAV file")
+            fmt = data = None
+            ds64_data_size = None
+            while data is None:
+                header = f.read(8)
+                if len(header) < 8:
+                    raise ValueError(f"{path} has no data chunk")
+                chunk, size = struct.unpack("<4sI", header)
+                if chunk == b"ds64":
+                    _, ds64_data_size = struct.unpack("<QQ", f.read(16))
+                    f.seek(size - 16, 1)
+                elif chunk == b"fmt ":
+                    fmt = f.read(size)
+                elif chunk == b"data":
+                    if size == RIFF_LIMIT and ds64_data_size is not None:
+                        size = ds64_data_size
+                    data = (f.tell(), size)
+                    break
+                else:
+                    f.seek(size, 1)
+                if size % 2:
+                    f.seek(1, 1)  # Chunks are word aligned
+        if fmt is None:
+            raise ValueError(f"{path} has no fmt chunk")
+
+        tag, self.channels, self.sample_rate, _, block_align, bits = struct.unpack("<HHIIHH", fmt[:16])
+        if tag == FORMAT_EXTENSIBLE and len(fmt) >= 26:
+            tag = struct.unpack("<H", fmt[24:26])[0]  # First bytes of the sub-format GUID
+        if (tag, bits) not in SUBTYPES:
+            raise ValueError(f"{path}: unsupported WAV format (tag {tag}, {bits} bits)")
+        self.subtype, dtype = SUBTYPES[(tag, bits)]
+        self.sample_width = bits // 8
+
+        offset, size = data
+        self.frames = size // block_align
+        shape = (self.frames, self.channels) + ((3,) if self.subtype == "PCM_24" else ())
+        if self.frames:
+            self._map = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape)
+        else:
+            self._map = np.zeros(shape, dtype=dtype)
+        self.position = 0
+        self._buffer = None
+        self._work = None
+
+    def raw(self, start=0, frames=None):
+        """Samples in the file's own format: a view of the mapping, no copy"""
+        stop = self.frames if frames is None else min(start + frames, self.frames)
+        return self._map[start:stop]
+
+    def seek(self, frame):
+        self.position = min(max(frame, 0), self.frames)
+
+    def read_into(self, out):
+        """Convert the next len(out) frames into out (frames, channels) float32; returns frames read
+
+        Frames past the end of the file are left untouched.
+        """
+        raw = self.raw(self.position, len(out))
+        n = len(raw)
+        self.position += n
+        if n:
+            self._convert(raw, out[:n])
+        return n
+
+    def _convert(self, raw, out):
+        if self.subtype == "PCM_24":
+            # Sign-extend the top byte, then shift the lower two in
+            if self._work is None or len(self._work) < len(raw):
+                self._work = np.zeros((len(raw), self.channels), dtype=np.int32)
+            work = self._work[:len(raw)]
+            np.copyto(work, raw[..., 2].view(np.int8))
+            work <<= 8
+            work |= raw[..., 1]
+            work <<= 8
+            work |= raw[..., 0]
+            raw = work
+        np.copyto(out, raw, casting="unsafe")
+        if self.subtype == "PCM_U8":
+            out -= 128.0
+        if self.subtype in SCALES:
+            out *= np.float32(1.0 / SCALES[self.subtype])
+
+    def blocks(self, block_size):
+        """Yield the rest of the file as float32 blocks (the last one shorter)
+
+        Every block is a view of one reused buffer, valid until the next.
+        """
+        if self._buffer is None or len(self._buffer) != block_size:
+            self._buffer = np.zeros((block_size, self.channels), dtype=np.float32)
+        while True:
+            n = self.read_into(self._buffer)
+            if not n:
+                return
+            yield self._buffer[:n]
+
+    def read(self):
+        """The rest of the file as one new float32 array"""
+        out = np.zeros((self.frames - self.position, self.channels), dtype=np.float32)
+        self.read_into(out)
+        return out
+
+    def close(self):
+        self._map = None  # The mapping closes once no view of it is left
+
+
+class WavWriter:
+    """Buffered WAV writer converting float32 blocks into the file's format"""
+
+    BUFFER_BYTES = 1 << 20
+
+    def __init__(self, path, sample_rate, channels=1, subtype="PCM_16"):
+        if subtype not in FORMATS:
+            raise ValueError(f"Unsupported WAV subtype: {subtype}")
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.subtype = subtype
+        tag, bits = FORMATS[subtype]
+        self.sample_width = bits // 8
+        self._block_align = channels * self.sample_width
+        self._dtype = SUBTYPES[(tag, bits)][1]
+        self.frames = 0
+
+        self._file = open(path, "wb", buffering=self.BUFFER_BYTES)
+        self._file.write(b"RIFF\0\0\0\0WAVE")
+        self._file.write(b"JUNK" + struct.pack("<I", 28) + bytes(28))  # Room for a ds64 chunk
+        fmt = (sample_rate, sample_rate * self._block_align, self._block_align, bits)
+        if channels > 2 or bits > 16:
+            self._file.write(b"fmt " + struct.pack("<IHHIIHHHHI", 40, FORMAT_EXTENSIBLE, channels, *fmt,
+                                                   22, bits, CHANNEL_MASKS.get(channels, 0)))
+            self._file.write(struct.pack("<H", tag) + GUID_TAIL)
+        else:
+            self._file.write(b"fmt " + struct.pack("<IHHIIHH", 16, tag, channels, *fmt))
+        self._file.write(b"data\0\0\0\0")
+        self._data_offset = self._file.tell()
+        self._raw = None
+        self._tmp = None
+        self._work = None
+
+    def _allocate(self, frames):
+        shape = (frames, self.channels)
+        self._raw = np.zeros(shape + ((3,) if self.subtype == "PCM_24" else ()), dtype=self._dtype)
+        self._tmp = np.zeros(shape)
+        self._work = np.zeros(shape, dtype=np.int32)
+
+    def write(self, data):
+        """Append a (frames, channels) or (frames,) float block"""
+        data = np.asarray(data)
+        if data.ndim == 1:
+            data = data[:, None]
+        n = len(data)
+        if self._raw is None or len(self._raw) < n:
+            self._allocate(n)
+        raw, tmp = self._raw[:n], self._tmp[:n]
+        scale = SCALES.get(self.subtype)
+        if scale is None:
+            np.copyto(raw, data, casting="unsafe")
+        else:
+            np.copyto(tmp, data)  # Clip in float64, where 32-bit full scale is exact
+            np.clip(tmp, -1.0, (scale - 1.0) / scale, out=tmp)
+            tmp *= scale
+            np.rint(tmp, out=tmp)  # Round to the nearest step, as libsndfile does
+            if self.subtype == "PCM_U8":
+                tmp += 128.0
+            if self.subtype == "PCM_24":
+                # Low, middle and high byte of each sample
+                work = self._work[:n]
+                np.copyto(work, tmp, casting="unsafe")
+                for byte in range(3):
+                    np.copyto(raw[..., byte], work, casting="unsafe")
+                    work >>= 8
+            else:
+                np.copyto(raw, tmp, casting="unsafe")
+        self._file.write(raw)
+        self.frames += n
+
+    def close(self):
+        if self._file is None:
+            return
+        f, self._file = self._file, None
+        size = self.frames * self._block_align
+        if size % 2:
+            f.write(b"\0")
+        riff_size = self._data_offset - 8 + size + size % 2
+        if riff_size > RIFF_LIMIT:
+            # RF64: the real sizes go in the ds64 chunk that replaces JUNK
+            f.seek(0)
+            f.write(b"RF64" + struct.pack("<I", RIFF_LIMIT) + b"WAVE")
+            f.write(b"ds64" + struct.pack("<IQQQI", 28, riff_size, size, self.frames, 0))
+            f.seek(self._data_offset - 4)
+            f.write(struct.pack("<I", RIFF_LIMIT))
+        else:
+            f.seek(4)
+            f.write(struct.pack("<I", riff_size))
+            f.seek(self._data_offset - 4)
+            f.write(struct.pack("<I", size))
+        f.close()